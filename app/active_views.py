@@ -0,0 +1,61 @@
+"""
+Active views breaking ACTIVE_VIEW_INDEXES (see app/models/views.py).
+
+Views activated before the indexes existed may leave two active views of
+one env with the same name or viewId; the app then refuses to start rather
+than pick one itself. `list` shows the groups, `resolve` sets all but the
+newest view of each group to inactive. A view newest by name but not by
+viewId is deactivated too, which leaves its name with no active view;
+check `list` first and activate the intended views afterwards.
+
+From the command line:
+    python -m app.active_views list
+    python -m app.active_views resolve
+"""
+import asyncio
+import sys
+from typing import Dict, List
+
+from beanie import PydanticObjectId
+
+from app.models import Env, View
+from app.models.views import ACTIVE_VIEW_INDEXES
+
+
+async def find_duplicates() -> Dict[str, List[List[PydanticObjectId]]]:
+    """The groups of active views sharing each indexed key, newest first."""
+    return {key: await View.duplicate_active_views(key) for key, _ in ACTIVE_VIEW_INDEXES}
+
+
+async def resolve_duplicates() -> int:
+    """Deactivate all but the newest view of every group. Returns the number deactivated."""
+    collection = View.get_motor_collection()
+    stale = set()
+    for groups in (await find_duplicates()).values():
+        for ids in groups:
+            stale.update(ids[1:])
+    if not stale:
+        return 0
+    envs = await collection.distinct("env.$id", {"_id": {"$in": list(stale)}})
+    result = await collection.update_many({"_id": {"$in": list(stale)}}, {"$set": {"status": "inactive"}})
+    for env_id in envs:
+        await Env.bump_views_revision(env_id)
+    return result.modified_count
+
+
+async def _main(argv: List[str]):
+    from app.database import init_database
+
+    if len(argv) != 1 or argv[0] not in ("list", "resolve"):
+        print("usage: python -m app.active_views list | resolve")
+        sys.exit(2)
+    await init_database(create_indexes=False)
+    if argv[0] == "list":
+        print(await find_duplicates())
+    else:
+        print({"deactivated": await resolve_duplicates()})
+        await View.ensure_active_indexes()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1:]))
@@ -0,0 +1,239 @@
+"""
+In-process caches for expanded view payloads.
+
+Bodies are cached already JSON-encoded, next to their precompressed
+variants (see app/compression.py), so a hit costs no encoding or
+compression work. Recent versions of each view are kept too, so clients
+can be sent a JSON Patch from the version they have (see VersionHistory).
+"""
+import asyncio
+import json
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Optional, Set
+
+from beanie import PydanticObjectId
+from fastapi.encoders import jsonable_encoder
+
+from app.compression import compress_variants
+from app.config import settings
+from app.json_patch import make_patch
+from app.models import Env
+from app.read_routing import primary_reads
+from app.repositories import repositories
+
+
+def encode_json(payload: Any) -> bytes:
+    return json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+
+
+_ENTITY_TAG = re.compile(r'(?:W/)?"[^"]*"')
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches `etag`: "*", or a comma-separated
+    list of entity tags compared weakly (W/ is ignored), as RFC 9110 asks.
+    Proxies that compress responses often weaken ETags on the way.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tag = strip_weak(etag)
+    return any(strip_weak(candidate) == tag for candidate in _ENTITY_TAG.findall(if_none_match))
+
+
+def strip_weak(etag: str) -> str:
+    """The opaque part of an entity tag (without W/ and surrounding whitespace)."""
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+@dataclass
+class BundleEntry:
+    """A pre-encoded bootstrap bundle for one env at one revision."""
+    revision: int
+    etag: str
+    body: bytes
+    variants: Dict[str, bytes] = field(default_factory=dict)  # content-coding -> compressed body
+
+
+class BundleCache:
+    """
+    Bootstrap bundles (every active view of an env, fully expanded),
+    keyed by env id and versioned by `Env.viewsRevision`.
+
+    Entries are rebuilt lazily when a request sees a newer revision, or
+    eagerly in the background after a view is activated.
+    """
+
+    def __init__(self):
+        self._entries: Dict[PydanticObjectId, BundleEntry] = {}
+        self._locks: Dict[PydanticObjectId, asyncio.Lock] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def peek(self, env_id: PydanticObjectId, revision: int) -> Optional[BundleEntry]:
+        """Return the cached bundle if it is built for exactly this revision."""
+        entry = self._entries.get(env_id)
+        if entry and entry.revision == revision:
+            return entry
+        return None
+
+    async def get(self, env: Env) -> BundleEntry:
+        """Return the bundle for the env's current revision, building it if needed."""
+        entry = self.peek(env.id, env.viewsRevision)
+        if entry:
+            return entry
+
+        lock = self._locks.setdefault(env.id, asyncio.Lock())
+        async with lock:
+            # Another request may have built it while we waited
+            entry = self.peek(env.id, env.viewsRevision)
+            if entry:
+                return entry
+            entry = await self._build(env)
+            current = self._entries.get(env.id)
+            if not current or current.revision <= entry.revision:
+                self._entries[env.id] = entry
+            return entry
+
+    async def _build(self, env: Env) -> BundleEntry:
+        revision = env.viewsRevision
+        # Cached until the next revision, so never build from a lagging secondary
+        with primary_reads():
+            views = await repositories.views.list_active(env.id)
+            menu_masters, sub_menu_masters = await repositories.views.load_masters(views)
+
+        bundle = {
+            "env": env.slug,
+            "revision": revision,
+            "views": {
+                view.name: await view.expand_full(menu_masters, sub_menu_masters)
+                for view in views
+            },
+        }
+        body = encode_json(bundle)
+        return BundleEntry(
+            revision=revision,
+            etag=f'"{env.id}-{revision}"',
+            body=body,
+            variants=await asyncio.to_thread(compress_variants, body),
+        )
+
+    def schedule_rebuild(self, env_id: PydanticObjectId):
+        """Rebuild the env's bundle in the background (fire and forget)."""
+        async def _rebuild():
+            try:
+                env = await repositories.envs.get(env_id)
+                if env:
+                    await self.get(env)
+            except Exception as e:
+                print(f"Bundle rebuild failed for env {env_id}: {e}")
+
+        task = asyncio.create_task(_rebuild())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+@dataclass
+class CachedBody:
+    """A pre-encoded JSON body for one version of its source."""
+    version: Hashable
+    body: bytes
+    variants: Dict[str, bytes]
+
+
+class BodyCache:
+    """
+    Bounded LRU of encoded bodies. Each entry is valid for exactly one
+    version of its source (e.g. a view's `version`); looking it up with
+    any other version is a miss, and the next `put` replaces it.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[CachedBody]:
+        entry = self._entries.get(key)
+        if entry is None or entry.version != version:
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def put(self, key: Hashable, version: Hashable, payload: Any) -> CachedBody:
+        """Encode and compress `payload`, cache it for `version` and return it."""
+        body = encode_json(payload)
+        entry = CachedBody(version, body, await asyncio.to_thread(compress_variants, body))
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+
+class VersionHistory:
+    """
+    The last `depth` encoded bodies of up to `max_keys` sources (views), and
+    up to `max_patches` JSON Patches computed between them. The current
+    version's body is the same bytes object the BodyCache holds; older
+    versions and versions evicted from the BodyCache are only held here, so
+    the history can take up to max_keys * depth bodies on its own.
+    """
+
+    def __init__(self, max_keys: int, depth: int, max_patches: int):
+        self.max_keys = max_keys
+        self.depth = depth
+        self.max_patches = max_patches
+        self._bodies: "OrderedDict[Hashable, OrderedDict[Hashable, bytes]]" = OrderedDict()
+        self._patches: "OrderedDict[tuple, bytes]" = OrderedDict()
+
+    def record(self, key: Hashable, version: Hashable, body: bytes):
+        """Remember `body` as `version` of `key`, dropping the oldest versions beyond `depth`."""
+        if self.depth <= 0:
+            return
+        versions = self._bodies.get(key)
+        if versions is None:
+            versions = self._bodies[key] = OrderedDict()
+        self._bodies.move_to_end(key)
+        if version not in versions:
+            versions[version] = body
+            while len(versions) > self.depth:
+                versions.popitem(last=False)
+        while len(self._bodies) > self.max_keys:
+            self._bodies.popitem(last=False)
+
+    async def delta(self, key: Hashable, base: Hashable, version: Hashable) -> Optional[bytes]:
+        """
+        Encoded JSON Patch from version `base` to `version` of `key`, or None
+        when either body is no longer (or never was) in the history.
+        """
+        cache_key = (key, base, version)
+        patch = self._patches.get(cache_key)
+        if patch is None:
+            versions = self._bodies.get(key) or {}
+            if base not in versions or version not in versions:
+                return None
+            patch = await asyncio.to_thread(_encoded_patch, versions[base], versions[version])
+            self._patches[cache_key] = patch
+            while len(self._patches) > self.max_patches:
+                self._patches.popitem(last=False)
+        self._patches.move_to_end(cache_key)
+        return patch
+
+
+def _encoded_patch(src: bytes, dst: bytes) -> bytes:
+    return encode_json(make_patch(json.loads(src), json.loads(dst)))
+
+
+# Global cache instances
+bundle_cache = BundleCache()
+view_cache = BodyCache(max_entries=settings.VIEW_CACHE_SIZE)  # expanded views by View.expansion_key
+masters_cache = BodyCache(max_entries=1)  # the /views/menus/all listing
+view_history = VersionHistory(  # recent expanded views by view id, for delta responses
+    max_keys=settings.VIEW_HISTORY_SIZE,
+    depth=settings.VIEW_HISTORY_DEPTH,
+    max_patches=settings.VIEW_HISTORY_SIZE,
+)
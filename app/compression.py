@@ -0,0 +1,106 @@
+"""
+Response compression.
+
+Dynamic responses are gzipped on the fly by GZipMiddleware (see main.py),
+except long-lived event streams (see SelectiveGZipMiddleware).
+Cacheable payloads (expanded views, bootstrap bundles, the master list)
+are encoded and compressed once per version with `compress_variants` and
+served with `encoded_response`; the middleware leaves responses that
+already carry a Content-Encoding alone.
+
+Brotli variants are only produced when the optional `brotli` package is
+installed.
+"""
+import gzip
+from typing import Dict, Iterable, Mapping, Optional
+
+from fastapi import Response
+from starlette.middleware.gzip import GZipMiddleware
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+def compress_variants(body: bytes) -> Dict[str, bytes]:
+    """
+    Compressed variants of `body` by content-coding, in server preference
+    order. Empty for bodies under COMPRESSION_MIN_SIZE. CPU heavy for large
+    bodies; callers on the event loop should run it in a thread.
+    """
+    if len(body) < settings.COMPRESSION_MIN_SIZE:
+        return {}
+    variants = {}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=settings.BROTLI_QUALITY)
+    # Computed once per version, so spend the extra CPU on the best ratio
+    variants["gzip"] = gzip.compress(body, compresslevel=9)
+    return variants
+
+
+def negotiate(accept_encoding: Optional[str], offered: Iterable[str]) -> Optional[str]:
+    """
+    Pick the content-coding to send: the offered coding with the highest
+    q-value in Accept-Encoding (ties go to the first offered), or None
+    for identity.
+    """
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for coding in offered:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def encoded_response(
+    body: bytes,
+    variants: Mapping[str, bytes],
+    accept_encoding: Optional[str],
+    headers: Optional[Dict[str, str]] = None,
+    media_type: str = "application/json",
+) -> Response:
+    """Serve a pre-encoded body, or the precompressed variant the client accepts."""
+    headers = dict(headers or {})
+    if variants:
+        headers["Vary"] = "Accept-Encoding"
+        coding = negotiate(accept_encoding, variants)
+        if coding is not None:
+            headers["Content-Encoding"] = coding
+            body = variants[coding]
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that passes the given paths through untouched. Meant for
+    event streams: gzip would hold small events back in its buffer, and
+    each open connection would keep a compressor allocated.
+    """
+
+    def __init__(self, app, exclude_paths: Iterable[str] = (), **kwargs):
+        super().__init__(app, **kwargs)
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
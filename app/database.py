@@ -1,24 +1,44 @@
 """
 Database connection and initialization.
 """
+from fastapi import HTTPException
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 
 from app.config import settings
-from app.models import Item, Env, EnvKey, SubMenuMaster, MenuMaster, View
+from app.models import Item, Env, EnvKey, SubMenuMaster, MenuMaster, View, MasterTombstone, ViewLayout, Counter, Job
+from app.repositories import OfflineDatabase, repositories
 
 
-async def init_database():
-    """Initialize database connection and Beanie ODM."""
+async def init_database(create_indexes: bool = True):
+    """
+    Initialize database connection and Beanie ODM. `create_indexes=False`
+    skips the active view indexes, for `python -m app.active_views`.
+    """
+    if settings.STORAGE_BACKEND == "memory":
+        # Beanie still needs initialising so documents can be built; data lives in dicts
+        await init_beanie(
+            database=OfflineDatabase(),
+            document_models=[Item, Env, EnvKey, SubMenuMaster, MenuMaster, View, MasterTombstone, ViewLayout, Counter, Job]
+        )
+        repositories.use("memory")
+        print("Using in-memory storage (no MongoDB)")
+        return
+
     # Create Motor client
-    client = AsyncIOMotorClient(settings.MONGO_URL)
+    client = AsyncIOMotorClient(
+        settings.MONGO_URL, serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS
+    )
     
     # Initialize Beanie with the Item document class and database
     await init_beanie(
         database=client[settings.DATABASE_NAME], 
-        document_models=[Item, Env, EnvKey, SubMenuMaster, MenuMaster, View]  # Add all your document models here
+        document_models=[Item, Env, EnvKey, SubMenuMaster, MenuMaster, View, MasterTombstone, ViewLayout, Counter, Job]  # Add all your document models here
     )
     
+    if create_indexes:
+        await View.ensure_active_indexes()
+
     print(f"Connected to MongoDB: {settings.DATABASE_NAME}")
 
 
@@ -26,4 +46,10 @@ async def close_database():
     """Close database connection (if needed for cleanup)."""
     # Motor handles connection pooling automatically
     # No explicit cleanup needed in most cases
-    print("Database connection closed")
\ No newline at end of file
+    print("Database connection closed")
+
+
+def require_mongo():
+    """Route dependency: 503 for endpoints the memory backend does not implement (STORAGE_BACKEND=memory)."""
+    if repositories.backend != "mongo":
+        raise HTTPException(status_code=503, detail="Not available with the memory storage backend")
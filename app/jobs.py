@@ -0,0 +1,304 @@
+"""
+MongoDB-backed background jobs.
+
+Heavy endpoints enqueue a `Job` and answer 202 with its id; worker tasks
+started from the lifespan run it. A worker claims a job by taking a lease
+(leaseOwner / leaseUntil) in one find_one_and_update and keeps renewing it
+while the handler runs. If the process dies, the lease runs out and
+another worker reclaims the job, so work survives restarts.
+
+A failed attempt is retried after an exponential backoff until
+`maxAttempts`. Handlers report progress with `JobContext.progress`; the
+last progress is handed back on a retry so handlers can resume instead of
+redoing finished work. Each job type runs at most `concurrency` jobs at a
+time per process.
+
+Register a handler with:
+
+    @job_handler("copy_view", concurrency=2)
+    async def copy_view(job: JobContext) -> dict:
+        ...
+"""
+import asyncio
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from beanie import PydanticObjectId
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+from app.config import settings
+from app.models import Job
+
+
+@dataclass
+class JobType:
+    name: str
+    handler: Callable[["JobContext"], Awaitable[Optional[dict]]]
+    concurrency: int
+    max_attempts: int
+    cleanup: Optional[Callable[[Dict[str, Any]], Awaitable[None]]]  # after the job's final outcome
+
+
+class JobContext:
+    """What a handler sees of its job."""
+
+    def __init__(self, runner: "JobRunner", job: dict):
+        self._runner = runner
+        self.id: PydanticObjectId = job["_id"]
+        self.params: Dict[str, Any] = job.get("params") or {}
+        self.attempt: int = job["attempts"]
+        # Progress saved by a previous attempt (resume point), if any
+        self.checkpoint: Optional[Dict[str, Any]] = job.get("progress")
+
+    async def progress(self, progress: Dict[str, Any]):
+        """Record progress; it is shown by the status endpoint and kept as checkpoint for retries."""
+        await self._runner._update_owned(self.id, {"progress": progress})
+        self.checkpoint = progress
+
+
+class JobRunner:
+
+    def __init__(self, lease_seconds: float, poll_interval: float, retry_backoff: float):
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.retry_backoff = retry_backoff
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.types: Dict[str, JobType] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._workers: List[asyncio.Task] = []
+        self._stopping = False
+
+    # --------------------------
+    # Registration / enqueueing
+    # --------------------------
+    def register(self, name: str, concurrency: int = 1, max_attempts: int = 3, cleanup=None):
+        """Decorator registering the handler of a job type."""
+        def decorator(handler):
+            self.types[name] = JobType(name, handler, concurrency, max_attempts, cleanup)
+            return handler
+        return decorator
+
+    async def enqueue(self, job_type: str, params: Dict[str, Any]) -> Job:
+        if job_type not in self.types:
+            raise ValueError(f"Unknown job type '{job_type}'")
+        job = Job(type=job_type, params=params, maxAttempts=self.types[job_type].max_attempts)
+        await job.insert()
+        if job_type in self._wakeups:
+            self._wakeups[job_type].set()  # skip the poll wait on this process
+        return job
+
+    async def cancel(self, job_id: PydanticObjectId) -> Optional[dict]:
+        """
+        Cancel a job: a queued one right away, a running one by flagging it
+        (its worker notices on the next lease renewal). Finished jobs are
+        returned unchanged. Returns None if there is no such job.
+        """
+        collection = Job.get_motor_collection()
+        now = datetime.utcnow()
+        job = await collection.find_one_and_update(
+            {"_id": job_id, "status": "queued"},
+            {"$set": {"status": "cancelled", "finishedAt": now, "updatedAt": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is not None:
+            await self._cleanup(job)
+            return job
+        return await collection.find_one_and_update(
+            {"_id": job_id, "status": "running"},
+            {"$set": {"cancelRequested": True, "updatedAt": now}},
+            return_document=ReturnDocument.AFTER,
+        ) or await collection.find_one({"_id": job_id})
+
+    # --------------------------
+    # Workers
+    # --------------------------
+    async def _claim(self, job_type: JobType) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await Job.get_motor_collection().find_one_and_update(
+            {
+                "type": job_type.name,
+                "$or": [
+                    {"status": "queued", "runAfter": {"$lte": now}},
+                    {"status": "running", "leaseUntil": {"$lt": now}},  # its worker died
+                ],
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "leaseOwner": self.owner,
+                    "leaseUntil": now + timedelta(seconds=self.lease_seconds),
+                    "updatedAt": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("runAfter", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _update_owned(self, job_id: PydanticObjectId, fields: Dict[str, Any]) -> Optional[dict]:
+        """Update a job only while this worker still holds its lease."""
+        return await Job.get_motor_collection().find_one_and_update(
+            {"_id": job_id, "status": "running", "leaseOwner": self.owner},
+            {"$set": {**fields, "updatedAt": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _heartbeat(self, job_id: PydanticObjectId, task: asyncio.Task):
+        """Renew the lease; stop the handler if the job was cancelled or the lease lost."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                job = await self._update_owned(
+                    job_id, {"leaseUntil": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}
+                )
+            except Exception as e:
+                print(f"Job {job_id}: lease renewal failed: {e}")
+                continue
+            if job is None or job.get("cancelRequested"):
+                task.cancel()
+                return
+
+    async def _finish(self, job_type: JobType, job: dict, status: str, **fields):
+        now = datetime.utcnow()
+        updated = await self._update_owned(job["_id"], {
+            "status": status, "leaseOwner": None, "leaseUntil": None, "finishedAt": now, **fields,
+        })
+        if updated is not None:
+            await self._cleanup(updated)
+
+    async def _cleanup(self, job: dict):
+        job_type = self.types.get(job["type"])
+        if job_type and job_type.cleanup:
+            try:
+                await job_type.cleanup(job.get("params") or {})
+            except Exception as e:
+                print(f"Job {job['_id']}: cleanup failed: {e}")
+
+    async def _run(self, job_type: JobType, job: dict):
+        if job["attempts"] > job["maxAttempts"]:
+            # Reclaimed after its worker died on the last attempt
+            await self._finish(job_type, job, "failed", error=job.get("error") or "Lease expired")
+            return
+
+        task = asyncio.create_task(job_type.handler(JobContext(self, job)))
+        heartbeat = asyncio.create_task(self._heartbeat(job["_id"], task))
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():  # the runner is shutting down: hand the job back
+                task.cancel()
+                await Job.get_motor_collection().update_one(
+                    {"_id": job["_id"], "status": "running", "leaseOwner": self.owner},
+                    {
+                        "$set": {"status": "queued", "leaseOwner": None, "leaseUntil": None},
+                        "$inc": {"attempts": -1},  # this attempt does not count
+                    },
+                )
+                raise
+            await self._finish(job_type, job, "cancelled")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job["attempts"] < job["maxAttempts"]:
+                delay = self.retry_backoff * 2 ** (job["attempts"] - 1)
+                await self._update_owned(job["_id"], {
+                    "status": "queued",
+                    "leaseOwner": None,
+                    "leaseUntil": None,
+                    "runAfter": datetime.utcnow() + timedelta(seconds=delay),
+                    "error": error,
+                })
+                print(f"Job {job['_id']} ({job_type.name}) attempt {job['attempts']} failed, retry in {delay:.0f}s: {error}")
+            else:
+                await self._finish(job_type, job, "failed", error=error)
+                print(f"Job {job['_id']} ({job_type.name}) failed: {error}")
+        else:
+            await self._finish(job_type, job, "succeeded", result=result, error=None)
+        finally:
+            heartbeat.cancel()
+
+    async def _work(self, job_type: JobType):
+        wakeup = self._wakeups[job_type.name]
+        while not self._stopping:
+            try:
+                job = await self._claim(job_type)
+            except Exception as e:
+                print(f"Job claim failed ({job_type.name}): {e}")
+                job = None
+            if job is None:
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job_type, job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The job keeps its lease and is reclaimed once it expires
+                print(f"Job {job['_id']} ({job_type.name}): could not record outcome: {e}")
+
+    def start(self):
+        """Start `concurrency` worker tasks per registered job type."""
+        self._stopping = False
+        for job_type in self.types.values():
+            self._wakeups[job_type.name] = asyncio.Event()
+            for _ in range(job_type.concurrency):
+                self._workers.append(asyncio.create_task(self._work(job_type)))
+
+    @property
+    def running(self) -> bool:
+        """Whether this process runs workers (see the lifespan in app/main.py)."""
+        return bool(self._workers)
+
+    async def stop(self):
+        """Stop the workers; jobs still running are handed back to the queue."""
+        self._stopping = True
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+
+# Global runner instance
+job_runner = JobRunner(
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+    retry_backoff=settings.JOB_RETRY_BACKOFF,
+)
+job_handler = job_runner.register
+
+
+def require_job_workers():
+    """
+    Route dependency: 503 when this process runs no job workers
+    (JOBS_ENABLED=false, or a backend without jobs), rather than
+    accepting work that would sit in the queue.
+    """
+    if not job_runner.running:
+        raise HTTPException(status_code=503, detail="Background jobs are disabled on this server")
+
+
+def job_json(job: dict) -> dict:
+    """Public view of a raw job document."""
+    return {
+        "id": str(job["_id"]),
+        "type": job["type"],
+        "status": job["status"],
+        "cancelRequested": job.get("cancelRequested", False),
+        "attempts": job.get("attempts", 0),
+        "maxAttempts": job.get("maxAttempts"),
+        "progress": job.get("progress"),
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "runAfter": job.get("runAfter"),
+        "createdAt": job.get("createdAt"),
+        "updatedAt": job.get("updatedAt"),
+        "finishedAt": job.get("finishedAt"),
+    }
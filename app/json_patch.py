@@ -0,0 +1,81 @@
+"""
+JSON Patch (RFC 6902) generation for expanded views.
+
+`make_patch(src, dst)` returns the operations turning `src` into `dst`.
+Lists whose items are objects with unique "id" members (menus, entities)
+are diffed by id, so reordering or hiding an entity becomes a `move` or a
+`remove` plus the changed fields, not a rewrite of every following item.
+Other lists are replaced whole when they differ.
+"""
+from typing import Any, Dict, List, Optional
+
+Operation = Dict[str, Any]
+
+
+def _pointer(path: str, token: Any) -> str:
+    return f"{path}/{str(token).replace('~', '~0').replace('/', '~1')}"
+
+
+def _ids(items: list) -> Optional[List[Any]]:
+    """The items' ids if every item is an object with a distinct "id", else None."""
+    ids = []
+    for item in items:
+        if not isinstance(item, dict) or "id" not in item:
+            return None
+        ids.append(item["id"])
+    return ids if len(set(map(repr, ids))) == len(ids) else None
+
+
+def _diff_list_by_id(path: str, src: list, dst: list, ops: List[Operation]):
+    dst_ids = [item["id"] for item in dst]
+    keep = set(map(repr, dst_ids))
+    src_by_id = {repr(item["id"]): item for item in src}
+
+    # Simulate the array while emitting operations, so every index is valid when applied
+    work = [repr(item["id"]) for item in src]
+    for index in range(len(work) - 1, -1, -1):
+        if work[index] not in keep:
+            ops.append({"op": "remove", "path": _pointer(path, index)})
+            del work[index]
+
+    for index, item in enumerate(dst):
+        key = repr(item["id"])
+        if key in src_by_id:
+            current = work.index(key, index)
+            if current != index:
+                ops.append({"op": "move", "from": _pointer(path, current), "path": _pointer(path, index)})
+                work.insert(index, work.pop(current))
+        else:
+            ops.append({"op": "add", "path": _pointer(path, index), "value": item})
+            work.insert(index, key)
+
+    for index, item in enumerate(dst):
+        old = src_by_id.get(repr(item["id"]))
+        if old is not None:
+            _diff(_pointer(path, index), old, item, ops)
+
+
+def _diff(path: str, src: Any, dst: Any, ops: List[Operation]):
+    if type(src) is type(dst) and src == dst:
+        return
+    if isinstance(src, dict) and isinstance(dst, dict):
+        for key in src:
+            if key not in dst:
+                ops.append({"op": "remove", "path": _pointer(path, key)})
+        for key, value in dst.items():
+            if key in src:
+                _diff(_pointer(path, key), src[key], value, ops)
+            else:
+                ops.append({"op": "add", "path": _pointer(path, key), "value": value})
+        return
+    if isinstance(src, list) and isinstance(dst, list) and _ids(src) is not None and _ids(dst) is not None:
+        _diff_list_by_id(path, src, dst, ops)
+        return
+    ops.append({"op": "replace", "path": path, "value": dst})
+
+
+def make_patch(src: Any, dst: Any) -> List[Operation]:
+    """RFC 6902 operations turning the JSON document `src` into `dst`."""
+    ops: List[Operation] = []
+    _diff("", src, dst, ops)
+    return ops
@@ -0,0 +1,80 @@
+"""
+Bulk key rotation with an overlap window.
+
+Rotating envs issues a new key per env and schedules every other key of
+those envs for revocation `overlap` seconds later (EnvKey.revokeAt), so
+clients can switch to the new secret without downtime. Keys past their
+revokeAt are refused right away (see EnvKeyRepository.find_by_secret); the
+sweeper marks them revoked for good, all at once.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from app.config import settings
+from app.models import Env, EnvKey
+from app.repositories import repositories
+
+
+async def rotate_keys(envs: List[Env], created_by: str, overlap: float) -> Tuple[List[Tuple[EnvKey, str]], datetime, int]:
+    """
+    Issue a new key for each env and schedule the old ones for revocation.
+    Returns the new keys with their plain secrets, the revocation time and
+    the number of old keys scheduled.
+    """
+    scheme = settings.SECRET_HASH_SCHEME
+    issued = []
+    for env in envs:
+        secret = EnvKey.generate_secret()
+        key = EnvKey(envId=env, hashedSecret=EnvKey.hash_secret(secret, scheme), hashScheme=scheme, createdBy=created_by)
+        issued.append((key, secret))
+    await repositories.keys.insert_many([key for key, _ in issued])
+
+    revoke_at = datetime.utcnow() + timedelta(seconds=overlap)
+    scheduled = await repositories.keys.schedule_revocation(
+        [env.id for env in envs], revoke_at, keep=[key.id for key, _ in issued]
+    )
+    return issued, revoke_at, scheduled
+
+
+class KeyRevocationSweeper:
+    """Periodically revokes keys whose scheduled revocation time has passed."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def sweep(self) -> int:
+        """Revoke every key that is due. Returns the number of keys revoked."""
+        try:
+            revoked = await repositories.keys.revoke_due(datetime.utcnow())
+        except Exception as e:
+            print(f"Key revocation sweep failed: {e}")
+            return 0
+        if revoked:
+            print(f"Revoked {revoked} keys past their rotation overlap")
+        return revoked
+
+    async def _run(self):
+        while True:
+            await self.sweep()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the periodic sweep loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the sweep loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global sweeper instance
+key_sweeper = KeyRevocationSweeper(interval=settings.KEY_SWEEP_INTERVAL)
@@ -0,0 +1,79 @@
+"""
+Write-behind tracking of EnvKey usage (lastUsedAt, requestCount).
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from beanie import PydanticObjectId
+
+from app.config import settings
+from app.repositories import repositories
+
+
+class KeyUsageTracker:
+    """
+    Buffers key usage in memory and flushes it periodically in one batch
+    (a single unordered bulk_write of $max / $inc updates on MongoDB), so
+    the hot auth path never writes to the database.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        # key id -> (last used at, requests since last flush)
+        self._pending: Dict[PydanticObjectId, Tuple[datetime, int]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def record(self, key_id: PydanticObjectId):
+        """Record one request authenticated with the given key."""
+        _, count = self._pending.get(key_id, (None, 0))
+        self._pending[key_id] = (datetime.utcnow(), count + 1)
+
+    def pending(self, key_id: PydanticObjectId) -> Tuple[Optional[datetime], int]:
+        """Usage recorded for a key that has not been flushed yet."""
+        return self._pending.get(key_id, (None, 0))
+
+    async def flush(self) -> int:
+        """Write buffered usage to storage. Returns the number of keys flushed."""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+
+        try:
+            await repositories.keys.record_usage(batch)
+        except Exception as e:
+            # Put the batch back so it is retried on the next flush
+            for key_id, (last_used, count) in batch.items():
+                newer, more = self._pending.get(key_id, (last_used, 0))
+                self._pending[key_id] = (max(last_used, newer), count + more)
+            print(f"Key usage flush failed: {e}")
+            return 0
+        return len(batch)
+
+    async def _run(self):
+        # Never cancelled: a flush in flight holds a batch no longer in _pending
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def start(self):
+        """Start the periodic flush loop."""
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop once its current flush is done, then flush whatever is still buffered."""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+# Global tracker instance
+key_usage = KeyUsageTracker(interval=settings.KEY_USAGE_FLUSH_INTERVAL)
@@ -0,0 +1,96 @@
+"""
+Shared view layouts (see ViewLayout in app/models/views.py).
+
+Views written before layouts existed keep their menus inline; they are
+still served, but every copy stores (and caches) its own tree. The
+migration moves them onto shared layouts in batches. Each update is
+guarded by the view's version, so a view edited meanwhile is skipped and
+picked up by the next run.
+
+Layouts are never deleted by the app; `prune` removes the ones no view
+references any more (editing a view leaves its old layout behind).
+
+From the command line:
+    python -m app.layouts migrate [batch size]
+    python -m app.layouts prune [grace hours]
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from typing import List
+
+from pymongo import UpdateOne
+
+from app.models import View, ViewLayout
+from app.models.views import ViewMenuMap, master_ids, latest_master_revisions
+
+
+async def migrate_views(batch_size: int = 500) -> dict:
+    """Point every view with inline menus at a shared layout. Returns counts."""
+    collection = View.get_motor_collection()
+    layouts = set()
+    migrated = skipped = 0
+
+    async def flush(docs: List[dict]):
+        nonlocal migrated, skipped
+        trees = [[ViewMenuMap.model_validate(menu) for menu in doc.get("menus") or []] for doc in docs]
+        # Expansions of layout views are keyed by the revision of the masters they render
+        revisions = await latest_master_revisions(master for menus in trees for master in master_ids(menus))
+        ops = []
+        for doc, menus in zip(docs, trees):
+            layout = ViewLayout.hash(menus)
+            if layout not in layouts:
+                await ViewLayout.store(menus)
+                layouts.add(layout)
+            rendered = max((revisions.get(master, 0) for master in master_ids(menus)), default=0)
+            # $max: a master written meanwhile finds the view inline and raises it itself
+            ops.append(UpdateOne(
+                {"_id": doc["_id"], "version": doc.get("version"), "layout": None},
+                {"$set": {"layout": layout, "menus": []}, "$max": {"mastersRevision": rendered}},
+            ))
+        result = await collection.bulk_write(ops, ordered=False)
+        migrated += result.modified_count
+        skipped += len(ops) - result.modified_count
+
+    docs = []
+    async for doc in collection.find({"layout": None}, {"menus": 1, "version": 1}):
+        docs.append(doc)
+        if len(docs) >= batch_size:
+            await flush(docs)
+            docs = []
+    if docs:
+        await flush(docs)
+
+    return {"views": migrated, "skipped": skipped, "layouts": len(layouts)}
+
+
+async def prune_layouts(grace: timedelta = timedelta(hours=1)) -> int:
+    """
+    Delete layouts no view references. Layouts stored within `grace` are
+    kept: a writer may be about to insert the view that references it.
+    Returns the number of layouts deleted.
+    """
+    used = await View.get_motor_collection().distinct("layout", {"layout": {"$type": "string"}})
+    result = await ViewLayout.get_motor_collection().delete_many({
+        "_id": {"$nin": used},
+        "storedAt": {"$lt": datetime.utcnow() - grace},
+    })
+    return result.deleted_count
+
+
+async def _main(argv: List[str]):
+    from app.database import init_database
+
+    if not argv or argv[0] not in ("migrate", "prune") or len(argv) > 2:
+        print("usage: python -m app.layouts migrate [batch size] | prune [grace hours]")
+        sys.exit(2)
+    await init_database()
+    if argv[0] == "migrate":
+        print(await migrate_views(*(int(arg) for arg in argv[1:])))
+    else:
+        grace = timedelta(hours=float(argv[1])) if len(argv) > 1 else timedelta(hours=1)
+        print({"deleted": await prune_layouts(grace)})
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1:]))
@@ -0,0 +1,206 @@
+"""
+Event-loop lag monitor and blocking-call detector.
+
+A coroutine wakes up every `interval` seconds and records how late it was
+scheduled (event-loop lag) in a histogram. A watchdog thread watches the
+coroutine's heartbeat; when the loop has been stuck for longer than
+`threshold`, it captures the stack of the loop thread - i.e. the code that
+is blocking - and attributes it to the route of the task being run.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from datetime import datetime
+from typing import Deque, Optional
+
+from app.config import settings
+
+# Upper bounds (seconds) of the lag histogram buckets
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class LagHistogram:
+    """Cumulative histogram of event-loop lag, Prometheus style."""
+
+    def __init__(self, buckets=LAG_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"buckets": buckets, "sum": self.sum, "count": self.count, "max": self.max}
+
+    def to_prometheus(self, name: str) -> str:
+        lines = [f"# HELP {name} Event loop scheduling lag in seconds.", f"# TYPE {name} histogram"]
+        for bound, cumulative in self.to_dict()["buckets"].items():
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum {self.sum}")
+        lines.append(f"{name}_count {self.count}")
+        return "\n".join(lines) + "\n"
+
+
+class LoopMonitor:
+    """Measures event-loop lag and captures stacks of blocking calls."""
+
+    def __init__(self, interval: float, threshold: float, max_events: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self.histogram = LagHistogram()
+        self.events: Deque[dict] = deque(maxlen=max_events)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._pending_event: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        # task -> ASGI scope of the request it serves (see LoopMonitorMiddleware)
+        self._task_scopes: "weakref.WeakKeyDictionary[asyncio.Task, dict]" = weakref.WeakKeyDictionary()
+
+    # --------------------------
+    # Request attribution
+    # --------------------------
+    def track_request(self, scope: dict):
+        task = asyncio.current_task()
+        if task is not None:
+            self._task_scopes[task] = scope
+
+    def untrack_request(self):
+        task = asyncio.current_task()
+        if task is not None:
+            self._task_scopes.pop(task, None)
+
+    def _active_route(self) -> Optional[str]:
+        task = asyncio.current_task(self._loop)
+        scope = self._task_scopes.get(task) if task is not None else None
+        if scope is None:
+            return None
+        route = scope.get("route")  # set by the FastAPI router once matched
+        path = getattr(route, "path", None) or scope.get("path")
+        return f"{scope.get('method', '')} {path}".strip()
+
+    # --------------------------
+    # Monitor coroutine + watchdog thread
+    # --------------------------
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.histogram.observe(lag)
+
+            event, self._pending_event = self._pending_event, None
+            if event is not None:
+                event["lagSeconds"] = round(lag, 4)
+            elif lag >= self.threshold:
+                # Blocked in a way the watchdog did not catch in time
+                self._record({"lagSeconds": round(lag, 4), "route": None, "stack": None})
+
+    def _watch(self):
+        poll = max(self.threshold / 4, 0.005)
+        captured_for = None
+        while not self._stopped.wait(poll):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.threshold or captured_for == heartbeat:
+                continue
+            captured_for = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            event = {
+                "lagSeconds": round(stalled, 4),  # updated once the loop resumes
+                "route": self._active_route(),
+                "stack": traceback.format_stack(frame),
+            }
+            self._pending_event = event
+            self._record(event)
+
+    def _record(self, event: dict):
+        event["at"] = datetime.utcnow()
+        self.events.append(event)
+        location = event["stack"][-1].strip().splitlines()[0] if event["stack"] else "unknown"
+        print(f"Event loop blocked for >= {event['lagSeconds']}s on route {event['route']}: {location}")
+
+    def start(self):
+        """Start monitoring the running loop (call from the lifespan)."""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        if settings.DEBUG and settings.LOOP_SLOW_CALLBACK_DEBUG:
+            # asyncio logs every callback that runs longer than this
+            self._loop.set_debug(True)
+            self._loop.slow_callback_duration = self.threshold
+
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "intervalSeconds": self.interval,
+            "thresholdSeconds": self.threshold,
+            "lag": self.histogram.to_dict(),
+            "blockingEvents": list(self.events),
+        }
+
+
+class LoopMonitorMiddleware:
+    """Pure ASGI middleware that lets the monitor attribute stalls to routes."""
+
+    def __init__(self, app, monitor: LoopMonitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        self.monitor.track_request(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.untrack_request()
+
+
+# Global monitor instance
+loop_monitor = LoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL,
+    threshold=settings.LOOP_LAG_THRESHOLD,
+)
@@ -3,23 +3,55 @@ FastAPI MongoDB Server with Beanie ODM - Main Application.
 """
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.compression import SelectiveGZipMiddleware
 from app.config import settings
-from app.database import init_database, close_database
-from app.routers import health, items, envs, views, getView
+from app.database import init_database, close_database, require_mongo
+from app.jobs import job_runner
+from app.key_rotation import key_sweeper
+from app.key_usage import key_usage
+from app.view_events import view_events
+from app.loop_monitor import loop_monitor, LoopMonitorMiddleware
+from app.snapshot import require_database, snapshot_store
+from app.routers import health, items, envs, views, getView, debug, jobs
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events."""
     # Startup
-    await init_database()
-    print("Database initialized successfully!")
+    settings.check()
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    if settings.SNAPSHOT_MODE != "off":
+        try:
+            snapshot_store.open(settings.SNAPSHOT_PATH)
+            print(f"Snapshot loaded: {settings.SNAPSHOT_PATH}")
+        except (OSError, ValueError) as e:
+            if settings.SNAPSHOT_MODE == "only":
+                raise
+            print(f"Snapshot not loaded ({e}); fallback disabled")
+    if settings.SNAPSHOT_MODE != "only":
+        await init_database()
+        print("Database initialized successfully!")
+    key_usage.start()
+    if settings.SNAPSHOT_MODE != "only":
+        key_sweeper.start()
+        view_events.start()
+    run_jobs = settings.JOBS_ENABLED and settings.STORAGE_BACKEND == "mongo" and settings.SNAPSHOT_MODE != "only"
+    if run_jobs:
+        job_runner.start()
     yield
     # Shutdown (cleanup if needed)
+    if run_jobs:
+        await job_runner.stop()  # running jobs go back to the queue
+    await view_events.stop()
+    await key_sweeper.stop()
+    await key_usage.stop()  # flush buffered key usage before the client goes away
     await close_database()
+    await loop_monitor.stop()
     print("Application shutdown complete.")
 
 
@@ -48,12 +80,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers
+# Compress dynamic responses; cached payloads are precompressed (app/compression.py)
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    exclude_paths=[getView.EVENTS_PATH],
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    compresslevel=settings.GZIP_LEVEL,
+)
+
+if settings.LOOP_MONITOR_ENABLED:
+    app.add_middleware(LoopMonitorMiddleware, monitor=loop_monitor)
+
+if settings.PROFILER_ENABLED:
+    from app.profiler import ProfilerMiddleware
+    app.add_middleware(ProfilerMiddleware)
+
+# Include routers (with SNAPSHOT_MODE=only, those needing the database answer 503)
+needs_database = [Depends(require_database)]
 app.include_router(health.router)
-app.include_router(items.router)
-app.include_router(envs.router)
-app.include_router(views.router)
+app.include_router(items.router, dependencies=needs_database)
+app.include_router(envs.router, dependencies=needs_database)
+app.include_router(views.router, dependencies=needs_database)
 app.include_router(getView.router)
+app.include_router(jobs.router, dependencies=needs_database + [Depends(require_mongo)])
+if settings.PROFILER_ENABLED:
+    app.include_router(debug.router)
 
 
 if __name__ == "__main__":
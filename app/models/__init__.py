@@ -1,7 +1,9 @@
 from .item import Item
 from .envs import Env, EnvKey
 from .views import View
-from .views import MenuMaster, SubMenuMaster
+from .views import MenuMaster, SubMenuMaster, MasterTombstone, ViewLayout
+from .counters import Counter
+from .jobs import Job
 
 
-__all__ = ["Item", "Env", "EnvKey", "Mapping", "View", "MenuMaster", "SubMenuMaster"]
\ No newline at end of file
+__all__ = ["Item", "Env", "EnvKey", "Mapping", "View", "MenuMaster", "SubMenuMaster", "MasterTombstone", "ViewLayout", "Counter", "Job"]
\ No newline at end of file
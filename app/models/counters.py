@@ -0,0 +1,31 @@
+from beanie import Document
+from pymongo import ReturnDocument
+
+
+# ------------------------------
+# Counter model
+# ------------------------------
+class Counter(Document):
+    """Named monotonic sequences, one document per sequence."""
+    id: str
+    seq: int = 0
+
+    class Settings:
+        name = "counters"
+
+    @classmethod
+    async def next(cls, name: str) -> int:
+        """Atomically advance the sequence and return its new value."""
+        counter = await cls.get_motor_collection().find_one_and_update(
+            {"_id": name},
+            {"$inc": {"seq": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return counter["seq"]
+
+    @classmethod
+    async def current(cls, name: str) -> int:
+        """The sequence's latest value (0 if it was never advanced)."""
+        counter = await cls.get_motor_collection().find_one({"_id": name})
+        return counter["seq"] if counter else 0
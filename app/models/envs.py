@@ -1,10 +1,17 @@
 from datetime import datetime
 from typing import Optional
-from beanie import Document, Link
+from beanie import Document, Link, PydanticObjectId
 from pydantic import Field
 from passlib.hash import argon2
+import hashlib
+import hmac
 import secrets
-from pymongo import IndexModel, ASCENDING
+from pymongo import IndexModel, ASCENDING, ReturnDocument
+
+from app.config import settings
+
+HASH_SCHEME_ARGON2 = "argon2"
+HASH_SCHEME_HMAC = "hmac-sha256"
 
 
 # ---------------------------
@@ -16,6 +23,7 @@ class Env(Document):
     description: Optional[str]
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     createdBy: str
+    viewsRevision: int = 0  # bumped whenever a view in this env is edited/activated
 
     class Settings:
         name = "envs"  # Mongo collection name
@@ -23,6 +31,17 @@ class Env(Document):
             IndexModel([("slug", ASCENDING)], unique=True)
         ]
 
+    @classmethod
+    async def bump_views_revision(cls, env_id: PydanticObjectId) -> int:
+        """Increment the per-env view change counter and return the new value."""
+        env = await cls.get_motor_collection().find_one_and_update(
+            {"_id": env_id},
+            {"$inc": {"viewsRevision": 1}},
+            projection={"viewsRevision": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        return env["viewsRevision"] if env else 0
+
 
 # ---------------------------
 # EnvKey Collection
@@ -30,12 +49,25 @@ class Env(Document):
 class EnvKey(Document):
     envId: Link[Env]
     hashedSecret: str
+    hashScheme: str = Field(default=HASH_SCHEME_ARGON2)  # argon2 | hmac-sha256
     status: str = Field(default="active")  # active | inactive | revoked
     createdAt: datetime = Field(default_factory=datetime.utcnow)
     createdBy: str
+    lastUsedAt: Optional[datetime] = None  # maintained write-behind (see app.key_usage)
+    requestCount: int = 0
+    revokeAt: Optional[datetime] = None  # scheduled revocation after a rotation (see app.key_rotation)
 
     class Settings:
         name = "envKeys"
+        indexes = [
+            IndexModel([("hashedSecret", ASCENDING)]),
+            IndexModel([("envId.$id", ASCENDING)]),
+            IndexModel([("revokeAt", ASCENDING)], sparse=True),
+        ]
+
+    def revocation_due(self, now: Optional[datetime] = None) -> bool:
+        """Whether the key's scheduled revocation time has passed (it may not be swept yet)."""
+        return self.revokeAt is not None and self.revokeAt <= (now or datetime.utcnow())
 
     # -----------------------
     # Secret management utils
@@ -47,11 +79,20 @@ class EnvKey(Document):
         return secrets.token_urlsafe(length)
 
     @staticmethod
-    def hash_secret(secret: str) -> str:
-        """Hash a secret using argon2."""
+    def hash_secret(secret: str, scheme: str = HASH_SCHEME_ARGON2) -> str:
+        """
+        Hash a secret.
+        - argon2: salted, slow; meant for low-entropy passwords
+        - hmac-sha256: keyed with the server-side pepper; secrets from
+          `generate_secret` are 256-bit random, so a fast keyed hash is enough
+        """
+        if scheme == HASH_SCHEME_HMAC:
+            return hmac.new(settings.SECRET_PEPPER.encode(), secret.encode(), hashlib.sha256).hexdigest()
         return argon2.hash(secret)
 
     @staticmethod
-    def verify_secret(secret: str, hashed: str) -> bool:
+    def verify_secret(secret: str, hashed: str, scheme: str = HASH_SCHEME_ARGON2) -> bool:
         """Verify secret against stored hash."""
+        if scheme == HASH_SCHEME_HMAC:
+            return hmac.compare_digest(EnvKey.hash_secret(secret, HASH_SCHEME_HMAC), hashed)
         return argon2.verify(secret, hashed)
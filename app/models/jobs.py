@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Any, Dict, Literal, Optional
+
+from beanie import Document
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+
+
+# ------------------------------
+# Job model (background work queue, see app/jobs.py)
+# ------------------------------
+class Job(Document):
+    type: str
+    params: Dict[str, Any] = {}
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"] = "queued"
+    attempts: int = 0
+    maxAttempts: int = 3
+    runAfter: datetime = Field(default_factory=datetime.utcnow)  # not claimed before (retry backoff)
+    leaseOwner: Optional[str] = None  # worker currently running the job
+    leaseUntil: Optional[datetime] = None  # reclaimed by another worker after this
+    cancelRequested: bool = False
+    progress: Optional[Dict[str, Any]] = None  # handler-defined; also its resume checkpoint
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    createdAt: datetime = Field(default_factory=datetime.utcnow)
+    updatedAt: datetime = Field(default_factory=datetime.utcnow)
+    finishedAt: Optional[datetime] = None
+
+    class Settings:
+        name = "jobs"
+        indexes = [
+            IndexModel([("type", ASCENDING), ("status", ASCENDING), ("runAfter", ASCENDING)]),
+            IndexModel([("type", ASCENDING), ("status", ASCENDING), ("leaseUntil", ASCENDING)]),
+        ]
@@ -1,45 +1,161 @@
-from datetime import datetime
-from typing import List, Optional
+import hashlib
+import json
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple, Union
 from beanie import Document, Link, PydanticObjectId
+from beanie.odm.utils.encoder import Encoder
 from pydantic import BaseModel, Field
 from typing import Literal
 
+from app.config import settings
+from app.read_routing import ReadRoutedDocument
+from .counters import Counter
 from .envs import Env
-from pymongo import IndexModel, ASCENDING
+from pymongo import IndexModel, ASCENDING, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+# Menu and SubMenu masters share one revision sequence (incremental catalog sync)
+MASTERS_SEQUENCE = "masters"
+# Seconds within which a master write lands after taking its revision (see masters_revision)
+MASTER_WRITE_SETTLE = 5
+
 
 # ------------------------------
 # SubMenuMaster model
 # ------------------------------
-class SubMenuMaster(Document):
+class SubMenuMaster(ReadRoutedDocument, Document):
     name: str = Field(unique=True)
     label: str
     link: str
     icon: Optional[str]
     visible: bool = True
     createdAt: datetime = Field(default_factory=datetime.utcnow)
+    updatedAt: Optional[datetime] = None
+    revision: int = 0  # catalog revision of the last write (see stamp_master)
 
     class Settings:
         name = "subMenuMaster"  # collection name
         indexes = [
-            IndexModel([("name", ASCENDING)], unique=True)
+            IndexModel([("name", ASCENDING)], unique=True),
+            IndexModel([("revision", ASCENDING)]),
         ]
 
 
 # ------------------------------
 # MenuMaster model
 # ------------------------------
-class MenuMaster(Document):
+class MenuMaster(ReadRoutedDocument, Document):
     name: str = Field(unique=True)
     label: str
     icon: Optional[str]
     createdAt: datetime = Field(default_factory=datetime.utcnow)
+    updatedAt: Optional[datetime] = None
+    revision: int = 0  # catalog revision of the last write (see stamp_master)
 
     class Settings:
         name = "menuMaster"
         indexes = [
-            IndexModel([("name", ASCENDING)], unique=True)
+            IndexModel([("name", ASCENDING)], unique=True),
+            IndexModel([("revision", ASCENDING)]),
         ]
 
+
+# ------------------------------
+# Deleted masters (incremental catalog sync)
+# ------------------------------
+class MasterTombstone(Document):
+    kind: Literal["menu", "subMenu"]
+    masterId: PydanticObjectId
+    revision: int
+    deletedAt: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "masterTombstones"
+        indexes = [
+            IndexModel([("revision", ASCENDING)])
+        ]
+
+
+async def next_master_revision() -> int:
+    """
+    Take the next catalog revision, for a master write made right after it.
+    One $inc on the counter, so writers never wait for each other; the time
+    it was taken lets readers tell whether that write may still be landing
+    (see masters_revision).
+    """
+    counter = await Counter.get_motor_collection().find_one_and_update(
+        {"_id": MASTERS_SEQUENCE},
+        {"$inc": {"seq": 1}, "$set": {"takenAt": datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter["seq"]
+
+
+async def stamp_master(master: Union[MenuMaster, SubMenuMaster]) -> int:
+    """Give a master the next catalog revision; write it right after."""
+    master.revision = await next_master_revision()
+    master.updatedAt = datetime.utcnow()
+    return master.revision
+
+
+async def masters_revision() -> Tuple[int, bool]:
+    """
+    The catalog revision up to which every master write is visible, and
+    whether it is settled (no revision was taken in the last
+    MASTER_WRITE_SETTLE seconds). Until then, writes of recent revisions may
+    land out of order, so the revision is the latest one written before
+    that window: every revision below it was taken earlier still.
+    """
+    counter = await Counter.get_motor_collection().find_one({"_id": MASTERS_SEQUENCE})
+    if counter is None:
+        return 0, True
+    cutoff = datetime.utcnow() - timedelta(seconds=MASTER_WRITE_SETTLE)
+    if counter.get("takenAt") is None or counter["takenAt"] <= cutoff:
+        return counter["seq"], True
+
+    revision = 0
+    for document, written_at in ((MenuMaster, "updatedAt"), (SubMenuMaster, "updatedAt"), (MasterTombstone, "deletedAt")):
+        latest = await document.get_motor_collection().find_one(
+            {written_at: {"$lt": cutoff}}, {"revision": 1}, sort=[("revision", -1)]
+        )
+        if latest:
+            revision = max(revision, latest.get("revision") or 0)
+    return revision, False
+
+
+async def latest_master_revisions(ids: Iterable[PydanticObjectId]) -> Dict[PydanticObjectId, int]:
+    """Revision of the latest write (edit or delete) of each of these masters."""
+    ids = list(set(ids))
+    revisions: Dict[PydanticObjectId, int] = {}
+    if not ids:
+        return revisions
+    for collection in (MenuMaster.get_motor_collection(), SubMenuMaster.get_motor_collection()):
+        async for doc in collection.find({"_id": {"$in": ids}}, {"revision": 1}):
+            revisions[doc["_id"]] = doc.get("revision") or 0
+    async for doc in MasterTombstone.get_motor_collection().find({"masterId": {"$in": ids}}, {"masterId": 1, "revision": 1}):
+        revisions[doc["masterId"]] = max(revisions.get(doc["masterId"], 0), doc["revision"])
+    return revisions
+
+
+def master_ids(menus: List["ViewMenuMap"]) -> List[PydanticObjectId]:
+    """Ids of the menu and sub-menu masters the menus reference."""
+    return [m.menuId for m in menus] + [sm.subMenuId for m in menus for sm in m.subMenus]
+
+
+async def rendered_masters_revision(menus: List["ViewMenuMap"]) -> int:
+    """
+    Revision of the latest write of the masters the menus reference. Every
+    master write takes a revision above all earlier ones, so it changes
+    whenever what the menus render does.
+    """
+    return max((await latest_master_revisions(master_ids(menus))).values(), default=0)
+
+# Catalog sync bookkeeping, left out of expanded views
+_SYNC_FIELDS = {"revision", "updatedAt"}
+
+
 # ------------------------------
 # Embedded mapping inside View
 # ------------------------------
@@ -55,31 +171,268 @@ class ViewMenuMap(BaseModel):
     subMenus: List[ViewSubMenuMap] = []
 
 
+# ------------------------------
+# Shared layouts
+# ------------------------------
+# Copied views have identical menu trees, so trees are stored once in
+# viewLayouts, keyed by a hash of their content, and views point at them.
+# Layouts never change once written; editing a view gives it a new layout.
+_layout_cache: "OrderedDict[str, List[ViewMenuMap]]" = OrderedDict()
+
+
+def _menus_bson(menus: List[ViewMenuMap]) -> List[dict]:
+    """Menus as stored (model_dump would turn the ObjectIds into strings)."""
+    return Encoder().encode(menus)
+
+
+def _render_order(entry: Union[ViewMenuMap, ViewSubMenuMap]):
+    return entry.order is None, entry.order or 0
+
+
+class ViewLayout(Document):
+    id: str  # sha256 of the normalized menus (see ViewLayout.hash)
+    menus: List[ViewMenuMap] = []
+    storedAt: datetime = Field(default_factory=datetime.utcnow)  # last time a writer referenced it
+
+    class Settings:
+        name = "viewLayouts"
+        indexes = [
+            IndexModel([("menus.menuId", ASCENDING)]),
+            IndexModel([("menus.subMenus.subMenuId", ASCENDING)]),
+        ]
+
+    @staticmethod
+    def normalize(menus: List[ViewMenuMap]) -> List[ViewMenuMap]:
+        """
+        Menus and their subMenus in render order. The sort is stable, like
+        the one in expand_full, so normalizing never changes the expansion.
+        """
+        return [
+            menu.model_copy(update={"subMenus": sorted(menu.subMenus, key=_render_order)})
+            for menu in sorted(menus, key=_render_order)
+        ]
+
+    @classmethod
+    def hash(cls, menus: List[ViewMenuMap]) -> str:
+        tree = [menu.model_dump(mode="json") for menu in cls.normalize(menus)]
+        return hashlib.sha256(json.dumps(tree, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+    @classmethod
+    async def store(cls, menus: List[ViewMenuMap]) -> str:
+        """Store a menu tree (once per distinct content) and return its layout id."""
+        normalized = cls.normalize(menus)
+        layout_id = cls.hash(normalized)
+        await cls.get_motor_collection().update_one(
+            {"_id": layout_id},
+            {
+                "$setOnInsert": {"menus": _menus_bson(normalized)},
+                "$set": {"storedAt": datetime.utcnow()},
+            },
+            upsert=True,
+        )
+        _cache_layout(layout_id, normalized)
+        return layout_id
+
+    @classmethod
+    async def fetch_many(cls, layout_ids: Iterable[str]) -> Dict[str, List[ViewMenuMap]]:
+        """
+        Menu trees by layout id, from the process cache when possible.
+        Every caller gets the same list for a layout; treat it as read-only.
+        """
+        layouts = {}
+        missing = []
+        for layout_id in layout_ids:
+            if layout_id in _layout_cache:
+                _layout_cache.move_to_end(layout_id)
+                layouts[layout_id] = _layout_cache[layout_id]
+            else:
+                missing.append(layout_id)
+        if missing:
+            async for doc in cls.get_motor_collection().find({"_id": {"$in": missing}}, {"menus": 1}):
+                menus = [ViewMenuMap.model_validate(menu) for menu in doc.get("menus") or []]
+                layouts[doc["_id"]] = _cache_layout(doc["_id"], menus)
+        return layouts
+
+
+def _cache_layout(layout_id: str, menus: List[ViewMenuMap]) -> List[ViewMenuMap]:
+    menus = _layout_cache.setdefault(layout_id, menus)
+    _layout_cache.move_to_end(layout_id)
+    while len(_layout_cache) > settings.LAYOUT_CACHE_SIZE:
+        _layout_cache.popitem(last=False)
+    return menus
+
+
 # ------------------------------
 # View model (mapping)
 # ------------------------------
-class View(Document):
+# At most one active view per env and name, and per env and viewId, so the
+# secure-view lookup (by name or viewId) has a single match. Activating a
+# view deactivates the others of its name; an active view of another name
+# with the same viewId makes the activation fail (ActiveViewConflict).
+# Created by View.ensure_active_indexes; `python -m app.active_views`
+# resolves data written before they existed.
+ACTIVE_VIEW_INDEXES = [("name", "one_active_view_per_name"), ("viewId", "one_active_view_per_view_id")]
+
+
+class ActiveViewConflict(Exception):
+    """An active view of another name in the same env has the viewId."""
+
+
+class VersionConflict(Exception):
+    """The view is no longer at the version an edit was based on."""
+
+    def __init__(self, expected: int, current: int):
+        super().__init__(f"Version conflict: expected {expected}, current is {current}")
+        self.expected = expected
+        self.current = current
+
+
+class EditRejected(Exception):
+    """An edit does not apply to the view's menus (e.g. names a menu it does not have)."""
+
+
+def _violates(error: DuplicateKeyError, key: str, index: str) -> bool:
+    """Whether a duplicate key error comes from the unique index on `key`."""
+    details = error.details or {}
+    return key in (details.get("keyPattern") or {}) or index in details.get("errmsg", str(error))
+
+
+def _supports_transactions(collection) -> bool:
+    topology = getattr(collection.database.client, "topology_description", None)
+    return topology is not None and topology.topology_type_name in ("ReplicaSetWithPrimary", "Sharded")
+
+
+async def _activate_in_transaction(collection, view_id: PydanticObjectId, siblings: dict):
+    async with await collection.database.client.start_session() as session:
+        async with session.start_transaction():
+            try:
+                # Ordered, in one round trip: the siblings make way for the view
+                await collection.bulk_write([
+                    UpdateMany(siblings, {"$set": {"status": "inactive"}}),
+                    UpdateOne({"_id": view_id}, {"$set": {"status": "active"}}),
+                ], ordered=True, session=session)
+            except BulkWriteError as e:
+                error = e.details["writeErrors"][0]
+                if error["code"] == 11000:
+                    raise DuplicateKeyError(error.get("errmsg", ""), 11000, error)
+                raise
+
+
+async def _activate_in_turn(collection, view_id: PydanticObjectId, siblings: dict):
+    deactivated = await collection.find_one_and_update(siblings, {"$set": {"status": "inactive"}}, projection={"_id": 1})
+    try:
+        await collection.update_one({"_id": view_id}, {"$set": {"status": "active"}})
+    except DuplicateKeyError:
+        if deactivated:
+            try:
+                await collection.update_one(
+                    {"_id": deactivated["_id"], "status": "inactive"}, {"$set": {"status": "active"}}
+                )
+            except DuplicateKeyError:
+                pass  # another view of the name was activated meanwhile
+        raise
+
+
+class View(ReadRoutedDocument, Document):
     env: Link[Env]
     viewId: int
     name: str
-    menus: List[ViewMenuMap] = []
+    menus: List[ViewMenuMap] = []  # not stored when `layout` is set (see load_layouts)
+    layout: Optional[str] = None  # ViewLayout id
     status: Literal["draft", "active", "inactive"] = "draft"
+    version: int = 0  # bumped on every in-place edit (optimistic concurrency)
+    mastersRevision: int = 0  # catalog revision of the last master change the view renders
     createdAt: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "view"
+        indexes = [
+            IndexModel([("layout", ASCENDING)]),
+        ]
+
+    @property
+    def env_id(self) -> PydanticObjectId:
+        """Id of the owning env, whether or not the link has been fetched."""
+        return self.env.id if isinstance(self.env, Env) else self.env.ref.id
+
+    @property
+    def expansion_key(self) -> Tuple[Hashable, int]:
+        """
+        (cache key, version) of the expanded JSON. Views on the same layout
+        with the same viewId and name expand identically, so they share a key
+        (whatever their env) that changes with the masters they render.
+        """
+        if self.layout:
+            return ("layout", self.layout, self.viewId, self.name, self.mastersRevision), 0
+        return self.id, (self.version, self.mastersRevision)
 
     # --------------------------
     # METHODS
     # --------------------------
 
-    async def expand_full(self) -> dict:
+    async def insert_with_layout(self) -> "View":
+        """
+        Insert the view with its menus stored as a shared layout, and with
+        the revision of the masters they render (rendered_masters_revision).
+        """
+        menus = self.menus
+        if self.layout is None:
+            self.layout = await ViewLayout.store(menus)
+        elif not menus:
+            menus = (await ViewLayout.fetch_many([self.layout])).get(self.layout, [])
+        self.mastersRevision = max(self.mastersRevision, await rendered_masters_revision(menus))
+        self.menus = []
+        try:
+            await self.insert()
+        finally:
+            self.menus = menus
+        # A master written since was stamped on the views using it before this one existed
+        revision = await rendered_masters_revision(menus)
+        if revision > self.mastersRevision:
+            await self.get_motor_collection().update_one({"_id": self.id}, {"$max": {"mastersRevision": revision}})
+            self.mastersRevision = revision
+        return self
+
+    @classmethod
+    async def load_layouts(cls, views: List["View"]):
+        """Fill in the menus of views stored as a layout; views on one layout share the list."""
+        layout_ids = {v.layout for v in views if v.layout and not v.menus}
+        if not layout_ids:
+            return
+        layouts = await ViewLayout.fetch_many(layout_ids)
+        for view in views:
+            if view.layout in layouts and not view.menus:
+                view.menus = layouts[view.layout]
+
+    @classmethod
+    async def using_master(cls, field: str, master_id: PydanticObjectId) -> dict:
+        """
+        Query for the views rendering a master, where `field` is its path in
+        the menu tree ("menus.menuId" or "menus.subMenus.subMenuId"): views
+        holding it inline and views whose layout holds it.
+        """
+        layout_ids = await ViewLayout.get_motor_collection().distinct("_id", {field: master_id})
+        return {"$or": [{field: master_id}, {"layout": {"$in": layout_ids}}]}
+
+    async def expand_full(
+        self,
+        menu_masters: Optional[Dict[PydanticObjectId, MenuMaster]] = None,
+        sub_menu_masters: Optional[Dict[PydanticObjectId, SubMenuMaster]] = None,
+    ) -> dict:
         """
         Build the full JSON (view -> menus -> subMenus).
         - Mapping-level visible overrides SubMenuMaster.visible
         - Menus and subMenus are sorted by order
+        - Masters can be passed in (see `ViewRepository.load_masters`);
+          otherwise they are fetched for this view only
         """
         from copy import deepcopy
+        from app.repositories import repositories
+
+        if self.layout and not self.menus:
+            await View.load_layouts([self])
+        if menu_masters is None or sub_menu_masters is None:
+            menu_masters, sub_menu_masters = await repositories.views.load_masters([self])
 
         view_data = {
             "id": str(self.viewId),
@@ -88,21 +441,21 @@ class View(Document):
         }
 
         for m in sorted(self.menus, key=lambda x: x.order):
-            menu_doc = await MenuMaster.get(m.menuId)
+            menu_doc = menu_masters.get(m.menuId)
             if not menu_doc:
                 continue
 
-            menu_data = deepcopy(menu_doc.dict())
+            menu_data = deepcopy(menu_doc.dict(exclude=_SYNC_FIELDS))
             menu_data["id"] = str(menu_doc.id)
             menu_data["order"] = m.order
             menu_data["entities"] = []  # keep "entities" in JSON
 
             for sm in sorted(m.subMenus, key=lambda x: x.order):
-                sub_menu_doc = await SubMenuMaster.get(sm.subMenuId)
+                sub_menu_doc = sub_menu_masters.get(sm.subMenuId)
                 if not sub_menu_doc:
                     continue
 
-                sub_menu_data = deepcopy(sub_menu_doc.dict())
+                sub_menu_data = deepcopy(sub_menu_doc.dict(exclude=_SYNC_FIELDS))
                 sub_menu_data["id"] = str(sub_menu_doc.id)
                 sub_menu_data["order"] = sm.order
 
@@ -128,15 +481,158 @@ class View(Document):
 
     async def set_active(self):
         """
-        Mark this view as active, and deactivate any other view
-        with the same env and name.
+        Mark this view as active, and deactivate any other active view of
+        the same env with the same name.
         """
-        await View.find({
-            "env": self.env,
-            "name": self.name,
-            "status": "active",
-            "_id": {"$ne": self.id}
-        }).update({"$set": {"status": "inactive"}})
-
+        await self._activate(self.id, self.env_id, self.name, self.viewId)
         self.status = "active"
-        await self.save()
+
+    @classmethod
+    async def activate(cls, view_id: PydanticObjectId) -> Optional[dict]:
+        """
+        Like set_active, by id, reading only the fields activation needs
+        rather than the whole view. Returns the activated view's
+        `env`/`name`/`viewId`/`status`, or None if there is no such view.
+        """
+        view = await cls.get_motor_collection().find_one({"_id": view_id}, {"env": 1, "name": 1, "viewId": 1})
+        if view is None:
+            return None
+        await cls._activate(view_id, view["env"].id, view["name"], view["viewId"])
+        view["status"] = "active"
+        return view
+
+    @classmethod
+    async def _activate(
+        cls, view_id: PydanticObjectId, env_id: PydanticObjectId, name: str, number: int, attempts: int = 3
+    ):
+        """
+        Activate the view and deactivate its siblings (same env and name),
+        then bump the env's view revision. The ACTIVE_VIEW_INDEXES report
+        conflicts: an active view of another name with the viewId raises
+        ActiveViewConflict, with every status left as it was; a sibling
+        activated concurrently makes us retry.
+
+        On a replica set both updates run in one transaction. A standalone
+        server has none, so the sibling (the name index allows only one) is
+        deactivated first and put back if the view cannot be activated; for
+        the duration of that write the env has no active view of the name.
+        """
+        collection = cls.get_motor_collection()
+        siblings = {"env.$id": env_id, "status": "active", "name": name, "_id": {"$ne": view_id}}
+        for attempt in range(attempts):
+            try:
+                if _supports_transactions(collection):
+                    await _activate_in_transaction(collection, view_id, siblings)
+                else:
+                    await _activate_in_turn(collection, view_id, siblings)
+                break
+            except DuplicateKeyError as e:
+                if _violates(e, *ACTIVE_VIEW_INDEXES[1]):
+                    raise ActiveViewConflict(f"Another active view of this env has viewId {number}")
+                if attempt == attempts - 1:
+                    raise
+            except OperationFailure as e:
+                # Write conflict with a concurrent activation in another transaction
+                if not e.has_error_label("TransientTransactionError") or attempt == attempts - 1:
+                    raise
+        await Env.bump_views_revision(env_id)
+
+    @classmethod
+    async def duplicate_active_views(cls, key: str) -> List[List[PydanticObjectId]]:
+        """
+        Groups of active views of one env sharing `key` ("name" or
+        "viewId"), newest first; they break the ACTIVE_VIEW_INDEXES.
+        """
+        groups = cls.get_motor_collection().aggregate([
+            {"$match": {"status": "active"}},
+            {"$sort": {"_id": -1}},
+            {"$group": {"_id": {"env": "$env", key: f"${key}"}, "ids": {"$push": "$_id"}}},
+            {"$match": {"ids.1": {"$exists": True}}},
+        ])
+        return [group["ids"] async for group in groups]
+
+    @classmethod
+    async def ensure_active_indexes(cls):
+        """
+        Create the ACTIVE_VIEW_INDEXES. Views activated before they existed
+        may break the rule, and the index build would fail; this does not
+        pick which view stays active but raises, naming the command that does.
+        """
+        collection = cls.get_motor_collection()
+        for key, _ in ACTIVE_VIEW_INDEXES:
+            duplicates = await cls.duplicate_active_views(key)
+            if duplicates:
+                print(f"{len(duplicates)} groups of active views share a {key}: {duplicates[:5]}")
+                raise RuntimeError(
+                    f"Active views share a {key}; review them and run `python -m app.active_views resolve`"
+                )
+
+        for key, name in ACTIVE_VIEW_INDEXES:
+            await collection.create_index(
+                [("env.$id", ASCENDING), (key, ASCENDING)],
+                name=name,
+                unique=True,
+                partialFilterExpression={"status": "active"},
+            )
+
+    @classmethod
+    async def edit(
+        cls,
+        view_id: PydanticObjectId,
+        expected_version: int,
+        change: Callable[[List[ViewMenuMap]], None],
+    ) -> Optional[int]:
+        """
+        Edit the menus of a view, guarded by the expected version.
+        `change` edits a copy of the menus in place, or raises EditRejected.
+        The edited tree is stored as a layout, and the view is pointed at it,
+        with its version bumped, in a single guarded write. Returns the new
+        version, or None if there is no such view. Raises VersionConflict
+        (before writing anything) when the view is not at `expected_version`.
+        """
+        collection = cls.get_motor_collection()
+        current = await collection.find_one(
+            {"_id": view_id}, {"version": 1, "layout": 1, "menus": 1, "env": 1}
+        )
+        if current is None:
+            return None
+        version = current.get("version") or 0  # documents older than the field count as 0
+        if version != expected_version:
+            raise VersionConflict(expected_version, version)
+
+        if current.get("layout"):
+            menus = (await ViewLayout.fetch_many([current["layout"]])).get(current["layout"], [])
+            covered = set(master_ids(menus))  # by the view's mastersRevision
+        else:
+            # Inline views predate layouts; their mastersRevision may never have been computed
+            menus = [ViewMenuMap.model_validate(m) for m in current.get("menus") or []]
+            covered = set()
+        menus = [menu.model_copy(deep=True) for menu in menus]  # cached layouts are shared
+        change(menus)
+        added = set(master_ids(menus)) - covered
+
+        revision = max((await latest_master_revisions(added)).values(), default=0)
+        layout = await ViewLayout.store(menus)
+        updated = await collection.find_one_and_update(
+            {"_id": view_id, "version": {"$in": [0, None]} if version == 0 else version},
+            {
+                "$set": {"layout": layout, "menus": []},
+                "$inc": {"version": 1},
+                "$max": {"mastersRevision": revision},
+            },
+            projection={"version": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if updated is None:
+            current = await collection.find_one({"_id": view_id}, {"version": 1})
+            if current is None:
+                return None
+            raise VersionConflict(expected_version, current.get("version") or 0)
+
+        if added:
+            # An added master written since was stamped on the views using it before this one did
+            later = max((await latest_master_revisions(added)).values(), default=0)
+            if later > revision:
+                await collection.update_one({"_id": view_id}, {"$max": {"mastersRevision": later}})
+        await Env.bump_views_revision(current["env"].id)
+        return updated["version"]
@@ -0,0 +1,144 @@
+"""
+On-demand sampling profiler.
+
+A background thread samples the event-loop thread's Python stack every
+`interval` seconds and aggregates the samples into collapsed stacks
+("root;caller;callee count" per line), the input format of flamegraph.pl
+and speedscope.
+
+Two modes:
+- per request: only samples taken while the profiled request's task is
+  running are kept (see ProfilerMiddleware)
+- time window: every sample of the worker's loop thread is kept
+  (see app/routers/debug.py)
+
+Nothing here is installed unless PROFILER_ENABLED is set.
+"""
+import asyncio
+import hmac
+import sys
+import threading
+from collections import Counter
+from typing import Optional
+from urllib.parse import parse_qs
+
+from app.config import settings
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if "site-packages/" in filename:
+        filename = filename.split("site-packages/", 1)[1]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's stack from a helper thread."""
+
+    def __init__(
+        self,
+        thread_id: int,
+        interval: float,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        task: Optional[asyncio.Task] = None,
+    ):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.loop = loop
+        self.task = task  # when set, only keep samples taken while this task runs
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            if self.task is not None and asyncio.current_task(self.loop) is not self.task:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stopped.set()
+        self._thread.join()
+        return self.stacks
+
+    def collapsed(self) -> str:
+        """Samples in collapsed-stack format, heaviest first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def check_admin_secret(secret: Optional[str]) -> bool:
+    """Constant-time check against PROFILER_ADMIN_SECRET (never matches when unset)."""
+    expected = settings.PROFILER_ADMIN_SECRET
+    return bool(expected and secret) and hmac.compare_digest(secret.encode(), expected.encode())
+
+
+class ProfilerMiddleware:
+    """
+    Profiles a single request when it carries `X-Profile: 1` (or the
+    `__profile=1` query flag) and a valid `X-Profile-Secret` header.
+    The response body is replaced by the collapsed stacks; the original
+    status code is reported in `X-Profiled-Status`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        if not check_admin_secret(headers.get(b"x-profile-secret", b"").decode()):
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def capture_send(message):
+            # Swallow the real response; only its status is kept
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+
+        sampler = StackSampler(
+            thread_id=threading.get_ident(),
+            interval=settings.PROFILER_SAMPLE_INTERVAL,
+            loop=asyncio.get_running_loop(),
+            task=asyncio.current_task(),
+        ).start()
+        try:
+            await self.app(scope, receive, capture_send)
+        finally:
+            sampler.stop()
+
+        body = sampler.collapsed().encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-profiled-status", str(status["code"]).encode()),
+                (b"x-profile-samples", str(sum(sampler.stacks.values())).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"x-profile" and value == b"1":
+                return True
+        if b"__profile" in scope.get("query_string", b""):
+            return parse_qs(scope["query_string"].decode()).get("__profile") == ["1"]
+        return False
@@ -0,0 +1,89 @@
+"""
+Per-route-group read preference routing.
+
+Routers opt in with `Depends(use_read_preference("<group>"))`; for the rest
+of that request, reads through documents that include `ReadRoutedDocument`
+use the group's read preference (e.g. secondaries), while writes always go
+to the primary. Anything outside such a request reads from the primary.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+    _ServerMode,
+)
+
+from app.config import settings
+
+_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# Active read preference for the current request (None = primary)
+_current: ContextVar[Optional[_ServerMode]] = ContextVar("read_preference", default=None)
+
+
+def make_read_preference(mode: str, max_staleness: int = -1) -> _ServerMode:
+    """Build a pymongo read preference from its name and maxStalenessSeconds (-1 = no limit)."""
+    if mode not in _MODES:
+        raise ValueError(f"Unknown read preference '{mode}'")
+    if mode == "primary":
+        return Primary()
+    return _MODES[mode](max_staleness=max_staleness)
+
+
+READ_PREFERENCES: Dict[str, _ServerMode] = {
+    group: make_read_preference(mode, max_staleness)
+    for group, (mode, max_staleness) in settings.READ_PREFERENCE_GROUPS.items()
+}
+
+
+def use_read_preference(group: str):
+    """FastAPI dependency routing the request's reads to the group's read preference."""
+    preference = READ_PREFERENCES[group]
+
+    async def dependency():
+        _current.set(preference)
+
+    return dependency
+
+
+@contextmanager
+def primary_reads():
+    """Force primary reads inside the block (e.g. for results that get cached)."""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+# (document class, read preference) -> (source collection, routed collection)
+_routed_collections: Dict[Tuple[type, str], tuple] = {}
+
+
+class ReadRoutedDocument:
+    """Mixin for Beanie documents whose reads follow the active read preference."""
+
+    @classmethod
+    def get_motor_collection(cls):
+        collection = super().get_motor_collection()
+        preference = _current.get()
+        if preference is None or isinstance(preference, Primary):
+            return collection
+        key = (cls, repr(preference))
+        cached = _routed_collections.get(key)
+        if cached is None or cached[0] is not collection:
+            cached = (collection, collection.with_options(read_preference=preference))
+            _routed_collections[key] = cached
+        return cached[1]
@@ -0,0 +1,59 @@
+from .base import (
+    EnvRepository,
+    EnvKeyRepository,
+    ViewRepository,
+    ItemRepository,
+    BulkOutcome,
+    ItemDeleteMany,
+    ItemInsert,
+    ItemSet,
+    ItemWrite,
+)
+from .mongo import MongoEnvRepository, MongoEnvKeyRepository, MongoViewRepository, MongoItemRepository
+from .memory import (
+    MemoryEnvRepository,
+    MemoryEnvKeyRepository,
+    MemoryViewRepository,
+    MemoryItemRepository,
+    OfflineDatabase,
+)
+
+
+class Repositories:
+    """The active set of repositories; routers go through the global instance."""
+
+    envs: EnvRepository
+    keys: EnvKeyRepository
+    views: ViewRepository
+    items: ItemRepository
+
+    def __init__(self):
+        self.backend = None
+        self.use("mongo")
+
+    def use(self, backend: str):
+        """Switch every repository to the `mongo` or `memory` backend (memory starts empty)."""
+        if backend == "mongo":
+            self.envs = MongoEnvRepository()
+            self.keys = MongoEnvKeyRepository()
+            self.views = MongoViewRepository()
+            self.items = MongoItemRepository()
+        elif backend == "memory":
+            self.envs = MemoryEnvRepository()
+            self.keys = MemoryEnvKeyRepository(self.envs)
+            self.views = MemoryViewRepository(self.envs)
+            self.items = MemoryItemRepository()
+        else:
+            raise ValueError(f"Unknown storage backend '{backend}'")
+        self.backend = backend
+
+
+# Global repositories instance
+repositories = Repositories()
+
+
+__all__ = [
+    "EnvRepository", "EnvKeyRepository", "ViewRepository", "ItemRepository",
+    "BulkOutcome", "ItemDeleteMany", "ItemInsert", "ItemSet", "ItemWrite",
+    "OfflineDatabase", "Repositories", "repositories",
+]
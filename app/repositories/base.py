@@ -0,0 +1,306 @@
+"""
+Repository interfaces between the routers and the storage engine.
+
+Routers only talk to these interfaces; `app.repositories.mongo` implements
+them on top of Beanie/MongoDB and `app.repositories.memory` on plain dicts.
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+from beanie import PydanticObjectId
+
+from app.models import Env, EnvKey, Item, MasterTombstone, MenuMaster, SubMenuMaster, View
+from app.models.envs import HASH_SCHEME_ARGON2, HASH_SCHEME_HMAC
+from app.models.views import ViewMenuMap
+
+
+class EnvRepository(ABC):
+
+    @abstractmethod
+    async def get(self, env_id: PydanticObjectId) -> Optional[Env]:
+        ...
+
+    @abstractmethod
+    async def list(self) -> List[Env]:
+        ...
+
+    @abstractmethod
+    async def insert(self, env: Env) -> Env:
+        """Insert a new env; raises pymongo's DuplicateKeyError when the slug is taken."""
+
+    @abstractmethod
+    async def bump_views_revision(self, env_id: PydanticObjectId) -> int:
+        """Increment the env's view change counter and return the new value."""
+
+    @abstractmethod
+    async def get_many(self, env_ids: List[PydanticObjectId]) -> List[Env]:
+        """The envs with the given ids that exist."""
+
+    @abstractmethod
+    async def views_revisions(self, env_ids: List[PydanticObjectId]) -> Dict[PydanticObjectId, int]:
+        """Current viewsRevision of each of the envs that exist."""
+
+
+class EnvKeyRepository(ABC):
+
+    @abstractmethod
+    async def get(self, key_id: PydanticObjectId) -> Optional[EnvKey]:
+        ...
+
+    @abstractmethod
+    async def insert(self, key: EnvKey) -> EnvKey:
+        ...
+
+    @abstractmethod
+    async def insert_many(self, keys: List[EnvKey]) -> List[EnvKey]:
+        """Insert several keys in one write."""
+
+    @abstractmethod
+    async def list_for_env(self, env_id: PydanticObjectId) -> List[EnvKey]:
+        ...
+
+    @abstractmethod
+    async def find_active_by_hash(self, hashed: str, scheme: str) -> Optional[EnvKey]:
+        ...
+
+    @abstractmethod
+    async def list_active(self, schemes: List[Optional[str]]) -> List[EnvKey]:
+        """Active keys hashed with one of `schemes` (None matches keys without a scheme)."""
+
+    @abstractmethod
+    async def set_fields(self, key: EnvKey, fields: Dict[str, object]):
+        """Write the given fields (and apply them to `key`)."""
+
+    @abstractmethod
+    async def fetch_env(self, key: EnvKey) -> Optional[Env]:
+        ...
+
+    @abstractmethod
+    async def record_usage(self, usage: Dict[PydanticObjectId, Tuple[datetime, int]]):
+        """Apply buffered usage: lastUsedAt = max(lastUsedAt, at), requestCount += count."""
+
+    @abstractmethod
+    async def set_status_for_envs(
+        self, env_ids: List[PydanticObjectId], status: str, from_statuses: List[str]
+    ) -> int:
+        """Set `status` on every key of the envs currently in one of `from_statuses`. Returns the count."""
+
+    @abstractmethod
+    async def schedule_revocation(
+        self, env_ids: List[PydanticObjectId], revoke_at: datetime, keep: List[PydanticObjectId]
+    ) -> int:
+        """
+        Schedule every unrevoked key of the envs, except `keep`, for
+        revocation at `revoke_at`; keys already due earlier keep their
+        time. Returns the number of keys (re)scheduled.
+        """
+
+    @abstractmethod
+    async def revoke_due(self, now: datetime) -> int:
+        """Revoke every key whose revokeAt has passed. Returns the count."""
+
+    @abstractmethod
+    async def usable_ids(self, key_ids: List[PydanticObjectId], now: datetime) -> Set[PydanticObjectId]:
+        """The keys among `key_ids` that are active and not past their revokeAt."""
+
+    async def find_by_secret(self, secret: str) -> Optional[EnvKey]:
+        """
+        Find the active key matching a plain secret.
+        HMAC keys are deterministic, so they are found with one indexed
+        lookup. Legacy argon2 keys are checked one by one and, on a match,
+        upgraded in place to hmac-sha256 so the next lookup is cheap.
+        """
+        digest = EnvKey.hash_secret(secret, HASH_SCHEME_HMAC)
+        key = await self.find_active_by_hash(digest, HASH_SCHEME_HMAC)
+        if key and EnvKey.verify_secret(secret, key.hashedSecret, HASH_SCHEME_HMAC):
+            # Past its rotation overlap: refused even before the sweeper revokes it
+            return None if key.revocation_due() else key
+
+        for key in await self.list_active([HASH_SCHEME_ARGON2, None]):
+            if key.revocation_due():
+                continue
+            if EnvKey.verify_secret(secret, key.hashedSecret, HASH_SCHEME_ARGON2):
+                await self.set_fields(key, {"hashedSecret": digest, "hashScheme": HASH_SCHEME_HMAC})
+                return key
+        return None
+
+
+class ViewRepository(ABC):
+
+    @abstractmethod
+    async def insert(self, view: View) -> View:
+        ...
+
+    @abstractmethod
+    async def get(self, view_id: PydanticObjectId) -> Optional[View]:
+        """The view with its menus filled in (also when stored as a layout)."""
+
+    @abstractmethod
+    async def list_for_env(self, env_id: PydanticObjectId) -> List[View]:
+        """Every view of the env, whatever its status."""
+
+    @abstractmethod
+    async def activate(self, view_id: PydanticObjectId) -> Optional[PydanticObjectId]:
+        """
+        Make the view active and deactivate the env's other active views
+        with the same name. Returns the view's env id, or None if there is
+        no such view. Raises ActiveViewConflict when an active view of
+        another name has the same viewId.
+        """
+
+    @abstractmethod
+    async def edit(
+        self, view_id: PydanticObjectId, expected_version: int, change: Callable[[List[ViewMenuMap]], None]
+    ) -> Optional[int]:
+        """
+        Apply `change` (which edits the menus in place, or raises
+        EditRejected) to the view and bump its version. Returns the new
+        version, or None if there is no such view. Raises VersionConflict,
+        without writing, when the view is not at `expected_version`.
+        """
+
+    @abstractmethod
+    async def insert_menu_master(self, menu: MenuMaster) -> MenuMaster:
+        """Insert a new MenuMaster, stamped with the next catalog revision."""
+
+    @abstractmethod
+    async def insert_sub_menu_master(self, sub_menu: SubMenuMaster) -> SubMenuMaster:
+        """Insert a new SubMenuMaster, stamped with the next catalog revision."""
+
+    @abstractmethod
+    async def find_menu_master(self, name: str) -> Optional[MenuMaster]:
+        ...
+
+    @abstractmethod
+    async def find_sub_menu_master(self, name: str) -> Optional[SubMenuMaster]:
+        ...
+
+    @abstractmethod
+    async def list_menu_masters(self, since: Optional[int] = None) -> List[MenuMaster]:
+        """Every MenuMaster, or those written after catalog revision `since`."""
+
+    @abstractmethod
+    async def list_sub_menu_masters(self, since: Optional[int] = None) -> List[SubMenuMaster]:
+        """Every SubMenuMaster, or those written after catalog revision `since`."""
+
+    @abstractmethod
+    async def list_master_tombstones(self, since: int) -> List[MasterTombstone]:
+        """Masters deleted after catalog revision `since`."""
+
+    @abstractmethod
+    async def masters_revision(self) -> Tuple[int, bool]:
+        """
+        The catalog revision up to which every master write is visible, and
+        whether it is settled (False shortly after a revision was taken,
+        while writes of later revisions may still be landing).
+        """
+
+    @abstractmethod
+    async def find_active(self, env_id: PydanticObjectId, view_id: str) -> Optional[View]:
+        """The env's active view whose name is `view_id`, or whose viewId is int(view_id)."""
+
+    @abstractmethod
+    async def find_active_many(self, env_id: PydanticObjectId, view_ids: List[str]) -> List[View]:
+        """Like find_active for several names/viewIds at once."""
+
+    @abstractmethod
+    async def list_active(self, env_id: Optional[PydanticObjectId] = None) -> List[View]:
+        """Active views of one env (or of every env)."""
+
+    @abstractmethod
+    async def get_menu_masters(self, ids: List[PydanticObjectId]) -> Dict[PydanticObjectId, MenuMaster]:
+        ...
+
+    @abstractmethod
+    async def get_sub_menu_masters(self, ids: List[PydanticObjectId]) -> Dict[PydanticObjectId, SubMenuMaster]:
+        ...
+
+    async def load_masters(
+        self, views: List[View]
+    ) -> Tuple[Dict[PydanticObjectId, MenuMaster], Dict[PydanticObjectId, SubMenuMaster]]:
+        """Every master referenced by the given views, fetched once for all of them."""
+        await View.load_layouts(views)
+        menu_ids = {m.menuId for v in views for m in v.menus}
+        sub_menu_ids = {sm.subMenuId for v in views for m in v.menus for sm in m.subMenus}
+        menus = await self.get_menu_masters(list(menu_ids)) if menu_ids else {}
+        sub_menus = await self.get_sub_menu_masters(list(sub_menu_ids)) if sub_menu_ids else {}
+        return menus, sub_menus
+
+
+# ------------------------------
+# Bulk item writes
+# ------------------------------
+@dataclass
+class ItemInsert:
+    item: Item
+
+
+@dataclass
+class ItemSet:
+    item_id: PydanticObjectId
+    fields: Dict[str, object]
+
+
+@dataclass
+class ItemDeleteMany:
+    ids: List[PydanticObjectId]
+
+
+ItemWrite = Union[ItemInsert, ItemSet, ItemDeleteMany]
+
+
+@dataclass
+class BulkOutcome:
+    inserted: int = 0
+    matched: int = 0
+    modified: int = 0
+    deleted: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)  # (index of the failed write, message)
+
+
+class ItemRepository(ABC):
+
+    @abstractmethod
+    async def insert(self, item: Item) -> Item:
+        ...
+
+    @abstractmethod
+    async def get(self, item_id: PydanticObjectId) -> Optional[Item]:
+        ...
+
+    @abstractmethod
+    async def find(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        name: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> List[Item]:
+        """Items filtered by name (case-insensitive regex) and price range."""
+
+    @abstractmethod
+    async def search(self, term: str, limit: int = 10) -> List[Item]:
+        """Items whose name or description matches `term` (case-insensitive regex)."""
+
+    @abstractmethod
+    async def update(self, item_id: PydanticObjectId, fields: Dict[str, object]) -> Optional[Item]:
+        """Set fields and return the updated item, or None if it does not exist."""
+
+    @abstractmethod
+    async def delete(self, item_id: PydanticObjectId) -> bool:
+        ...
+
+    @abstractmethod
+    async def count(self) -> int:
+        ...
+
+    @abstractmethod
+    async def average_price(self) -> Optional[float]:
+        ...
+
+    @abstractmethod
+    async def apply_bulk(self, writes: List[ItemWrite]) -> BulkOutcome:
+        """Apply the writes in one batch, unordered: a failed write is reported and the others still run."""
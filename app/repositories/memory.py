@@ -0,0 +1,416 @@
+"""
+Dict-backed, in-process implementation of the repositories.
+
+Meant for unit tests, load tests and benchmarks that should not need a
+MongoDB server. Documents are copied on the way in and out, like a round
+trip to a real database would.
+
+Beanie still needs to be initialised so documents can be constructed;
+`OfflineDatabase` answers the few calls init_beanie makes and refuses
+everything else, so code that bypasses the repositories fails loudly.
+"""
+import re
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple, TypeVar
+
+from beanie import Document, PydanticObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.models import Env, EnvKey, Item, MasterTombstone, MenuMaster, SubMenuMaster, View
+from app.models.views import ActiveViewConflict, VersionConflict, ViewMenuMap
+from .base import (
+    BulkOutcome,
+    EnvKeyRepository,
+    EnvRepository,
+    ItemDeleteMany,
+    ItemInsert,
+    ItemRepository,
+    ItemWrite,
+    ViewRepository,
+)
+
+DocT = TypeVar("DocT", bound=Document)
+
+
+# ------------------------------
+# Offline database for init_beanie
+# ------------------------------
+class _OfflineCollection:
+
+    def __init__(self, name: str):
+        self.name = name
+
+    async def index_information(self) -> dict:
+        return {}
+
+    async def create_indexes(self, indexes, **kwargs) -> list:
+        return []
+
+    async def drop_index(self, name, **kwargs):
+        pass
+
+    def __getattr__(self, attr):
+        raise RuntimeError(
+            f"Collection '{self.name}' has no database in memory storage mode; "
+            f"'{attr}' must go through app.repositories"
+        )
+
+
+class OfflineDatabase:
+    """Stand-in motor database that only supports what init_beanie needs."""
+
+    name = "memory"
+
+    async def command(self, command: dict) -> dict:
+        return {"version": "7.0.0"}
+
+    def __getitem__(self, name: str) -> _OfflineCollection:
+        return _OfflineCollection(name)
+
+
+# ------------------------------
+# Helpers
+# ------------------------------
+class _Table(Dict[PydanticObjectId, DocT]):
+    """
+    Documents by id; stores and hands out copies. Tables of flat documents
+    (only scalar fields) pass deep=False: a shallow copy isolates them just
+    as well and is far cheaper on the read path.
+    """
+
+    def __init__(self, deep: bool = True):
+        super().__init__()
+        self.deep = deep
+
+    def put(self, doc: DocT) -> DocT:
+        if doc.id is None:
+            doc.id = PydanticObjectId()
+        self[doc.id] = doc.model_copy(deep=self.deep)
+        return doc
+
+    def fetch(self, doc_id: PydanticObjectId) -> Optional[DocT]:
+        doc = self.get(doc_id)
+        return doc.model_copy(deep=self.deep) if doc is not None else None
+
+    def select(self, predicate=lambda doc: True) -> List[DocT]:
+        return [doc.model_copy(deep=self.deep) for doc in self.values() if predicate(doc)]
+
+
+def _link_id(value) -> PydanticObjectId:
+    """Id behind a Link field, whether or not it holds the fetched document."""
+    return value.id if isinstance(value, Document) else value.ref.id
+
+
+def _regex(pattern: str, value: Optional[str]) -> bool:
+    return value is not None and re.search(pattern, value, re.IGNORECASE) is not None
+
+
+def _matches_view_id(view: View, view_id: str) -> bool:
+    if view.name == view_id:
+        return True
+    try:
+        return view.viewId == int(view_id)
+    except ValueError:
+        return False
+
+
+# ------------------------------
+# Repositories
+# ------------------------------
+class MemoryEnvRepository(EnvRepository):
+
+    def __init__(self):
+        self.envs: _Table[Env] = _Table(deep=False)
+
+    async def get(self, env_id: PydanticObjectId) -> Optional[Env]:
+        return self.envs.fetch(env_id)
+
+    async def list(self) -> List[Env]:
+        return self.envs.select()
+
+    async def insert(self, env: Env) -> Env:
+        if any(e.slug == env.slug for e in self.envs.values()):
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error: slug {env.slug}",
+                code=11000,
+                details={"keyValue": {"slug": env.slug}},
+            )
+        return self.envs.put(env)
+
+    async def bump_views_revision(self, env_id: PydanticObjectId) -> int:
+        env = self.envs.get(env_id)
+        if env is None:
+            return 0
+        env.viewsRevision += 1
+        return env.viewsRevision
+
+    async def get_many(self, env_ids: List[PydanticObjectId]) -> List[Env]:
+        wanted = set(env_ids)
+        return self.envs.select(lambda e: e.id in wanted)
+
+    async def views_revisions(self, env_ids: List[PydanticObjectId]) -> Dict[PydanticObjectId, int]:
+        return {env_id: self.envs[env_id].viewsRevision for env_id in env_ids if env_id in self.envs}
+
+
+class MemoryEnvKeyRepository(EnvKeyRepository):
+
+    def __init__(self, envs: MemoryEnvRepository):
+        self.envs = envs
+        self.keys: _Table[EnvKey] = _Table()
+
+    async def get(self, key_id: PydanticObjectId) -> Optional[EnvKey]:
+        return self.keys.fetch(key_id)
+
+    async def insert(self, key: EnvKey) -> EnvKey:
+        return self.keys.put(key)
+
+    async def insert_many(self, keys: List[EnvKey]) -> List[EnvKey]:
+        return [self.keys.put(key) for key in keys]
+
+    async def list_for_env(self, env_id: PydanticObjectId) -> List[EnvKey]:
+        return self.keys.select(lambda k: _link_id(k.envId) == env_id)
+
+    async def find_active_by_hash(self, hashed: str, scheme: str) -> Optional[EnvKey]:
+        found = self.keys.select(
+            lambda k: k.hashedSecret == hashed and k.hashScheme == scheme and k.status == "active"
+        )
+        return found[0] if found else None
+
+    async def list_active(self, schemes: List[Optional[str]]) -> List[EnvKey]:
+        return self.keys.select(lambda k: k.status == "active" and k.hashScheme in schemes)
+
+    async def set_fields(self, key: EnvKey, fields: Dict[str, object]):
+        stored = self.keys.get(key.id)
+        for name, value in fields.items():
+            setattr(key, name, value)
+            if stored is not None:
+                setattr(stored, name, value)
+
+    async def fetch_env(self, key: EnvKey) -> Optional[Env]:
+        env = await self.envs.get(_link_id(key.envId))
+        key.envId = env
+        return env
+
+    async def record_usage(self, usage: Dict[PydanticObjectId, Tuple[datetime, int]]):
+        for key_id, (last_used, count) in usage.items():
+            stored = self.keys.get(key_id)
+            if stored is None:
+                continue
+            stored.lastUsedAt = max(filter(None, [stored.lastUsedAt, last_used]))
+            stored.requestCount += count
+
+    async def set_status_for_envs(
+        self, env_ids: List[PydanticObjectId], status: str, from_statuses: List[str]
+    ) -> int:
+        wanted = set(env_ids)
+        count = 0
+        for key in self.keys.values():
+            if _link_id(key.envId) in wanted and key.status in from_statuses:
+                key.status = status
+                count += 1
+        return count
+
+    async def schedule_revocation(
+        self, env_ids: List[PydanticObjectId], revoke_at: datetime, keep: List[PydanticObjectId]
+    ) -> int:
+        wanted, kept = set(env_ids), set(keep)
+        count = 0
+        for key in self.keys.values():
+            if (
+                _link_id(key.envId) in wanted
+                and key.id not in kept
+                and key.status != "revoked"
+                and (key.revokeAt is None or key.revokeAt > revoke_at)
+            ):
+                key.revokeAt = revoke_at
+                count += 1
+        return count
+
+    async def revoke_due(self, now: datetime) -> int:
+        count = 0
+        for key in self.keys.values():
+            if key.status != "revoked" and key.revocation_due(now):
+                key.status = "revoked"
+                count += 1
+        return count
+
+    async def usable_ids(self, key_ids: List[PydanticObjectId], now: datetime) -> Set[PydanticObjectId]:
+        return {
+            key.id for key in map(self.keys.get, key_ids)
+            if key is not None and key.status == "active" and not key.revocation_due(now)
+        }
+
+
+class MemoryViewRepository(ViewRepository):
+
+    def __init__(self, envs: MemoryEnvRepository):
+        self.envs = envs
+        self.views: _Table[View] = _Table()
+        self.menu_masters: _Table[MenuMaster] = _Table(deep=False)
+        self.sub_menu_masters: _Table[SubMenuMaster] = _Table(deep=False)
+        self.revision = 0  # catalog revision of the latest master write
+
+    def _stamp(self, master):
+        self.revision += 1
+        master.revision = self.revision
+        master.updatedAt = datetime.utcnow()
+
+    async def insert(self, view: View) -> View:
+        return self.views.put(view)
+
+    async def get(self, view_id: PydanticObjectId) -> Optional[View]:
+        return self.views.fetch(view_id)
+
+    async def list_for_env(self, env_id: PydanticObjectId) -> List[View]:
+        return self.views.select(lambda v: v.env_id == env_id)
+
+    async def activate(self, view_id: PydanticObjectId) -> Optional[PydanticObjectId]:
+        view = self.views.get(view_id)
+        if view is None:
+            return None
+        active = [
+            other for other in self.views.values()
+            if other.id != view_id and other.status == "active" and other.env_id == view.env_id
+        ]
+        if any(other.viewId == view.viewId and other.name != view.name for other in active):
+            raise ActiveViewConflict(f"Another active view of this env has viewId {view.viewId}")
+        for other in active:
+            if other.name == view.name:
+                other.status = "inactive"
+        view.status = "active"
+        await self.envs.bump_views_revision(view.env_id)
+        return view.env_id
+
+    async def edit(
+        self, view_id: PydanticObjectId, expected_version: int, change: Callable[[List[ViewMenuMap]], None]
+    ) -> Optional[int]:
+        view = self.views.get(view_id)
+        if view is None:
+            return None
+        if view.version != expected_version:
+            raise VersionConflict(expected_version, view.version)
+        menus = [menu.model_copy(deep=True) for menu in view.menus]
+        change(menus)
+        view.menus = menus
+        view.version += 1
+        await self.envs.bump_views_revision(view.env_id)
+        return view.version
+
+    async def insert_menu_master(self, menu: MenuMaster) -> MenuMaster:
+        self._stamp(menu)
+        return self.menu_masters.put(menu)
+
+    async def insert_sub_menu_master(self, sub_menu: SubMenuMaster) -> SubMenuMaster:
+        self._stamp(sub_menu)
+        return self.sub_menu_masters.put(sub_menu)
+
+    async def find_menu_master(self, name: str) -> Optional[MenuMaster]:
+        found = self.menu_masters.select(lambda m: m.name == name)
+        return found[0] if found else None
+
+    async def find_sub_menu_master(self, name: str) -> Optional[SubMenuMaster]:
+        found = self.sub_menu_masters.select(lambda sm: sm.name == name)
+        return found[0] if found else None
+
+    async def list_menu_masters(self, since: Optional[int] = None) -> List[MenuMaster]:
+        return self.menu_masters.select(lambda m: since is None or m.revision > since)
+
+    async def list_sub_menu_masters(self, since: Optional[int] = None) -> List[SubMenuMaster]:
+        return self.sub_menu_masters.select(lambda sm: since is None or sm.revision > since)
+
+    async def list_master_tombstones(self, since: int) -> List[MasterTombstone]:
+        return []  # masters are only deleted with the mongo backend
+
+    async def masters_revision(self) -> Tuple[int, bool]:
+        return self.revision, True
+
+    async def find_active(self, env_id: PydanticObjectId, view_id: str) -> Optional[View]:
+        found = await self.find_active_many(env_id, [view_id])
+        return found[0] if found else None
+
+    async def find_active_many(self, env_id: PydanticObjectId, view_ids: List[str]) -> List[View]:
+        return self.views.select(
+            lambda v: v.status == "active"
+            and v.env_id == env_id
+            and any(_matches_view_id(v, view_id) for view_id in view_ids)
+        )
+
+    async def list_active(self, env_id: Optional[PydanticObjectId] = None) -> List[View]:
+        return self.views.select(
+            lambda v: v.status == "active" and (env_id is None or v.env_id == env_id)
+        )
+
+    async def get_menu_masters(self, ids: List[PydanticObjectId]) -> Dict[PydanticObjectId, MenuMaster]:
+        return {m.id: m for m in map(self.menu_masters.fetch, ids) if m is not None}
+
+    async def get_sub_menu_masters(self, ids: List[PydanticObjectId]) -> Dict[PydanticObjectId, SubMenuMaster]:
+        return {sm.id: sm for sm in map(self.sub_menu_masters.fetch, ids) if sm is not None}
+
+
+class MemoryItemRepository(ItemRepository):
+
+    def __init__(self):
+        self.items: _Table[Item] = _Table(deep=False)
+
+    async def insert(self, item: Item) -> Item:
+        return self.items.put(item)
+
+    async def get(self, item_id: PydanticObjectId) -> Optional[Item]:
+        return self.items.fetch(item_id)
+
+    async def find(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        name: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> List[Item]:
+        found = self.items.select(
+            lambda i: (not name or _regex(name, i.name))
+            and (min_price is None or i.price >= min_price)
+            and (max_price is None or i.price <= max_price)
+        )
+        return found[skip:skip + limit] if limit else found[skip:]
+
+    async def search(self, term: str, limit: int = 10) -> List[Item]:
+        found = self.items.select(lambda i: _regex(term, i.name) or _regex(term, i.description))
+        return found[:limit] if limit else found
+
+    async def update(self, item_id: PydanticObjectId, fields: Dict[str, object]) -> Optional[Item]:
+        stored = self.items.get(item_id)
+        if stored is None:
+            return None
+        for name, value in fields.items():
+            setattr(stored, name, value)
+        return self.items.fetch(item_id)
+
+    async def delete(self, item_id: PydanticObjectId) -> bool:
+        return self.items.pop(item_id, None) is not None
+
+    async def count(self) -> int:
+        return len(self.items)
+
+    async def average_price(self) -> Optional[float]:
+        if not self.items:
+            return None
+        return sum(i.price for i in self.items.values()) / len(self.items)
+
+    async def apply_bulk(self, writes: List[ItemWrite]) -> BulkOutcome:
+        outcome = BulkOutcome()
+        for write in writes:
+            if isinstance(write, ItemInsert):
+                self.items.put(write.item)
+                outcome.inserted += 1
+            elif isinstance(write, ItemDeleteMany):
+                outcome.deleted += sum(self.items.pop(item_id, None) is not None for item_id in write.ids)
+            else:
+                stored = self.items.get(write.item_id)
+                if stored is None:
+                    continue
+                outcome.matched += 1
+                if any(getattr(stored, name) != value for name, value in write.fields.items()):
+                    outcome.modified += 1
+                    for name, value in write.fields.items():
+                        setattr(stored, name, value)
+        return outcome
@@ -0,0 +1,314 @@
+"""
+MongoDB implementation of the repositories, on top of the Beanie documents.
+"""
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from beanie import PydanticObjectId
+from beanie.odm.queries.update import UpdateResponse
+from beanie.operators import In, Or
+from pymongo import DeleteMany, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.models import Env, EnvKey, Item, MasterTombstone, MenuMaster, SubMenuMaster, View
+from app.models.views import ViewMenuMap, masters_revision, stamp_master
+from .base import (
+    BulkOutcome,
+    EnvKeyRepository,
+    EnvRepository,
+    ItemDeleteMany,
+    ItemInsert,
+    ItemRepository,
+    ItemWrite,
+    ViewRepository,
+)
+
+
+def _view_conditions(view_ids: List[str]) -> list:
+    """Match views by name or, for numeric ids, by viewId."""
+    numeric = []
+    for view_id in view_ids:
+        try:
+            numeric.append(int(view_id))
+        except ValueError:
+            pass  # not an int, only match name
+    conditions = [In(View.name, view_ids)]
+    if numeric:
+        conditions.append(In(View.viewId, numeric))
+    return conditions
+
+
+class MongoEnvRepository(EnvRepository):
+
+    async def get(self, env_id: PydanticObjectId) -> Optional[Env]:
+        return await Env.get(env_id)
+
+    async def list(self) -> List[Env]:
+        return await Env.find_all().to_list()
+
+    async def insert(self, env: Env) -> Env:
+        return await env.insert()
+
+    async def bump_views_revision(self, env_id: PydanticObjectId) -> int:
+        return await Env.bump_views_revision(env_id)
+
+    async def get_many(self, env_ids: List[PydanticObjectId]) -> List[Env]:
+        return await Env.find(In(Env.id, env_ids)).to_list()
+
+    async def views_revisions(self, env_ids: List[PydanticObjectId]) -> Dict[PydanticObjectId, int]:
+        cursor = Env.get_motor_collection().find({"_id": {"$in": env_ids}}, {"viewsRevision": 1})
+        return {env["_id"]: env.get("viewsRevision", 0) async for env in cursor}
+
+
+class MongoEnvKeyRepository(EnvKeyRepository):
+
+    async def get(self, key_id: PydanticObjectId) -> Optional[EnvKey]:
+        return await EnvKey.get(key_id)
+
+    async def insert(self, key: EnvKey) -> EnvKey:
+        return await key.insert()
+
+    async def insert_many(self, keys: List[EnvKey]) -> List[EnvKey]:
+        for key in keys:
+            key.id = key.id or PydanticObjectId()
+        await EnvKey.insert_many(keys)
+        return keys
+
+    async def list_for_env(self, env_id: PydanticObjectId) -> List[EnvKey]:
+        return await EnvKey.find(EnvKey.envId.id == env_id).to_list()
+
+    async def find_active_by_hash(self, hashed: str, scheme: str) -> Optional[EnvKey]:
+        return await EnvKey.find_one(
+            EnvKey.hashedSecret == hashed,
+            EnvKey.hashScheme == scheme,
+            EnvKey.status == "active"
+        )
+
+    async def list_active(self, schemes: List[Optional[str]]) -> List[EnvKey]:
+        return await EnvKey.find(
+            EnvKey.status == "active",
+            {"hashScheme": {"$in": schemes}}
+        ).to_list()
+
+    async def set_fields(self, key: EnvKey, fields: Dict[str, object]):
+        await key.set(fields)
+
+    async def fetch_env(self, key: EnvKey) -> Optional[Env]:
+        await key.fetch_link("envId")
+        return key.envId
+
+    async def record_usage(self, usage: Dict[PydanticObjectId, Tuple[datetime, int]]):
+        ops = [
+            UpdateOne(
+                {"_id": key_id},
+                {"$max": {"lastUsedAt": last_used}, "$inc": {"requestCount": count}},
+            )
+            for key_id, (last_used, count) in usage.items()
+        ]
+        await EnvKey.get_motor_collection().bulk_write(ops, ordered=False)
+
+    async def set_status_for_envs(
+        self, env_ids: List[PydanticObjectId], status: str, from_statuses: List[str]
+    ) -> int:
+        result = await EnvKey.get_motor_collection().update_many(
+            {"envId.$id": {"$in": env_ids}, "status": {"$in": from_statuses}},
+            {"$set": {"status": status}},
+        )
+        return result.modified_count
+
+    async def schedule_revocation(
+        self, env_ids: List[PydanticObjectId], revoke_at: datetime, keep: List[PydanticObjectId]
+    ) -> int:
+        result = await EnvKey.get_motor_collection().update_many(
+            {
+                "envId.$id": {"$in": env_ids},
+                "_id": {"$nin": keep},
+                "status": {"$ne": "revoked"},
+                "$or": [{"revokeAt": None}, {"revokeAt": {"$gt": revoke_at}}],
+            },
+            {"$set": {"revokeAt": revoke_at}},
+        )
+        return result.modified_count
+
+    async def revoke_due(self, now: datetime) -> int:
+        result = await EnvKey.get_motor_collection().update_many(
+            {"revokeAt": {"$lte": now}, "status": {"$ne": "revoked"}},
+            {"$set": {"status": "revoked"}},
+        )
+        return result.modified_count
+
+    async def usable_ids(self, key_ids: List[PydanticObjectId], now: datetime) -> Set[PydanticObjectId]:
+        cursor = EnvKey.get_motor_collection().find(
+            {
+                "_id": {"$in": key_ids},
+                "status": "active",
+                "$or": [{"revokeAt": None}, {"revokeAt": {"$gt": now}}],
+            },
+            {"_id": 1},
+        )
+        return {doc["_id"] async for doc in cursor}
+
+
+class MongoViewRepository(ViewRepository):
+
+    async def insert(self, view: View) -> View:
+        return await view.insert_with_layout()
+
+    async def get(self, view_id: PydanticObjectId) -> Optional[View]:
+        view = await View.get(view_id)
+        if view is not None:
+            await View.load_layouts([view])
+        return view
+
+    async def list_for_env(self, env_id: PydanticObjectId) -> List[View]:
+        return await View.find(View.env.id == env_id).to_list()
+
+    async def activate(self, view_id: PydanticObjectId) -> Optional[PydanticObjectId]:
+        view = await View.activate(view_id)
+        return view["env"].id if view else None
+
+    async def edit(
+        self, view_id: PydanticObjectId, expected_version: int, change: Callable[[List[ViewMenuMap]], None]
+    ) -> Optional[int]:
+        return await View.edit(view_id, expected_version, change)
+
+    async def insert_menu_master(self, menu: MenuMaster) -> MenuMaster:
+        await stamp_master(menu)
+        return await menu.insert()
+
+    async def insert_sub_menu_master(self, sub_menu: SubMenuMaster) -> SubMenuMaster:
+        await stamp_master(sub_menu)
+        return await sub_menu.insert()
+
+    async def find_menu_master(self, name: str) -> Optional[MenuMaster]:
+        return await MenuMaster.find_one(MenuMaster.name == name)
+
+    async def find_sub_menu_master(self, name: str) -> Optional[SubMenuMaster]:
+        return await SubMenuMaster.find_one(SubMenuMaster.name == name)
+
+    async def list_menu_masters(self, since: Optional[int] = None) -> List[MenuMaster]:
+        query = MenuMaster.find_all() if since is None else MenuMaster.find(MenuMaster.revision > since)
+        return await query.to_list()
+
+    async def list_sub_menu_masters(self, since: Optional[int] = None) -> List[SubMenuMaster]:
+        query = SubMenuMaster.find_all() if since is None else SubMenuMaster.find(SubMenuMaster.revision > since)
+        return await query.to_list()
+
+    async def list_master_tombstones(self, since: int) -> List[MasterTombstone]:
+        return await MasterTombstone.find(MasterTombstone.revision > since).to_list()
+
+    async def masters_revision(self) -> Tuple[int, bool]:
+        return await masters_revision()
+
+    async def find_active(self, env_id: PydanticObjectId, view_id: str) -> Optional[View]:
+        conditions = [View.name == view_id]
+        try:
+            conditions.append(View.viewId == int(view_id))
+        except ValueError:
+            pass  # not an int, only match name
+
+        return await View.find_one(
+            Or(*conditions),
+            View.env.id == env_id,
+            View.status == "active"
+        )
+
+    async def find_active_many(self, env_id: PydanticObjectId, view_ids: List[str]) -> List[View]:
+        return await View.find(
+            Or(*_view_conditions(view_ids)),
+            View.env.id == env_id,
+            View.status == "active"
+        ).to_list()
+
+    async def list_active(self, env_id: Optional[PydanticObjectId] = None) -> List[View]:
+        query = View.find(View.status == "active")
+        if env_id is not None:
+            query = query.find(View.env.id == env_id)
+        return await query.to_list()
+
+    async def get_menu_masters(self, ids: List[PydanticObjectId]) -> Dict[PydanticObjectId, MenuMaster]:
+        menus = await MenuMaster.find(In(MenuMaster.id, ids)).to_list()
+        return {m.id: m for m in menus}
+
+    async def get_sub_menu_masters(self, ids: List[PydanticObjectId]) -> Dict[PydanticObjectId, SubMenuMaster]:
+        sub_menus = await SubMenuMaster.find(In(SubMenuMaster.id, ids)).to_list()
+        return {sm.id: sm for sm in sub_menus}
+
+
+class MongoItemRepository(ItemRepository):
+
+    async def insert(self, item: Item) -> Item:
+        return await item.insert()
+
+    async def get(self, item_id: PydanticObjectId) -> Optional[Item]:
+        return await Item.get(item_id)
+
+    async def find(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        name: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> List[Item]:
+        query = {}
+
+        if name:
+            query["name"] = {"$regex": name, "$options": "i"}  # Case-insensitive search
+
+        if min_price is not None:
+            query.setdefault("price", {})["$gte"] = min_price
+
+        if max_price is not None:
+            query.setdefault("price", {})["$lte"] = max_price
+
+        return await Item.find(query).skip(skip).limit(limit).to_list()
+
+    async def search(self, term: str, limit: int = 10) -> List[Item]:
+        return await Item.find({
+            "$or": [
+                {"name": {"$regex": term, "$options": "i"}},
+                {"description": {"$regex": term, "$options": "i"}}
+            ]
+        }).limit(limit).to_list()
+
+    async def update(self, item_id: PydanticObjectId, fields: Dict[str, object]) -> Optional[Item]:
+        # Update and fetch the item in one round trip (find_one_and_update)
+        return await Item.find_one(Item.id == item_id).update(
+            {"$set": fields},
+            response_type=UpdateResponse.NEW_DOCUMENT
+        )
+
+    async def delete(self, item_id: PydanticObjectId) -> bool:
+        result = await Item.find_one(Item.id == item_id).delete()
+        return bool(result and result.deleted_count)
+
+    async def count(self) -> int:
+        return await Item.count()
+
+    async def average_price(self) -> Optional[float]:
+        result = await Item.aggregate([
+            {"$group": {"_id": None, "avg_price": {"$avg": "$price"}}}
+        ]).to_list()
+        return result[0]["avg_price"] if result else None
+
+    async def apply_bulk(self, writes: List[ItemWrite]) -> BulkOutcome:
+        ops = []
+        for write in writes:
+            if isinstance(write, ItemInsert):
+                ops.append(InsertOne(write.item.model_dump(exclude={"id", "revision_id"})))
+            elif isinstance(write, ItemDeleteMany):
+                ops.append(DeleteMany({"_id": {"$in": write.ids}}))
+            else:
+                ops.append(UpdateOne({"_id": write.item_id}, {"$set": write.fields}))
+        try:
+            details = (await Item.get_motor_collection().bulk_write(ops, ordered=False)).bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+        return BulkOutcome(
+            inserted=details.get("nInserted", 0),
+            matched=details.get("nMatched", 0),
+            modified=details.get("nModified", 0),
+            deleted=details.get("nRemoved", 0),
+            errors=[(err["index"], err.get("errmsg", "write error")) for err in details.get("writeErrors", [])],
+        )
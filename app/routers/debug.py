@@ -0,0 +1,38 @@
+"""
+Profiling endpoints (only mounted when PROFILER_ENABLED is set).
+"""
+import asyncio
+import threading
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.profiler import StackSampler, check_admin_secret
+
+router = APIRouter(prefix="/debug", tags=["Debug"])
+
+MAX_PROFILE_SECONDS = 60
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+    x_profile_secret: str = Header(..., alias="X-Profile-Secret")
+):
+    """
+    Sample this worker's event-loop thread for a time window and return
+    the result as collapsed stacks (flamegraph.pl / speedscope input).
+    """
+    if not check_admin_secret(x_profile_secret):
+        raise HTTPException(status_code=403, detail="Invalid profiler secret")
+
+    sampler = StackSampler(
+        thread_id=threading.get_ident(),
+        interval=settings.PROFILER_SAMPLE_INTERVAL,
+    ).start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stop()
+    return sampler.collapsed()
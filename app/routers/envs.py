@@ -1,10 +1,14 @@
 from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from beanie import PydanticObjectId
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
+from app.config import settings
+from app.key_rotation import rotate_keys
+from app.key_usage import key_usage
 from app.models import Env, EnvKey  # <-- from earlier schema
+from app.repositories import repositories
 
 router = APIRouter(prefix="/envs", tags=["Environments"])
 
@@ -34,6 +38,22 @@ class EnvResponse(BaseModel):
     createdAt: datetime
 
 
+class KeyBulkRequest(BaseModel):
+    envIds: List[str] = Field(..., min_length=1)
+
+
+class KeyRotateRequest(KeyBulkRequest):
+    createdBy: str
+    overlapSeconds: Optional[float] = Field(None, ge=0)  # defaults to KEY_ROTATION_OVERLAP
+
+
+def _parse_env_ids(env_ids: List[str]) -> List[PydanticObjectId]:
+    try:
+        return list(dict.fromkeys(PydanticObjectId(env_id) for env_id in env_ids))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid envId")
+
+
 # ---------------------------
 # Endpoints
 # ---------------------------
@@ -43,7 +63,7 @@ class EnvResponse(BaseModel):
 async def create_env(payload: EnvCreate):
     env = Env(**payload.dict())
     try:
-        await env.insert()
+        await repositories.envs.insert(env)
     except Exception as e:
         # Handle DuplicateKeyError from pymongo/beanie
         if hasattr(e, "code") and e.code == 11000:
@@ -66,7 +86,7 @@ async def create_env(payload: EnvCreate):
 # 2. List environments
 @router.get("/", response_model=List[EnvResponse])
 async def list_envs():
-    envs = await Env.find_all().to_list()
+    envs = await repositories.envs.list()
     return [
         EnvResponse(
             id=str(env.id),
@@ -83,15 +103,16 @@ async def list_envs():
 # 3. Create a new EnvKey and return secret (only once!)
 @router.post("/{env_id}/keys", response_model=EnvKeyCreateResponse)
 async def create_env_key(env_id: str, createdBy: str):
-    env = await Env.get(env_id)
+    env = await repositories.envs.get(PydanticObjectId(env_id))
     if not env:
         raise HTTPException(status_code=404, detail="Env not found")
 
     plain_secret = EnvKey.generate_secret()
-    hashed = EnvKey.hash_secret(plain_secret)
+    scheme = settings.SECRET_HASH_SCHEME
+    hashed = EnvKey.hash_secret(plain_secret, scheme)
 
-    env_key = EnvKey(envId=env, hashedSecret=hashed, createdBy=createdBy)
-    await env_key.insert()
+    env_key = EnvKey(envId=env, hashedSecret=hashed, hashScheme=scheme, createdBy=createdBy)
+    await repositories.keys.insert(env_key)
 
     return EnvKeyCreateResponse(
         secret=plain_secret,
@@ -99,13 +120,17 @@ async def create_env_key(env_id: str, createdBy: str):
         createdAt=env_key.createdAt,
     )
 
+async def resolve_key_from_secret(secret: str) -> EnvKey | None:
+    key = await repositories.keys.find_by_secret(secret)
+    if key is not None:
+        key_usage.record(key.id)
+    return key
+
 async def resolve_env_from_secret(secret: str) -> Env | None:
-    env_keys = await EnvKey.find(EnvKey.status == "active").to_list()
-    for key in env_keys:
-        if EnvKey.verify_secret(secret, key.hashedSecret):
-            await key.fetch_link("envId")
-            return key.envId
-    return None
+    key = await resolve_key_from_secret(secret)
+    if key is None:
+        return None
+    return await repositories.keys.fetch_env(key)
 
 # 4. Lookup Env by secret
 @router.post("/lookup")
@@ -120,39 +145,78 @@ async def lookup_env(secret: str):
 # 5. Expire (deactivate) a key
 @router.post("/keys/{key_id}/expire")
 async def expire_key(key_id: str):
-    key = await EnvKey.get(key_id)
+    key = await repositories.keys.get(PydanticObjectId(key_id))
     if not key:
         raise HTTPException(status_code=404, detail="Key not found")
 
-    key.status = "revoked"
-    await key.save()
+    await repositories.keys.set_fields(key, {"status": "revoked"})
     return {"message": "Key revoked", "keyId": str(key.id)}
 
 
 # 5b. Pause (deactivate) a key
 @router.post("/keys/{key_id}/pause")
 async def pause_key(key_id: str):
-    key = await EnvKey.get(key_id)
+    key = await repositories.keys.get(PydanticObjectId(key_id))
     if not key:
         raise HTTPException(status_code=404, detail="Key not found")
 
-    key.status = "inactive"
-    await key.save()
+    await repositories.keys.set_fields(key, {"status": "inactive"})
     return {"message": "Key paused", "keyId": str(key.id)}
 
 # 5c. Mark key as active (if not revoked)
 @router.post("/keys/{key_id}/activate")
 async def activate_key(key_id: str):
-    key = await EnvKey.get(key_id)
+    key = await repositories.keys.get(PydanticObjectId(key_id))
     if not key:
         raise HTTPException(status_code=404, detail="Key not found")
     if key.status == "revoked":
         raise HTTPException(status_code=400, detail="Cannot activate a revoked key")
-    key.status = "active"
-    await key.save()
+    await repositories.keys.set_fields(key, {"status": "active"})
     return {"message": "Key activated", "keyId": str(key.id)}
 
 
+# 5d. Revoke / pause every key of one or more envs (one update_many)
+@router.post("/keys/revoke")
+async def revoke_env_keys(payload: KeyBulkRequest):
+    env_ids = _parse_env_ids(payload.envIds)
+    revoked = await repositories.keys.set_status_for_envs(env_ids, "revoked", ["active", "inactive"])
+    return {"message": f"Revoked {revoked} keys", "revoked": revoked}
+
+
+@router.post("/keys/pause")
+async def pause_env_keys(payload: KeyBulkRequest):
+    env_ids = _parse_env_ids(payload.envIds)
+    paused = await repositories.keys.set_status_for_envs(env_ids, "inactive", ["active"])
+    return {"message": f"Paused {paused} keys", "paused": paused}
+
+
+# 5e. Rotate: new key per env, old keys revoked after the overlap window
+@router.post("/keys/rotate")
+async def rotate_env_keys(payload: KeyRotateRequest):
+    """
+    Issue a new key for every env and schedule revocation of their other
+    keys after `overlapSeconds` (default KEY_ROTATION_OVERLAP). The new
+    secrets are returned only once.
+    """
+    env_ids = _parse_env_ids(payload.envIds)
+    envs = await repositories.envs.get_many(env_ids)
+    missing = set(env_ids) - {env.id for env in envs}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Env not found: {', '.join(sorted(map(str, missing)))}")
+
+    overlap = settings.KEY_ROTATION_OVERLAP if payload.overlapSeconds is None else payload.overlapSeconds
+    issued, revoke_at, scheduled = await rotate_keys(envs, payload.createdBy, overlap)
+    return {
+        "keys": [
+            {"envId": str(env.id), "keyId": str(key.id), "secret": secret}
+            for env, (key, secret) in zip(envs, issued)
+        ],
+        "revokeAt": revoke_at,
+        "scheduled": scheduled,
+        "message": f"Rotated keys of {len(envs)} envs",
+    }
+
+
 
 # 6. List keys for an environment
 @router.get("/envKeys")
@@ -160,15 +224,21 @@ async def get_keys(envId: str = Query(...)):
     # Convert string to PydanticObjectId
     env_obj_id = PydanticObjectId(envId)
 
-    # Query EnvKey directly
-    keys = await EnvKey.find(EnvKey.envId.id == env_obj_id).to_list()
+    keys = await repositories.keys.list_for_env(env_obj_id)
 
-    return [
-        {
+    result = []
+    for k in keys:
+        # Merge usage still buffered in memory (not yet flushed)
+        pending_at, pending_count = key_usage.pending(k.id)
+        last_used = max(filter(None, [k.lastUsedAt, pending_at]), default=None)
+        result.append({
             "id": str(k.id),
             "status": k.status,
+            "hashScheme": k.hashScheme,
             "createdBy": k.createdBy,
             "createdAt": k.createdAt,
-        }
-        for k in keys
-    ]
\ No newline at end of file
+            "lastUsedAt": last_used,
+            "requestCount": k.requestCount + pending_count,
+            "revokeAt": k.revokeAt,
+        })
+    return result
\ No newline at end of file
@@ -1,44 +1,232 @@
-from fastapi import APIRouter, Header, HTTPException, Depends
-from beanie import PydanticObjectId
-from app.models import View
-from .envs import resolve_env_from_secret
-from beanie import PydanticObjectId
-from beanie.operators import Or
+from typing import List, Optional
+from fastapi import APIRouter, Header, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from pymongo.errors import PyMongoError
 
-router = APIRouter(prefix="/secure-views", tags=["secure-views"])
+from app.cache import bundle_cache, etag_matches, strip_weak, view_cache, view_history
+from app.compression import encoded_response
+from app.config import settings
+from app.read_routing import primary_reads, use_read_preference
+from app.repositories import repositories
+from app.snapshot import require_database, snapshot_store
+from app.view_events import event_stream, view_events
+from .envs import resolve_env_from_secret, resolve_key_from_secret
+
+router = APIRouter(
+    prefix="/secure-views",
+    tags=["secure-views"],
+    dependencies=[Depends(use_read_preference("secure_views"))]
+)
+
+MAX_BATCH_VIEWS = 50
+EVENTS_PATH = "/secure-views/env/events"  # excluded from gzip (see main.py)
+
+
+class SecureViewBatchRequest(BaseModel):
+    views: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_VIEWS)  # view names or numeric viewIds
+
+
+@router.post("/batch", response_model=dict, dependencies=[Depends(require_database)])
+async def get_secure_views_batch(
+    payload: SecureViewBatchRequest,
+    x_token: str = Header(..., alias="X-Token")
+):
+    """
+    Fetch several views for the same env in one request.
+    - X-Token is verified once for the whole batch.
+    - All matching active views are loaded with a single $in query.
+    - Menu/SubMenu masters are fetched once and shared across the views.
+    Each requested view is reported as found (with its expanded JSON) or not found.
+    """
+    env = await resolve_env_from_secret(x_token)
+    if env is None:
+        raise HTTPException(status_code=401, detail="Invalid secret")
+
+    view_docs = await repositories.views.find_active_many(env.id, list(dict.fromkeys(payload.views)))
+
+    by_name = {v.name: v for v in view_docs}
+    by_view_id = {v.viewId: v for v in view_docs}
+
+    menu_masters, sub_menu_masters = await repositories.views.load_masters(view_docs)
+    expanded = {}
+    results = []
+    for name in payload.views:
+        view_doc = by_name.get(name)
+        if view_doc is None:
+            try:
+                view_doc = by_view_id.get(int(name))
+            except ValueError:
+                pass
+        if view_doc is None:
+            results.append({"view": name, "found": False})
+            continue
+        if view_doc.id not in expanded:
+            expanded[view_doc.id] = await view_doc.expand_full(menu_masters, sub_menu_masters)
+        results.append({"view": name, "found": True, "data": expanded[view_doc.id]})
+
+    return {"views": results}
+
+
+@router.get("/env/bootstrap", dependencies=[Depends(require_database)])
+async def get_secure_bootstrap_bundle(
+    x_token: str = Header(..., alias="X-Token"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    accept_encoding: Optional[str] = Header(None, alias="Accept-Encoding")
+):
+    """
+    Fetch every active view of the env resolved from X-Token, fully expanded.
+    - The bundle is cached per env and versioned by the env's view revision,
+      together with its gzip/brotli variants.
+    - The revision is exposed as an ETag; a matching If-None-Match gets 304.
+    """
+    env = await resolve_env_from_secret(x_token)
+    if env is None:
+        raise HTTPException(status_code=401, detail="Invalid secret")
+
+    entry = await bundle_cache.get(env)
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return encoded_response(entry.body, entry.variants, accept_encoding, headers)
+
+
+@router.get("/env/events", dependencies=[Depends(require_database)])
+async def get_secure_view_events(
+    x_token: str = Header(..., alias="X-Token"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Server-sent events for the env resolved from X-Token, so clients can
+    refetch views (or the bootstrap bundle) only when something changed.
+    - `views` events carry the env's view revision (also the event id) and
+      are sent when a view of the env is edited or activated.
+    - The current revision is sent on connect, unless Last-Event-ID says
+      the client already has it.
+    - A `: ping` comment is sent every VIEW_EVENTS_HEARTBEAT seconds.
+    - The stream ends after VIEW_EVENTS_MAX_AGE seconds, or once its key is
+      revoked or paused; the client reconnects (and is authenticated again).
+    """
+    key = await resolve_key_from_secret(x_token)
+    env = await repositories.keys.fetch_env(key) if key is not None else None
+    if env is None:
+        raise HTTPException(status_code=401, detail="Invalid secret")
+
+    try:
+        seen = int(last_event_id) if last_event_id is not None else None
+    except ValueError:
+        seen = None
+    listener = view_events.subscribe(env.id, env.viewsRevision, key.id)
+    if listener is None:
+        raise HTTPException(status_code=503, detail="Too many event streams", headers={"Retry-After": "30"})
+
+    return StreamingResponse(
+        event_stream(view_events, listener, env.slug, send_current=seen is None or seen < env.viewsRevision),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(view_events.unsubscribe, listener),  # also if the stream never started
+    )
 
 
 @router.get("/{view_id}", response_model=dict)
 async def get_secure_view(
     view_id: str,
-    x_token: str = Header(..., alias="X-Token")  # not optional
+    x_token: str = Header(..., alias="X-Token"),  # not optional
+    accept_encoding: Optional[str] = Header(None, alias="Accept-Encoding"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    since: Optional[str] = Query(None, description="ETag of the version the client has"),
 ):
     """
     Fetch a view by view_id + env, secured by X-Token header.
     - X-Token is matched against active EnvKeys.
     - EnvId is resolved from the secret.
     - View is returned only if it belongs to that Env.
+    - The expanded JSON is cached per view version (shared by views on the
+      same layout), precompressed.
+    - Responses carry the view version and masters revision as an ETag; a
+      matching If-None-Match gets 304. With `?since=<ETag>` of an older version still in the
+      server's history, the answer is a JSON Patch (RFC 6902,
+      application/json-patch+json) from that version; otherwise the full view.
+    - With SNAPSHOT_MODE=only the snapshot file answers; with
+      SNAPSHOT_MODE=fallback it answers when MongoDB is unreachable.
     """
+    if settings.SNAPSHOT_MODE == "only":
+        return _secure_view_from_snapshot(view_id, x_token)
+    try:
+        return await _secure_view_from_db(view_id, x_token, accept_encoding, if_none_match, since)
+    except PyMongoError:
+        if settings.SNAPSHOT_MODE == "fallback" and snapshot_store.loaded:
+            return _secure_view_from_snapshot(view_id, x_token)
+        raise
+
+
+def _secure_view_from_snapshot(view_id: str, x_token: str) -> Response:
+    env_id = snapshot_store.resolve_env_id(x_token)
+    if env_id is None:
+        raise HTTPException(status_code=401, detail="Invalid secret")
+    body = snapshot_store.get_view(env_id, view_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="View not found")
+    return Response(content=body, media_type="application/json", headers={"X-Served-From": "snapshot"})
+
 
+def _view_etag(view) -> str:
+    # Edits bump the version, master edits the masters revision
+    return f'"{view.id}-{view.version}.{view.mastersRevision}"'
+
+
+def _parse_view_etag(etag: Optional[str]) -> Optional[tuple]:
+    """(view id, (version, masters revision)) from an ETag made by _view_etag, or None."""
+    if not etag:
+        return None
+    view_id, _, tag = strip_weak(etag).strip('"').rpartition("-")
+    version, _, masters = tag.partition(".")
+    try:
+        return view_id, (int(version), int(masters))
+    except ValueError:
+        return None
+
+
+async def _secure_view_from_db(
+    view_id: str,
+    x_token: str,
+    accept_encoding: Optional[str],
+    if_none_match: Optional[str] = None,
+    since: Optional[str] = None,
+) -> Response:
     # 1. Validate secret
     lookup_response = await resolve_env_from_secret(x_token)
     if lookup_response is None:
         raise HTTPException(status_code=401, detail="Invalid secret")
-    env_id = str(lookup_response.id)
-    # 2. Fetch the view for that env + view_id
-    conditions = [View.name == view_id]
-    try:
-        conditions.append(View.viewId == int(view_id))
-    except ValueError:
-        pass  # not an int, only match name
 
-    view_doc = await View.find_one(
-        Or(*conditions),
-        View.env.id == PydanticObjectId(env_id),
-        View.status == "active"
-    )
+    # 2. Fetch the active view for that env, by name or numeric viewId
+    view_doc = await repositories.views.find_active(lookup_response.id, view_id)
     if not view_doc:
         raise HTTPException(status_code=404, detail="View not found")
 
-    # 3. Expand to full view
-    return await view_doc.expand_full()
+    headers = {"ETag": _view_etag(view_doc)}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    # 3. Expand to full view, once per view version
+    key, version = view_doc.expansion_key
+    entry = view_cache.get(key, version)
+    if entry is None:
+        # Cached (and kept for deltas) under this version, so never build from a lagging secondary:
+        # the masters are then at least as new as the revision the key names
+        with primary_reads():
+            menu_masters, sub_menu_masters = await repositories.views.load_masters([view_doc])
+            expanded = await view_doc.expand_full(menu_masters, sub_menu_masters)
+        entry = await view_cache.put(key, version, expanded)
+    current = (view_doc.version, view_doc.mastersRevision)
+    view_history.record(view_doc.id, current, entry.body)
+
+    # 4. Delta from the client's version, if it is still in the history and smaller
+    base = _parse_view_etag(since)
+    if base is not None and base[0] == str(view_doc.id) and base[1] != current:
+        patch = await view_history.delta(view_doc.id, base[1], current)
+        if patch is not None and len(patch) < len(entry.body):
+            headers["X-Delta-Base"] = since
+            return Response(content=patch, media_type="application/json-patch+json", headers=headers)
+    return encoded_response(entry.body, entry.variants, accept_encoding, headers)
@@ -1,9 +1,12 @@
 """
 Health check and statistics API endpoints.
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
 
-from app.models import Item
+from app.loop_monitor import loop_monitor
+from app.profiler import check_admin_secret
+from app.repositories import repositories
 
 router = APIRouter()
 
@@ -19,7 +22,7 @@ async def health_check():
     """Health check endpoint to verify database connection."""
     try:
         # Test database connection by counting documents
-        count = await Item.count()
+        count = await repositories.items.count()
         return {
             "status": "healthy",
             "database": "connected",
@@ -35,14 +38,28 @@ async def health_check():
 @router.get("/stats", tags=["Statistics"])
 async def get_statistics():
     """Get database statistics."""
-    total_items = await Item.count()
-    avg_price = await Item.aggregate([
-        {"$group": {"_id": None, "avg_price": {"$avg": "$price"}}}
-    ]).to_list()
-    
-    avg_price_value = avg_price[0]["avg_price"] if avg_price else 0
+    total_items = await repositories.items.count()
+    avg_price_value = await repositories.items.average_price()
     
     return {
         "total_items": total_items,
         "average_price": round(avg_price_value, 2) if avg_price_value else 0
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/health/loop", tags=["Health"])
+async def event_loop_health(x_profile_secret: str = Header(..., alias="X-Profile-Secret")):
+    """
+    Event-loop lag histogram and the most recent blocking calls (with stacks
+    and routes). Stacks reveal code and request paths, so this needs the
+    profiler admin secret like /debug.
+    """
+    if not check_admin_secret(x_profile_secret):
+        raise HTTPException(status_code=403, detail="Invalid profiler secret")
+    return loop_monitor.snapshot()
+
+
+@router.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus exposition of the event-loop lag histogram."""
+    return loop_monitor.histogram.to_prometheus("event_loop_lag_seconds")
@@ -1,16 +1,27 @@
 """
 Item CRUD API endpoints.
 """
-from typing import List, Optional
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
 from beanie import PydanticObjectId
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pydantic import ValidationError
 
+from app.jobs import JobContext, job_handler, job_runner, require_job_workers
 from app.models import Item
-from app.schemas import ItemCreate, ItemUpdate
+from app.repositories import ItemDeleteMany, ItemInsert, ItemSet, ItemWrite, repositories
+from app.schemas import ItemCreate, ItemUpdate, ItemBulkDelete, ItemBulkRowError, ItemBulkResult
 
 router = APIRouter(prefix="/items", tags=["Items"])
 
+BULK_CHUNK_SIZE = 1000  # writes per bulk round trip
+MAX_REPORTED_ERRORS = 1000  # further row errors are only counted
+IMPORT_BUCKET = "itemImports"  # GridFS bucket holding uploaded import files until their job ends
+
 
 @router.post("/", response_model=Item, status_code=201)
 async def create_item(item_data: ItemCreate):
@@ -19,11 +30,246 @@ async def create_item(item_data: ItemCreate):
     item = Item(**item_data.model_dump())
     
     # Save to database
-    await item.insert()
+    await repositories.items.insert(item)
     
     return item
 
 
+# ------------------------------
+# Bulk helpers
+# ------------------------------
+def _format_validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()
+    )
+
+
+def _add_error(result: ItemBulkResult, row: int, error: str):
+    result.errorCount += 1
+    if len(result.errors) < MAX_REPORTED_ERRORS:
+        result.errors.append(ItemBulkRowError(row=row, error=error))
+
+
+def _parse_create(row: Any) -> ItemInsert:
+    """Validate one row with ItemCreate and turn it into an insert."""
+    if not isinstance(row, dict):
+        raise ValueError("row must be an object")
+    return ItemInsert(Item(**ItemCreate.model_validate(row).model_dump()))
+
+
+def _parse_update(row: Any) -> ItemSet:
+    """Validate one row ({"id": ..., <ItemUpdate fields>}) and turn it into an update."""
+    if not isinstance(row, dict) or "id" not in row:
+        raise ValueError("row must be an object with an 'id'")
+    fields = dict(row)
+    item_id = PydanticObjectId(fields.pop("id"))
+    update_data = ItemUpdate.model_validate(fields).model_dump(exclude_unset=True)
+    if not update_data:
+        raise ValueError("No fields to update")
+    return ItemSet(item_id, update_data)
+
+
+async def _flush(writes: List[Tuple[int, ItemWrite]], result: ItemBulkResult):
+    """Apply one unordered batch of writes and fold its counts and per-row errors into result."""
+    if not writes:
+        return
+    rows = [row for row, _ in writes]
+    outcome = await repositories.items.apply_bulk([write for _, write in writes])
+    for index, error in outcome.errors:
+        _add_error(result, rows[index], error)
+    result.inserted += outcome.inserted
+    result.matched += outcome.matched
+    result.modified += outcome.modified
+    result.deleted += outcome.deleted
+    writes.clear()
+
+
+async def _bulk_apply(
+    rows: AsyncIterator[Tuple[int, Any]],
+    parse,
+    result: ItemBulkResult,
+    on_flush: Optional[Callable[[ItemBulkResult], Awaitable[None]]] = None,
+) -> ItemBulkResult:
+    """
+    Validate rows one by one and write them in chunks of BULK_CHUNK_SIZE.
+    `on_flush` is called with the running result after each chunk is written.
+    """
+    ops: List[Tuple[int, ItemWrite]] = []
+    async for row_number, row in rows:
+        result.received += 1
+        try:
+            ops.append((row_number, parse(row)))
+        except ValidationError as e:
+            _add_error(result, row_number, _format_validation_error(e))
+            continue
+        except Exception as e:
+            _add_error(result, row_number, str(e))
+            continue
+        if len(ops) >= BULK_CHUNK_SIZE:
+            await _flush(ops, result)
+            if on_flush:
+                await on_flush(result)
+    await _flush(ops, result)
+    return result
+
+
+async def _enumerate_rows(rows: List[Any]) -> AsyncIterator[Tuple[int, Any]]:
+    for i, row in enumerate(rows, start=1):
+        yield i, row
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Yield decoded, non-empty lines from a body as it streams in."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield buffer.rstrip("\r")
+
+
+async def _ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    row_number = 0
+    async for line in _iter_lines(chunks):
+        row_number += 1
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_number, ValueError(f"invalid JSON: {e.msg}")
+
+
+async def _csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    CSV with a header row. Records are parsed line by line, so quoted
+    fields must not contain newlines. Empty cells are treated as missing.
+    """
+    header: Optional[List[str]] = None
+    row_number = 0
+    async for line in _iter_lines(chunks):
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, ValueError(f"expected {len(header)} columns, got {len(values)}")
+            continue
+        yield row_number, {k: v for k, v in zip(header, values) if v != ""}
+
+
+def _reject_parse_errors(parse):
+    """Wrap a row parser so rows that already failed to decode are reported as errors."""
+    def wrapped(row: Any):
+        if isinstance(row, Exception):
+            raise row
+        return parse(row)
+    return wrapped
+
+
+# ------------------------------
+# Bulk endpoints
+# ------------------------------
+@router.post("/bulk", response_model=ItemBulkResult)
+async def bulk_create_items(rows: List[Dict[str, Any]]):
+    """Create many items; invalid rows are reported and skipped."""
+    return await _bulk_apply(_enumerate_rows(rows), _parse_create, ItemBulkResult())
+
+
+@router.put("/bulk", response_model=ItemBulkResult)
+async def bulk_update_items(rows: List[Dict[str, Any]]):
+    """Partially update many items. Each row is {"id": ..., <fields to update>}."""
+    return await _bulk_apply(_enumerate_rows(rows), _parse_update, ItemBulkResult())
+
+
+@router.post("/bulk/delete", response_model=ItemBulkResult)
+async def bulk_delete_items(payload: ItemBulkDelete):
+    """Delete many items by ID."""
+    ids = list(dict.fromkeys(payload.ids))
+    result = ItemBulkResult(received=len(ids))
+    ops = [
+        (i + 1, ItemDeleteMany(ids[i:i + BULK_CHUNK_SIZE]))
+        for i in range(0, len(ids), BULK_CHUNK_SIZE)
+    ]
+    await _flush(ops, result)
+    return result
+
+
+# ------------------------------
+# Import (background job)
+# ------------------------------
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/x-jsonlines": "ndjson",
+}
+
+
+def _import_bucket() -> AsyncIOMotorGridFSBucket:
+    return AsyncIOMotorGridFSBucket(Item.get_motor_collection().database, bucket_name=IMPORT_BUCKET)
+
+
+async def _delete_import_file(params: Dict[str, Any]):
+    await _import_bucket().delete(params["fileId"])
+
+
+@job_handler("import_items", concurrency=1, cleanup=_delete_import_file)
+async def run_import_items(job: JobContext) -> dict:
+    """
+    Parse and write an uploaded import file. Progress is the running
+    ItemBulkResult after each written chunk; a retry resumes after the
+    rows it already accounts for.
+    """
+    download = await _import_bucket().open_download_stream(job.params["fileId"])
+
+    async def chunks() -> AsyncIterator[bytes]:
+        while chunk := await download.readchunk():
+            yield chunk
+
+    result = ItemBulkResult.model_validate(job.checkpoint or {})
+    resume_after = result.received
+    rows = _csv_rows(chunks()) if job.params["format"] == "csv" else _ndjson_rows(chunks())
+
+    async def remaining() -> AsyncIterator[Tuple[int, Any]]:
+        async for row_number, row in rows:
+            if row_number > resume_after:
+                yield row_number, row
+
+    async def checkpoint(partial: ItemBulkResult):
+        await job.progress(partial.model_dump())
+
+    result = await _bulk_apply(remaining(), _reject_parse_errors(_parse_create), result, on_flush=checkpoint)
+    return result.model_dump()
+
+
+@router.post("/import", response_model=dict, status_code=202, dependencies=[Depends(require_job_workers)])
+async def import_items(request: Request):
+    """
+    Import items from a CSV (text/csv, header row required) or NDJSON
+    (application/x-ndjson) request body, in the background.
+    The body is stored as it streams in and an `import_items` job is
+    queued; poll GET /jobs/{jobId} for progress and the ItemBulkResult.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in IMPORT_FORMATS:
+        raise HTTPException(status_code=415, detail="Use text/csv or application/x-ndjson")
+
+    upload = _import_bucket().open_upload_stream("items-import", metadata={"contentType": content_type})
+    async for chunk in request.stream():
+        await upload.write(chunk)
+    await upload.close()
+
+    job = await job_runner.enqueue("import_items", {"fileId": upload._id, "format": IMPORT_FORMATS[content_type]})
+    return {"jobId": str(job.id), "status": job.status}
+
+
 @router.get("/", response_model=List[Item])
 async def get_items(
     skip: int = 0, 
@@ -33,20 +279,14 @@ async def get_items(
     max_price: Optional[float] = None
 ):
     """Get all items with optional filtering and pagination."""
-    # Build query filters
-    query = {}
-    
-    if name:
-        query["name"] = {"$regex": name, "$options": "i"}  # Case-insensitive search
-    
-    if min_price is not None:
-        query.setdefault("price", {})["$gte"] = min_price
-        
-    if max_price is not None:
-        query.setdefault("price", {})["$lte"] = max_price
-    
-    # Execute query with pagination
-    items = await Item.find(query).skip(skip).limit(limit).to_list()
+    # Name is a case-insensitive search; prices bound the range
+    items = await repositories.items.find(
+        skip=skip,
+        limit=limit,
+        name=name,
+        min_price=min_price,
+        max_price=max_price
+    )
     
     return items
 
@@ -54,7 +294,7 @@ async def get_items(
 @router.get("/{item_id}", response_model=Item)
 async def get_item(item_id: PydanticObjectId):
     """Get a specific item by ID."""
-    item = await Item.get(item_id)
+    item = await repositories.items.get(item_id)
     
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -65,46 +305,35 @@ async def get_item(item_id: PydanticObjectId):
 @router.put("/{item_id}", response_model=Item)
 async def update_item(item_id: PydanticObjectId, item_update: ItemUpdate):
     """Update an existing item."""
-    # Find the item
-    item = await Item.get(item_id)
-    
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    
     # Update only provided fields
     update_data = item_update.model_dump(exclude_unset=True)
     
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    # Update the item
-    await item.update({"$set": update_data})
+    # Update and fetch the item in one round trip
+    item = await repositories.items.update(item_id, update_data)
+    
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
     
-    # Return the updated item
-    return await Item.get(item_id)
+    return item
 
 
 @router.delete("/{item_id}")
 async def delete_item(item_id: PydanticObjectId):
     """Delete an item by ID."""
-    item = await Item.get(item_id)
+    deleted = await repositories.items.delete(item_id)
     
-    if not item:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Item not found")
     
-    await item.delete()
-    
     return {"message": "Item deleted successfully"}
 
 
 @router.get("/search/{search_term}", response_model=List[Item])
 async def search_items(search_term: str, limit: int = 10):
     """Search items by name or description."""
-    items = await Item.find({
-        "$or": [
-            {"name": {"$regex": search_term, "$options": "i"}},
-            {"description": {"$regex": search_term, "$options": "i"}}
-        ]
-    }).limit(limit).to_list()
+    items = await repositories.items.search(search_term, limit)
     
     return items
\ No newline at end of file
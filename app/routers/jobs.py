@@ -0,0 +1,69 @@
+"""
+Background job status and control endpoints (see app/jobs.py).
+"""
+from typing import Optional
+
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.config import settings
+from app.jobs import JobContext, job_handler, job_json, job_runner, require_job_workers
+from app.models import Job
+from app.snapshot import export_snapshot, snapshot_store
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/", response_model=dict)
+async def list_jobs(
+    type: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Most recent jobs first, optionally filtered by type and status."""
+    query = {}
+    if type:
+        query["type"] = type
+    if status:
+        query["status"] = status
+    cursor = Job.get_motor_collection().find(query).sort("createdAt", -1).limit(limit)
+    return {"jobs": [job_json(job) async for job in cursor]}
+
+
+@router.get("/{job_id}", response_model=dict)
+async def get_job(job_id: PydanticObjectId):
+    """Status, progress and (once finished) result or error of a job."""
+    job = await Job.get_motor_collection().find_one({"_id": job_id})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_json(job)
+
+
+@router.post("/{job_id}/cancel", response_model=dict)
+async def cancel_job(job_id: PydanticObjectId):
+    """
+    Cancel a job. Queued jobs are cancelled immediately; running jobs are
+    flagged (`cancelRequested`) and stop within a lease renewal interval.
+    """
+    job = await job_runner.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_json(job)
+
+
+# ------------------------------
+# Snapshot export
+# ------------------------------
+@job_handler("export_snapshot", concurrency=1)
+async def run_export_snapshot(job: JobContext) -> dict:
+    result = await export_snapshot(job.params["path"])
+    if snapshot_store.path == job.params["path"]:
+        snapshot_store.open(job.params["path"])  # serve the new file on the worker that wrote it
+    return result
+
+
+@router.post("/snapshot", response_model=dict, status_code=202, dependencies=[Depends(require_job_workers)])
+async def enqueue_snapshot_export():
+    """Rebuild the offline view snapshot (SNAPSHOT_PATH) in the background."""
+    job = await job_runner.enqueue("export_snapshot", {"path": settings.SNAPSHOT_PATH})
+    return {"jobId": str(job.id), "status": job.status}
@@ -1,12 +1,123 @@
 from datetime import datetime
-from fastapi import APIRouter, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from pydantic import BaseModel, field_validator
 from beanie import PydanticObjectId
 
-from app.models import Env, MenuMaster, View, SubMenuMaster
+from app.cache import bundle_cache, encode_json, etag_matches, masters_cache
+from app.compression import encoded_response
+from app.database import require_mongo
+from app.jobs import JobContext, job_handler, job_runner, require_job_workers
+from app.models import Env, MasterTombstone, MenuMaster, View, SubMenuMaster
+from app.models.views import (
+    ActiveViewConflict,
+    EditRejected,
+    VersionConflict,
+    ViewMenuMap,
+    ViewSubMenuMap,
+    next_master_revision,
+    stamp_master,
+)
+from app.read_routing import use_read_preference
+from app.repositories import repositories
 
 router = APIRouter(prefix="/views", tags=["Views"])
 
 
+# ---------------------------
+# Pydantic Schemas (partial updates)
+# ---------------------------
+class EntityOrder(BaseModel):
+    subMenuId: PydanticObjectId
+    order: int
+
+
+class MenuOrder(BaseModel):
+    menuId: PydanticObjectId
+    order: Optional[int] = None
+    entities: List[EntityOrder] = []
+
+    @field_validator("entities")
+    @classmethod
+    def unique_entities(cls, entities: List[EntityOrder]) -> List[EntityOrder]:
+        # An entity named twice would get two conflicting orders
+        if len({e.subMenuId for e in entities}) != len(entities):
+            raise ValueError("Duplicate subMenuId")
+        return entities
+
+
+class ReorderPatch(BaseModel):
+    version: int
+    menus: List[MenuOrder]
+
+    @field_validator("menus")
+    @classmethod
+    def unique_menus(cls, menus: List[MenuOrder]) -> List[MenuOrder]:
+        if len({m.menuId for m in menus}) != len(menus):
+            raise ValueError("Duplicate menuId")
+        return menus
+
+
+class VisibilityPatch(BaseModel):
+    version: int
+    visible: Optional[bool]  # null clears the override (falls back to SubMenuMaster.visible)
+
+
+class EntityAdd(BaseModel):
+    version: int
+    subMenuId: PydanticObjectId
+    order: Optional[int] = None
+    visible: Optional[bool] = None
+
+
+def _not_null(value):
+    # Fields may be left out of a patch, but only `icon` may be cleared
+    if value is None:
+        raise ValueError("May not be null")
+    return value
+
+
+class MenuMasterPatch(BaseModel):
+    label: Optional[str] = None
+    icon: Optional[str] = None
+
+    reject_null = field_validator("label")(_not_null)
+
+
+class SubMenuMasterPatch(BaseModel):
+    label: Optional[str] = None
+    link: Optional[str] = None
+    icon: Optional[str] = None
+    visible: Optional[bool] = None
+
+    reject_null = field_validator("label", "link", "visible")(_not_null)
+
+
+async def _edit_view(view_id: str, version: int, change) -> int:
+    """Apply an in-place edit through the repository and map its failures to HTTP errors."""
+    try:
+        new_version = await repositories.views.edit(PydanticObjectId(view_id), version, change)
+    except (VersionConflict, EditRejected) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if new_version is None:
+        raise HTTPException(status_code=404, detail="View not found")
+    return new_version
+
+
+def _menus_with(menus: List[ViewMenuMap], menu_id: PydanticObjectId) -> List[ViewMenuMap]:
+    return [menu for menu in menus if menu.menuId == menu_id]
+
+
+def _entities_with(menus: List[ViewMenuMap], menu_id: PydanticObjectId, sub_menu_id: PydanticObjectId):
+    """(menu, entity) pairs for the entity inside the view's menus with that id."""
+    return [
+        (menu, entity)
+        for menu in _menus_with(menus, menu_id)
+        for entity in menu.subMenus
+        if entity.subMenuId == sub_menu_id
+    ]
+
+
 # ------------------------------
 # Create a new View mapping
 # ------------------------------
@@ -66,7 +177,7 @@ async def create_view(data: dict):
     }
     """
     try:
-        env = await Env.get(PydanticObjectId(data["envId"]))
+        env = await repositories.envs.get(PydanticObjectId(data["envId"]))
         if not env:
             raise HTTPException(status_code=404, detail=f"Env {data['envId']} not found")
         view_data = data["viewData"]
@@ -77,26 +188,26 @@ async def create_view(data: dict):
         menus_for_view = []
         for menu in view_data.get("menus", []):
             # Find or create MenuMaster
-            menu_master = await MenuMaster.find_one(MenuMaster.name == menu["name"])
+            menu_master = await repositories.views.find_menu_master(menu["name"])
             if not menu_master:
-                menu_master = MenuMaster(name=menu["name"], label=menu.get("label", menu["name"]), icon=menu.get("icon"))
-                await menu_master.insert()
+                menu_master = await repositories.views.insert_menu_master(
+                    MenuMaster(name=menu["name"], label=menu.get("label", menu["name"]), icon=menu.get("icon"))
+                )
             menu_id = menu_master.id
 
             # Build subMenus for ViewMenuMap
             sub_menus_for_view = []
             for sm in menu.get("entities", []):
                 # Find or create SubMenuMaster
-                sub_menu_master = await SubMenuMaster.find_one(SubMenuMaster.name == sm["name"])
+                sub_menu_master = await repositories.views.find_sub_menu_master(sm["name"])
                 if not sub_menu_master:
-                    sub_menu_master = SubMenuMaster(
+                    sub_menu_master = await repositories.views.insert_sub_menu_master(SubMenuMaster(
                         name=sm["name"],
                         label=sm.get("label", sm["name"]),
                         link=sm.get("link"),
                         icon=sm.get("icon"),
                         visible=sm.get("visible", True)
-                    )
-                    await sub_menu_master.insert()
+                    ))
                 sub_menu_id = sub_menu_master.id
 
                 sub_menus_for_view.append({
@@ -119,8 +230,14 @@ async def create_view(data: dict):
             "status": view_data.get("status", "draft")
         }
 
+        activate = view_data_object["status"] == "active"
+        if activate:
+            view_data_object["status"] = "draft"  # activated below, replacing any sibling
         view = View(**view_data_object)
-        await view.insert()
+        await repositories.views.insert(view)
+        if activate:
+            await repositories.views.activate(view.id)
+            bundle_cache.schedule_rebuild(env.id)
         return {"id": str(view.id), "message": "View mapping created successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -129,15 +246,15 @@ async def create_view(data: dict):
 # ------------------------------
 # Get expanded View JSON
 # ------------------------------
-@router.get("/{view_id}", response_model=dict)
+@router.get("/{view_id}", response_model=dict, dependencies=[Depends(use_read_preference("views"))])
 async def get_view(view_id: str):
     """
     Fetch and expand a view into full JSON format.
     """
-    view_doc = await View.get_full_view(PydanticObjectId(view_id))
-    if not view_doc:
+    view = await repositories.views.get(PydanticObjectId(view_id))
+    if not view:
         raise HTTPException(status_code=404, detail="View not found")
-    return view_doc
+    return await view.expand_full()
 
 
 # ------------------------------
@@ -147,14 +264,18 @@ async def get_view(view_id: str):
 async def activate_view(view_id: str):
     """
     Mark the given view as active, deactivate others
-    with the same env and viewName.
+    with the same env and viewName. 409 if another active
+    view of the env has its viewId.
     """
-    view = await View.get(PydanticObjectId(view_id))
-    if not view:
+    try:
+        env_id = await repositories.views.activate(PydanticObjectId(view_id))
+    except ActiveViewConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not env_id:
         raise HTTPException(status_code=404, detail="View not found")
 
-    await view.set_active()
-    return {"id": str(view.id), "status": view.status, "message": "View activated successfully"}
+    bundle_cache.schedule_rebuild(env_id)
+    return {"id": view_id, "status": "active", "message": "View activated successfully"}
 
 # ------------------------------
 # List all Views for an Env
@@ -164,7 +285,7 @@ async def list_views_for_env(env_id: str):
     """
     List all views for a given envId.
     """
-    views = await View.find(View.env.id == PydanticObjectId(env_id)).to_list()
+    views = await repositories.views.list_for_env(PydanticObjectId(env_id))
     result = [
         {
             "id": str(view.id),
@@ -180,83 +301,247 @@ async def list_views_for_env(env_id: str):
 # Copy a View to multiple envIds
 # ------------------------------
 
-@router.post("/copy", response_model=dict)
+@job_handler("copy_view", concurrency=2)
+async def run_copy_view(job: JobContext) -> dict:
+    """
+    Copy a view to each env in turn. Progress records the envs done so far,
+    so a retry continues where the failed attempt stopped. The new views'
+    ids are fixed up front, so a retry can tell whether the copy in flight
+    when the previous attempt stopped was written, and does not write it twice.
+    """
+    src_view = await repositories.views.get(PydanticObjectId(job.params["viewId"]))
+    if not src_view:
+        raise ValueError("Source view not found")
+
+    env_ids = job.params["envIds"]
+    progress = job.checkpoint or {"done": 0, "total": len(env_ids), "copiedViewIds": []}
+    # Only the copy in flight when a previous attempt stopped may be written already
+    in_doubt = progress["done"] if "viewIds" in progress else None
+    if in_doubt is None:
+        progress["viewIds"] = [str(PydanticObjectId()) for _ in env_ids]
+        await job.progress(progress)
+    for index in range(progress["done"], len(env_ids)):
+        env = await repositories.envs.get(PydanticObjectId(env_ids[index]))
+        if env:  # skip invalid envs
+            view_id = PydanticObjectId(progress["viewIds"][index])
+            if index != in_doubt or not await repositories.views.get(view_id):
+                # Prepare new view data
+                new_view_data = src_view.dict()
+                new_view_data["id"] = view_id
+                new_view_data["env"] = env
+                new_view_data["status"] = "draft"
+                new_view_data["version"] = 0
+                new_view_data["createdAt"] = datetime.utcnow()
+
+                new_view = View(**new_view_data)
+                await repositories.views.insert(new_view)
+                src_view.layout = new_view.layout  # later copies share the layout stored for the first
+            progress["copiedViewIds"].append(str(view_id))
+        progress["done"] += 1
+        await job.progress(progress)
+
+    copied = progress["copiedViewIds"]
+    return {"copiedViewIds": copied, "message": f"Copied view to {len(copied)} envs"}
+
+
+@router.post("/copy", response_model=dict, status_code=202, dependencies=[Depends(require_job_workers)])
 async def copy_view_to_envs(data: dict):
     """
-    Copy a view to multiple envIds.
+    Copy a view to multiple envIds, in the background.
     Input example:
     {
         "viewId": "<view_id>",
         "envIds": ["<env_id_1>", "<env_id_2>"]
     }
+    Returns the id of a `copy_view` job; GET /jobs/{jobId} reports progress
+    and, once done, the copied view ids.
     """
+    view_id = data.get("viewId")
+    env_ids = data.get("envIds", [])
+    if not view_id or not env_ids:
+        raise HTTPException(status_code=400, detail="viewId and envIds are required")
     try:
-        view_id = data.get("viewId")
-        env_ids = data.get("envIds", [])
-        if not view_id or not env_ids:
-            raise HTTPException(status_code=400, detail="viewId and envIds are required")
-
-        # Fetch the source view
-        src_view = await View.get(PydanticObjectId(view_id))
-        if not src_view:
-            raise HTTPException(status_code=404, detail="Source view not found")
-
-        copied_ids = []
-        for env_id in env_ids:
-            env = await Env.get(PydanticObjectId(env_id))
-            if not env:
-                continue  # skip invalid envs
-
-            # Prepare new view data
-            new_view_data = src_view.dict()
-            new_view_data["env"] = env
-            new_view_data["status"] = "draft"
-            new_view_data["createdAt"] = datetime.utcnow()
-            new_view_data.pop("id", None)  # Remove id for new document
-
-            new_view = View(**new_view_data)
-            await new_view.insert()
-            copied_ids.append(str(new_view.id))
-
-        return {"copiedViewIds": copied_ids, "message": f"Copied view to {len(copied_ids)} envs"}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        src_id = PydanticObjectId(view_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid viewId")
+    if not await repositories.views.get(src_id):
+        raise HTTPException(status_code=404, detail="Source view not found")
+
+    job = await job_runner.enqueue("copy_view", {"viewId": view_id, "envIds": [str(e) for e in env_ids]})
+    return {"jobId": str(job.id), "status": job.status, "message": f"Copying view to {len(env_ids)} envs"}
 
 
 
 # ------------------------------
 # List all MenuMaster and SubMenuMaster
 # ------------------------------
-@router.get("/menus/all", response_model=dict)
-async def list_menu_and_submenu_master():
+def _menu_master_json(menu: MenuMaster) -> dict:
+    return {
+        "id": str(menu.id),
+        "name": menu.name,
+        "label": menu.label,
+        "icon": menu.icon,
+        "createdAt": menu.createdAt,
+        "updatedAt": menu.updatedAt,
+        "revision": menu.revision,
+    }
+
+
+def _sub_menu_master_json(submenu: SubMenuMaster) -> dict:
+    return {
+        "id": str(submenu.id),
+        "name": submenu.name,
+        "label": submenu.label,
+        "link": submenu.link,
+        "icon": submenu.icon,
+        "visible": submenu.visible,
+        "createdAt": submenu.createdAt,
+        "updatedAt": submenu.updatedAt,
+        "revision": submenu.revision,
+    }
+
+
+@router.get("/menus/all", response_model=dict, dependencies=[Depends(use_read_preference("views"))])
+async def list_menu_and_submenu_master(
+    since: Optional[int] = Query(None, ge=0),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    accept_encoding: Optional[str] = Header(None, alias="Accept-Encoding")
+):
     """
     List all MenuMaster and SubMenuMaster documents in one response.
+    - The listing carries the catalog `revision`, also exposed as an ETag;
+      a matching If-None-Match gets 304. It is cached (precompressed) per revision.
+    - With `?since=<revision>` only masters added or changed after that
+      revision are returned, plus the ids of deleted ones, and the new
+      revision to pass next time. Clients start from the full listing's revision.
+    - The revision is read before the masters and is one every earlier
+      write is visible at (see masters_revision), so a sync never misses a write.
     """
-    menus = await MenuMaster.find_all().to_list()
-    submenus = await SubMenuMaster.find_all().to_list()
-    menu_result = [
-        {
-            "id": str(menu.id),
-            "name": menu.name,
-            "label": menu.label,
-            "icon": menu.icon,
-            "createdAt": menu.createdAt,
-        }
-        for menu in menus
-    ]
-    submenu_result = [
-        {
-            "id": str(submenu.id),
-            "name": submenu.name,
-            "label": submenu.label,
-            "link": submenu.link,
-            "icon": submenu.icon,
-            "visible": submenu.visible,
-            "createdAt": submenu.createdAt,
+    revision, settled = await repositories.views.masters_revision()
+    if since is not None:
+        return await _master_changes(since, revision)
+
+    etag = f'"masters-{revision}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    entry = masters_cache.get("all", revision)
+    if entry is None:
+        menus = await repositories.views.list_menu_masters()
+        submenus = await repositories.views.list_sub_menu_masters()
+        listing = {
+            "revision": revision,
+            "menus": [_menu_master_json(menu) for menu in menus],
+            "submenus": [_sub_menu_master_json(submenu) for submenu in submenus],
         }
-        for submenu in submenus
-    ]
-    return {"menus": menu_result, "submenus": submenu_result}
+        if not settled:
+            # The write of revision + 1 may or may not be listed; don't cache either outcome
+            return Response(content=encode_json(listing), media_type="application/json", headers=headers)
+        entry = await masters_cache.put("all", revision, listing)
+    return encoded_response(entry.body, entry.variants, accept_encoding, headers)
+
+
+async def _master_changes(since: int, revision: int) -> dict:
+    """
+    Masters written after `since`. Writes made while they are read can be
+    included although they are newer than `revision`, and then show up
+    again in the following sync; clients apply changes as upserts by id.
+    """
+    menus = await repositories.views.list_menu_masters(since)
+    submenus = await repositories.views.list_sub_menu_masters(since)
+    tombstones = await repositories.views.list_master_tombstones(since)
+    return {
+        "since": since,
+        "revision": revision,
+        "menus": [_menu_master_json(menu) for menu in menus],
+        "submenus": [_sub_menu_master_json(submenu) for submenu in submenus],
+        "deleted": {
+            "menus": [str(t.masterId) for t in tombstones if t.kind == "menu"],
+            "submenus": [str(t.masterId) for t in tombstones if t.kind == "subMenu"],
+        },
+    }
+
+
+# ------------------------------
+# Edit / delete MenuMaster and SubMenuMaster (MongoDB only)
+# ------------------------------
+async def _touch_views_using(field: str, master):
+    """
+    Record the master's revision on every view that renders it, which
+    changes their expansion keys (View.expansion_key), and bump their envs'
+    view revisions, so cached payloads are rebuilt. `version` is left
+    alone: it guards editor sessions, which a master edit doesn't conflict with.
+    """
+    query = await View.using_master(field, master.id)
+    collection = View.get_motor_collection()
+    env_refs = await collection.distinct("env", query)
+    if not env_refs:
+        return
+    # $max: concurrent edits of two masters may get here out of order
+    await collection.update_many(query, {"$max": {"mastersRevision": master.revision}})
+    for env_ref in env_refs:
+        await Env.bump_views_revision(env_ref.id)
+        bundle_cache.schedule_rebuild(env_ref.id)
+
+
+@router.patch("/menus/{menu_id}", response_model=dict, dependencies=[Depends(require_mongo)])
+async def update_menu_master(menu_id: str, payload: MenuMasterPatch):
+    """Edit a MenuMaster; views that use it are re-rendered."""
+    menu = await MenuMaster.get(PydanticObjectId(menu_id))
+    if not menu:
+        raise HTTPException(status_code=404, detail="MenuMaster not found")
+
+    for field, value in payload.model_dump(exclude_unset=True).items():
+        setattr(menu, field, value)
+    await stamp_master(menu)
+    await menu.replace()
+    await _touch_views_using("menus.menuId", menu)
+    return {"id": menu_id, "revision": menu.revision, "message": "MenuMaster updated"}
+
+
+@router.patch("/submenus/{sub_menu_id}", response_model=dict, dependencies=[Depends(require_mongo)])
+async def update_sub_menu_master(sub_menu_id: str, payload: SubMenuMasterPatch):
+    """Edit a SubMenuMaster; views that use it are re-rendered."""
+    sub_menu = await SubMenuMaster.get(PydanticObjectId(sub_menu_id))
+    if not sub_menu:
+        raise HTTPException(status_code=404, detail="SubMenuMaster not found")
+
+    for field, value in payload.model_dump(exclude_unset=True).items():
+        setattr(sub_menu, field, value)
+    await stamp_master(sub_menu)
+    await sub_menu.replace()
+    await _touch_views_using("menus.subMenus.subMenuId", sub_menu)
+    return {"id": sub_menu_id, "revision": sub_menu.revision, "message": "SubMenuMaster updated"}
+
+
+async def _delete_master(master, kind: str, field: str) -> int:
+    if await View.find(await View.using_master(field, master.id)).first_or_none():
+        raise HTTPException(status_code=409, detail=f"{type(master).__name__} is used by a view")
+    revision = await next_master_revision()
+    await MasterTombstone(kind=kind, masterId=master.id, revision=revision).insert()
+    await master.delete()
+    return revision
+
+
+@router.delete("/menus/{menu_id}", response_model=dict, dependencies=[Depends(require_mongo)])
+async def delete_menu_master(menu_id: str):
+    """Delete a MenuMaster that no view uses (recorded for `?since=` sync)."""
+    menu = await MenuMaster.get(PydanticObjectId(menu_id))
+    if not menu:
+        raise HTTPException(status_code=404, detail="MenuMaster not found")
+    revision = await _delete_master(menu, "menu", "menus.menuId")
+    return {"id": menu_id, "revision": revision, "message": "MenuMaster deleted"}
+
+
+@router.delete("/submenus/{sub_menu_id}", response_model=dict, dependencies=[Depends(require_mongo)])
+async def delete_sub_menu_master(sub_menu_id: str):
+    """Delete a SubMenuMaster that no view uses (recorded for `?since=` sync)."""
+    sub_menu = await SubMenuMaster.get(PydanticObjectId(sub_menu_id))
+    if not sub_menu:
+        raise HTTPException(status_code=404, detail="SubMenuMaster not found")
+    revision = await _delete_master(sub_menu, "subMenu", "menus.subMenus.subMenuId")
+    return {"id": sub_menu_id, "revision": revision, "message": "SubMenuMaster deleted"}
 
 
 
@@ -281,24 +566,32 @@ async def create_view_from_form(data: dict):
     }
     """
     try:
-        env = await Env.get(PydanticObjectId(data["envId"]))
+        env = await repositories.envs.get(PydanticObjectId(data["envId"]))
         if not env:
             raise HTTPException(status_code=404, detail=f"Env {data['envId']} not found")
         view_data = data["viewData"]
         if not view_data:
             raise HTTPException(status_code=400, detail="viewData is required")
 
+        # Fetch every referenced master at once
+        menu_masters = await repositories.views.get_menu_masters(
+            [PydanticObjectId(menu["id"]) for menu in view_data.get("menus", [])]
+        )
+        sub_menu_masters = await repositories.views.get_sub_menu_masters(
+            [PydanticObjectId(sm["id"]) for menu in view_data.get("menus", []) for sm in menu.get("entities", [])]
+        )
+
         # Build menus for View model
         menus_for_view = []
         for menu in view_data.get("menus", []):
-            menu_master = await MenuMaster.get(PydanticObjectId(menu["id"]))
+            menu_master = menu_masters.get(PydanticObjectId(menu["id"]))
             if not menu_master:
                 raise HTTPException(status_code=404, detail=f"MenuMaster {menu['id']} not found")
             menu_id = menu_master.id
 
             sub_menus_for_view = []
             for sm in menu.get("entities", []):
-                sub_menu_master = await SubMenuMaster.get(PydanticObjectId(sm["id"]))
+                sub_menu_master = sub_menu_masters.get(PydanticObjectId(sm["id"]))
                 if not sub_menu_master:
                     raise HTTPException(status_code=404, detail=f"SubMenuMaster {sm['id']} not found")
                 sub_menu_id = sub_menu_master.id
@@ -323,7 +616,110 @@ async def create_view_from_form(data: dict):
         }
 
         view = View(**view_data_object)
-        await view.insert()
+        await repositories.views.insert(view)
         return {"id": str(view.id), "message": "View created successfully (draft)"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+# ------------------------------
+# Partial, in-place View edits
+# ------------------------------
+@router.patch("/{view_id}/menus/order", response_model=dict)
+async def reorder_view_menus(view_id: str, payload: ReorderPatch):
+    """
+    Reorder menus (and optionally the entities inside them) in place.
+    Only the `order` fields named in the payload are written. Every menu
+    and entity named must be part of the view (409 otherwise); naming one
+    twice is rejected (422).
+    Input example:
+    {
+        "version": 3,
+        "menus": [
+            {"menuId": "<menu_id>", "order": 2, "entities": [{"subMenuId": "<sub_menu_id>", "order": 1}]},
+            {"menuId": "<menu_id>", "order": 1}
+        ]
+    }
+    """
+    if not payload.menus:
+        raise HTTPException(status_code=400, detail="No menus to reorder")
+    if all(menu.order is None and not menu.entities for menu in payload.menus):
+        raise HTTPException(status_code=400, detail="No order fields to update")
+
+    def change(menus: List[ViewMenuMap]):
+        for order in payload.menus:
+            targets = _menus_with(menus, order.menuId)
+            if not targets:
+                raise EditRejected("One or more menus or entities are not part of this view")
+            for menu in targets:
+                if order.order is not None:
+                    menu.order = order.order
+                entities = {entity.subMenuId: entity for entity in menu.subMenus}
+                for entity_order in order.entities:
+                    if entity_order.subMenuId not in entities:
+                        raise EditRejected("One or more menus or entities are not part of this view")
+                    entities[entity_order.subMenuId].order = entity_order.order
+
+    version = await _edit_view(view_id, payload.version, change)
+    return {"id": view_id, "version": version, "message": "View reordered successfully"}
+
+
+@router.patch("/{view_id}/menus/{menu_id}/entities/{sub_menu_id}", response_model=dict)
+async def set_view_entity_visibility(view_id: str, menu_id: str, sub_menu_id: str, payload: VisibilityPatch):
+    """
+    Toggle the mapping-level visibility of one entity inside a menu.
+    """
+    menu_oid = PydanticObjectId(menu_id)
+    sub_menu_oid = PydanticObjectId(sub_menu_id)
+
+    def change(menus: List[ViewMenuMap]):
+        found = _entities_with(menus, menu_oid, sub_menu_oid)
+        if not found:
+            raise EditRejected("Entity is not part of this menu")
+        for _, entity in found:
+            entity.visible = payload.visible
+
+    version = await _edit_view(view_id, payload.version, change)
+    return {"id": view_id, "version": version, "message": "Entity visibility updated"}
+
+
+@router.post("/{view_id}/menus/{menu_id}/entities", response_model=dict)
+async def add_view_entity(view_id: str, menu_id: str, payload: EntityAdd):
+    """
+    Add a SubMenuMaster entity to a menu of the view.
+    """
+    menu_oid = PydanticObjectId(menu_id)
+
+    if not await repositories.views.get_sub_menu_masters([payload.subMenuId]):
+        raise HTTPException(status_code=404, detail=f"SubMenuMaster {payload.subMenuId} not found")
+
+    def change(menus: List[ViewMenuMap]):
+        targets = _menus_with(menus, menu_oid)
+        if not targets or _entities_with(menus, menu_oid, payload.subMenuId):
+            raise EditRejected("Menu is not part of this view or already has this entity")
+        for menu in targets:
+            menu.subMenus.append(
+                ViewSubMenuMap(subMenuId=payload.subMenuId, order=payload.order, visible=payload.visible)
+            )
+
+    version = await _edit_view(view_id, payload.version, change)
+    return {"id": view_id, "version": version, "message": "Entity added to menu"}
+
+
+@router.delete("/{view_id}/menus/{menu_id}/entities/{sub_menu_id}", response_model=dict)
+async def remove_view_entity(view_id: str, menu_id: str, sub_menu_id: str, version: int):
+    """
+    Remove an entity from a menu of the view. `version` is passed as a query param.
+    """
+    menu_oid = PydanticObjectId(menu_id)
+    sub_menu_oid = PydanticObjectId(sub_menu_id)
+
+    def change(menus: List[ViewMenuMap]):
+        found = _entities_with(menus, menu_oid, sub_menu_oid)
+        if not found:
+            raise EditRejected("Entity is not part of this menu")
+        for menu, entity in found:
+            menu.subMenus.remove(entity)
+
+    new_version = await _edit_view(view_id, version, change)
+    return {"id": view_id, "version": new_version, "message": "Entity removed from menu"}
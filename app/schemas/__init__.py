@@ -1,3 +1,3 @@
-from .item import ItemCreate, ItemUpdate, ItemResponse
+from .item import ItemCreate, ItemUpdate, ItemResponse, ItemBulkDelete, ItemBulkRowError, ItemBulkResult
 
-__all__ = ["ItemCreate", "ItemUpdate", "ItemResponse"]
\ No newline at end of file
+__all__ = ["ItemCreate", "ItemUpdate", "ItemResponse", "ItemBulkDelete", "ItemBulkRowError", "ItemBulkResult"]
\ No newline at end of file
@@ -2,7 +2,7 @@
 Pydantic schemas for Item API requests and responses.
 """
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from beanie import PydanticObjectId
 from pydantic import BaseModel, Field
@@ -61,4 +61,29 @@ class ItemResponse(BaseModel):
                 "price": 29.99,
                 "created_at": "2023-06-15T10:30:00"
             }
-        }
\ No newline at end of file
+        }
+
+
+class ItemBulkDelete(BaseModel):
+    """Schema for deleting many items at once."""
+    
+    ids: List[PydanticObjectId] = Field(..., min_length=1)
+
+
+class ItemBulkRowError(BaseModel):
+    """A single rejected row in a bulk operation (1-based row number)."""
+    
+    row: int
+    error: str
+
+
+class ItemBulkResult(BaseModel):
+    """Schema for bulk create/update/delete/import results."""
+    
+    received: int = 0
+    inserted: int = 0
+    matched: int = 0
+    modified: int = 0
+    deleted: int = 0
+    errorCount: int = 0
+    errors: List[ItemBulkRowError] = []
@@ -0,0 +1,184 @@
+"""
+Offline snapshot of active secure views.
+
+The exporter writes every active view (already expanded) plus the
+verification material of active env keys into one file:
+
+    header   magic (8 bytes) | index offset (u64) | record count (u64)
+    data     concatenated blobs (expanded view JSON, env ids of keys)
+    index    records sorted by key: sha256(lookup key) (32s) | offset (u64) | length (u32)
+
+The file is mmapped and looked up by binary search over the index, so
+opening it costs the same whatever its size. Only hmac-sha256 keys can be
+indexed; legacy argon2 keys are upgraded on first use (see EnvKeyRepository.find_by_secret).
+A key scheduled for revocation after a rotation (EnvKey.revokeAt) carries
+its revocation time next to the env id and is refused once it has passed.
+
+Export from the command line:
+    python -m app.snapshot export snapshot.bin
+"""
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+from app.config import settings
+from app.models import Env, EnvKey
+from app.models.envs import HASH_SCHEME_HMAC
+from app.repositories import repositories
+
+MAGIC = b"CPSNAP01"
+HEADER = struct.Struct("<8sQQ")
+RECORD = struct.Struct("<32sQI")
+
+
+def _key(kind: str, *parts: str) -> bytes:
+    return hashlib.sha256(":".join((kind, *parts)).encode()).digest()
+
+
+def _secret_key(secret: str) -> bytes:
+    return _key("k", EnvKey.hash_secret(secret, HASH_SCHEME_HMAC))
+
+
+# ------------------------------
+# Export
+# ------------------------------
+async def export_snapshot(path: str) -> dict:
+    """Write the snapshot atomically to `path`. Returns counts of what was exported."""
+    keys = await repositories.keys.list_active([HASH_SCHEME_HMAC])
+    views = await repositories.views.list_active()
+    menu_masters, sub_menu_masters = await repositories.views.load_masters(views)
+
+    blobs: List[bytes] = []
+    entries: Dict[bytes, int] = {}  # lookup key -> blob index
+
+    def add_blob(data: bytes) -> int:
+        blobs.append(data)
+        return len(blobs) - 1
+
+    keys = [key for key in keys if not key.revocation_due()]
+    env_blobs: Dict[str, int] = {}
+    for key in keys:
+        env_id = str(key.envId.id if isinstance(key.envId, Env) else key.envId.ref.id)
+        if key.revokeAt is not None:
+            # "<env id> <revokeAt>", checked when the key is used
+            blob = add_blob(f"{env_id} {key.revokeAt.isoformat()}".encode())
+        else:
+            if env_id not in env_blobs:
+                env_blobs[env_id] = add_blob(env_id.encode())
+            blob = env_blobs[env_id]
+        entries[_key("k", key.hashedSecret)] = blob
+
+    for view in views:
+        expanded = await view.expand_full(menu_masters, sub_menu_masters)
+        blob = add_blob(json.dumps(jsonable_encoder(expanded), separators=(",", ":")).encode())
+        env_id = str(view.env_id)
+        entries[_key("v", env_id, view.name)] = blob
+        entries.setdefault(_key("i", env_id, str(view.viewId)), blob)
+
+    offsets: List[Tuple[int, int]] = []
+    position = HEADER.size
+    for blob in blobs:
+        offsets.append((position, len(blob)))
+        position += len(blob)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, position, len(entries)))
+        for blob in blobs:
+            f.write(blob)
+        for digest in sorted(entries):
+            offset, length = offsets[entries[digest]]
+            f.write(RECORD.pack(digest, offset, length))
+    os.replace(tmp_path, path)
+
+    return {"path": path, "keys": len(keys), "views": len(views), "bytes": position + len(entries) * RECORD.size}
+
+
+# ------------------------------
+# Read-only store
+# ------------------------------
+class SnapshotStore:
+    """Memory-mapped, read-only view of a snapshot file."""
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self._mm: Optional[mmap.mmap] = None
+        self._index_offset = 0
+        self._count = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._mm is not None
+
+    def open(self, path: str):
+        """Map the file; only the header is read."""
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_offset, count = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            mm.close()
+            raise ValueError(f"{path} is not a view snapshot")
+        old, self._mm = self._mm, mm
+        self.path, self._index_offset, self._count = path, index_offset, count
+        if old is not None:
+            old.close()
+
+    def _find(self, digest: bytes) -> Optional[bytes]:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key, offset, length = RECORD.unpack_from(self._mm, self._index_offset + mid * RECORD.size)
+            if key == digest:
+                return self._mm[offset:offset + length]
+            if key < digest:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def resolve_env_id(self, secret: str) -> Optional[str]:
+        """Env id of an indexed key, or None (unknown, or past its scheduled revocation)."""
+        record = self._find(_secret_key(secret))
+        if record is None:
+            return None
+        env_id, _, revoke_at = record.decode().partition(" ")
+        if revoke_at and datetime.fromisoformat(revoke_at) <= datetime.utcnow():
+            return None
+        return env_id
+
+    def get_view(self, env_id: str, view_id: str) -> Optional[bytes]:
+        """Expanded view JSON, matched by name or numeric viewId like get_secure_view."""
+        return self._find(_key("v", env_id, view_id)) or self._find(_key("i", env_id, view_id))
+
+
+# Global store instance (opened in the lifespan when SNAPSHOT_MODE is not "off")
+snapshot_store = SnapshotStore()
+
+
+def require_database():
+    """Route dependency: 503 when the app runs from the snapshot alone (SNAPSHOT_MODE=only)."""
+    if settings.SNAPSHOT_MODE == "only":
+        raise HTTPException(status_code=503, detail="Not available in snapshot-only mode")
+
+
+async def _main(argv: List[str]):
+    from app.database import init_database
+
+    if len(argv) != 2 or argv[0] != "export":
+        print("usage: python -m app.snapshot export <path>")
+        sys.exit(2)
+    await init_database()
+    print(await export_snapshot(argv[1]))
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1:]))
@@ -0,0 +1,208 @@
+"""
+Push of view changes to clients, as server-sent events.
+
+Instead of polling their views, clients keep one connection per env open
+(GET /secure-views/env/events) and refetch when told the env's views
+changed. Every view edit or activation bumps the env's `viewsRevision`;
+one poller per process reads the revisions of the envs that have
+listeners (a single query per VIEW_EVENTS_POLL_INTERVAL, however many
+connections are open) and wakes the connections of the envs that moved.
+
+Idle connections have no timers of their own: the poller also wakes every
+connection once per heartbeat interval. A listener only remembers the
+latest revision it has not sent yet, so a client that reads slowly skips
+intermediate revisions instead of having them buffered.
+
+Keys are checked when a stream connects, so on each heartbeat the poller
+also ends the streams whose key is no longer usable (revoked, paused or
+past its revokeAt) and those older than VIEW_EVENTS_MAX_AGE. Clients
+reconnect with Last-Event-ID and go through authentication again. Ending
+streams also bounds how long they hold up a server shutdown (uvicorn waits
+for open responses before the lifespan shutdown runs).
+"""
+import asyncio
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from beanie import PydanticObjectId
+
+from app.config import settings
+from app.repositories import repositories
+
+
+class Listener:
+    """One open event stream."""
+
+    __slots__ = ("env_id", "key_id", "expires", "revision", "closed", "_pending", "_wakeup")
+
+    def __init__(self, env_id: PydanticObjectId, revision: int, key_id: PydanticObjectId, expires: float):
+        self.env_id = env_id
+        self.key_id = key_id  # the key the stream was opened with
+        self.expires = expires  # loop time after which the stream is ended
+        self.revision = revision  # latest revision sent or queued
+        self.closed = False
+        self._pending: Optional[int] = None
+        self._wakeup = asyncio.Event()
+
+    def notify(self, revision: int):
+        if revision > self.revision:
+            self.revision = self._pending = revision
+            self._wakeup.set()
+
+    def ping(self):
+        self._wakeup.set()
+
+    def close(self):
+        """End the stream at its next wakeup (now)."""
+        self.closed = True
+        self._wakeup.set()
+
+    async def next(self) -> Optional[int]:
+        """Wait for the next revision to send, or None when a heartbeat is due."""
+        await self._wakeup.wait()
+        self._wakeup.clear()
+        revision, self._pending = self._pending, None
+        return revision
+
+
+class ViewEventHub:
+
+    def __init__(self, poll_interval: float, heartbeat_interval: float, max_listeners: int, max_age: float):
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.max_listeners = max_listeners
+        self.max_age = max_age
+        self._listeners: Dict[PydanticObjectId, Set[Listener]] = {}
+        self._count = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def listener_count(self) -> int:
+        return self._count
+
+    def subscribe(self, env_id: PydanticObjectId, revision: int, key_id: PydanticObjectId) -> Optional[Listener]:
+        """
+        Register a stream opened with `key_id` that has seen `revision`;
+        None when the process is at capacity.
+        """
+        if self._count >= self.max_listeners:
+            return None
+        expires = asyncio.get_running_loop().time() + self.max_age
+        listener = Listener(env_id, revision, key_id, expires)
+        self._listeners.setdefault(env_id, set()).add(listener)
+        self._count += 1
+        return listener
+
+    def unsubscribe(self, listener: Listener):
+        listeners = self._listeners.get(listener.env_id)
+        if listeners is None or listener not in listeners:
+            return
+        listeners.discard(listener)
+        self._count -= 1
+        if not listeners:
+            del self._listeners[listener.env_id]
+
+    def publish(self, env_id: PydanticObjectId, revision: int):
+        """Tell the env's listeners about `revision` (each one only if it is newer than what it has)."""
+        for listener in self._listeners.get(env_id, ()):
+            listener.notify(revision)
+
+    def heartbeat(self):
+        for listeners in self._listeners.values():
+            for listener in listeners:
+                listener.ping()
+
+    def _close(self, listeners: List[Listener]):
+        for listener in listeners:
+            listener.close()
+            self.unsubscribe(listener)
+
+    async def close_stale(self):
+        """End the streams past max_age and those whose key is no longer usable."""
+        if not self._listeners:
+            return
+        now = asyncio.get_running_loop().time()
+        listeners = [listener for group in self._listeners.values() for listener in group]
+        self._close([listener for listener in listeners if listener.expires <= now])
+        listeners = [listener for listener in listeners if not listener.closed]
+        if not listeners:
+            return
+        usable = await repositories.keys.usable_ids(
+            list({listener.key_id for listener in listeners}), datetime.utcnow()
+        )
+        self._close([listener for listener in listeners if listener.key_id not in usable])
+
+    async def poll(self):
+        """Read the current revision of every env with listeners and publish it."""
+        if not self._listeners:
+            return
+        revisions = await repositories.envs.views_revisions(list(self._listeners))
+        for env_id, revision in revisions.items():
+            self.publish(env_id, revision)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_heartbeat = loop.time() + self.heartbeat_interval
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                print(f"View event poll failed: {e}")
+            if loop.time() >= next_heartbeat:
+                try:
+                    await self.close_stale()
+                except Exception as e:
+                    print(f"View event key check failed: {e}")
+                self.heartbeat()
+                next_heartbeat = loop.time() + self.heartbeat_interval
+
+    def start(self):
+        """Start the poll / heartbeat loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the loop and end the streams still open."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._close([listener for group in self._listeners.values() for listener in group])
+
+
+def _event(env_slug: str, revision: int) -> bytes:
+    data = json.dumps({"env": env_slug, "revision": revision}, separators=(",", ":"))
+    return f"id: {revision}\nevent: views\ndata: {data}\n\n".encode()
+
+
+async def event_stream(hub: ViewEventHub, listener: Listener, env_slug: str, send_current: bool) -> AsyncIterator[bytes]:
+    """
+    The SSE body of one connection: the current revision first (unless the
+    client already has it), then one event per change and a comment line
+    per heartbeat, until the hub closes the listener. Unsubscribes when the
+    client goes away.
+    """
+    try:
+        first = f"retry: {settings.VIEW_EVENTS_RETRY_MS}\n\n".encode()
+        yield first + _event(env_slug, listener.revision) if send_current else first
+        while True:
+            revision = await listener.next()
+            if listener.closed:
+                return
+            yield _event(env_slug, revision) if revision is not None else b": ping\n\n"
+    finally:
+        hub.unsubscribe(listener)
+
+
+# Global hub instance (started in the lifespan)
+view_events = ViewEventHub(
+    poll_interval=settings.VIEW_EVENTS_POLL_INTERVAL,
+    heartbeat_interval=settings.VIEW_EVENTS_HEARTBEAT,
+    max_listeners=settings.VIEW_EVENTS_MAX_CONNECTIONS,
+    max_age=settings.VIEW_EVENTS_MAX_AGE,
+)
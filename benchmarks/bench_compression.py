@@ -0,0 +1,76 @@
+"""
+Benchmark: precompressed view payloads vs compressing on every request.
+
+Seeds the in-memory backend with one large view (see bench_secure_views)
+and compares, per request:
+  - dynamic:        expand + encode + gzip at GZIP_LEVEL (what every request
+                    cost before view bodies were cached, via GZipMiddleware)
+  - precompressed:  cache hit serving the stored variant
+  - gzip only:       the compression step alone, i.e. the CPU a cached
+                     precompressed variant saves on every request
+and reports the bytes on the wire for each content-coding.
+
+Run from the repo root:
+    python -m benchmarks.bench_compression [--menus 40] [--entities 40]
+"""
+import argparse
+import asyncio
+import gzip
+import time
+
+from app.config import settings
+from benchmarks.bench_secure_views import seed
+
+
+async def rate(call, seconds: float) -> float:
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        await call()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+async def run(menus: int, entities: int, seconds: float):
+    settings.STORAGE_BACKEND = "memory"
+    from app.cache import view_cache
+    from app.compression import brotli
+    from app.database import init_database
+    from app.routers.getView import get_secure_view
+
+    await init_database()
+    secret = await seed(menus, entities)
+
+    async def dynamic():
+        view_cache._entries.clear()
+        response = await get_secure_view("NAV", x_token=secret, accept_encoding=None, if_none_match=None, since=None)
+        gzip.compress(response.body, compresslevel=settings.GZIP_LEVEL)
+
+    async def precompressed():
+        await get_secure_view("NAV", x_token=secret, accept_encoding="gzip, br", if_none_match=None, since=None)
+
+    raw = (await get_secure_view("NAV", x_token=secret, accept_encoding=None, if_none_match=None, since=None)).body
+    sizes = {"identity": len(raw), f"gzip-{settings.GZIP_LEVEL} (dynamic)": len(gzip.compress(raw, settings.GZIP_LEVEL))}
+    for coding in ("gzip", "br"):
+        response = await get_secure_view("NAV", x_token=secret, accept_encoding=coding, if_none_match=None, since=None)
+        if response.headers.get("Content-Encoding") == coding:
+            sizes[f"{coding} (precompressed)"] = len(response.body)
+
+    print(f"{menus}x{entities} view" + ("" if brotli else " (brotli not installed)"))
+    for coding, size in sizes.items():
+        print(f"  {coding:>24}: {size:9d} bytes ({size / len(raw):6.1%})")
+    async def gzip_only():
+        gzip.compress(raw, compresslevel=settings.GZIP_LEVEL)
+
+    for name, call in (("dynamic", dynamic), ("precompressed", precompressed), ("gzip only", gzip_only)):
+        per_second = await rate(call, seconds)
+        print(f"  {name:>24}: {per_second:9.0f} req/s ({1e6 / per_second:9.1f} us/req)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--menus", type=int, default=40)
+    parser.add_argument("--entities", type=int, default=40)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.menus, args.entities, args.seconds))
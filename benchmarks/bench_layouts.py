@@ -0,0 +1,113 @@
+"""
+Benchmark: inline menus vs shared layouts for copied views.
+
+Seeds the in-memory backend with one view (see bench_secure_views), then
+models `--copies` copies of it (one per env, as the copy job makes) and
+reports for both storage schemes:
+  - storage:  BSON bytes of the view documents (plus the layout document)
+  - RAM:      Python heap held by the loaded views (tracemalloc)
+  - cache:    entries and bytes of the expanded-view cache once every
+              copy has been served
+
+Run from the repo root:
+    python -m benchmarks.bench_layouts [--copies 500] [--menus 20] [--entities 20]
+"""
+import argparse
+import asyncio
+import tracemalloc
+
+import bson
+from beanie.odm.utils.encoder import Encoder
+from bson import DBRef, ObjectId
+
+from app.config import settings
+from benchmarks.bench_secure_views import seed
+
+
+def heap(build):
+    """Bytes still allocated by what `build` returns, and the result."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size, result
+
+
+async def fill_cache(views, masters) -> tuple:
+    from app.cache import BodyCache
+
+    cache = BodyCache(max_entries=len(views))
+    for view in views:
+        key, version = view.expansion_key
+        if cache.get(key, version) is None:
+            await cache.put(key, version, await view.expand_full(*masters))
+    entries = cache._entries.values()
+    return len(entries), sum(len(e.body) + sum(map(len, e.variants.values())) for e in entries)
+
+
+async def run(copies: int, menus: int, entities: int):
+    settings.STORAGE_BACKEND = "memory"
+    from app.database import init_database
+    from app.models import View, ViewLayout
+    from app.models.views import ViewMenuMap
+    from app.repositories import repositories
+
+    await init_database()
+    await seed(menus, entities)
+    source = (await repositories.views.list_active())[0]
+    masters = await repositories.views.load_masters([source])
+    tree = Encoder().encode(ViewLayout.normalize(source.menus))
+    layout_id = ViewLayout.hash(source.menus)
+
+    def view_doc(**fields) -> dict:
+        return {
+            "_id": ObjectId(),
+            "env": DBRef("env", ObjectId()),
+            "viewId": source.viewId,
+            "name": source.name,
+            "status": "draft",
+            "version": 0,
+            "createdAt": source.createdAt,
+            **fields,
+        }
+
+    inline_docs = [view_doc(menus=tree) for _ in range(copies)]
+    layout_docs = [view_doc(menus=[], layout=layout_id, mastersRevision=0) for _ in range(copies)]
+
+    inline_bytes = sum(len(bson.encode(doc)) for doc in inline_docs)
+    layout_bytes = sum(len(bson.encode(doc)) for doc in layout_docs)
+    layout_bytes += len(bson.encode({"_id": layout_id, "menus": tree, "storedAt": source.createdAt}))
+
+    # What loading the documents costs: every inline view parses its own tree,
+    # layout views share the one list from the layout cache (View.load_layouts)
+    inline_ram, inline_views = heap(lambda: [View.model_validate(doc) for doc in inline_docs])
+
+    def load_shared():
+        shared = [ViewMenuMap.model_validate(menu) for menu in tree]
+        views = [View.model_validate(doc) for doc in layout_docs]
+        for view in views:
+            view.menus = shared
+        return views
+
+    layout_ram, layout_views = heap(load_shared)
+
+    inline_cache = await fill_cache(inline_views, masters)
+    layout_cache = await fill_cache(layout_views, masters)
+
+    print(f"{copies} copies of a {menus}x{entities} view")
+    print(f"{'':>8} {'storage':>14} {'RAM':>14} {'cache entries':>14} {'cache bytes':>14}")
+    for label, storage, ram, (entries, cached) in (
+        ("inline", inline_bytes, inline_ram, inline_cache),
+        ("layout", layout_bytes, layout_ram, layout_cache),
+    ):
+        print(f"{label:>8} {storage:>14,} {ram:>14,} {entries:>14,} {cached:>14,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--copies", type=int, default=500)
+    parser.add_argument("--menus", type=int, default=20)
+    parser.add_argument("--entities", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.copies, args.menus, args.entities))
@@ -0,0 +1,34 @@
+"""
+Microbenchmark: EnvKey secret verification throughput per core.
+
+Compares argon2 (legacy) with keyed HMAC-SHA256 (current default) on a
+single thread, using secrets produced by `EnvKey.generate_secret`.
+
+Run from the repo root:
+    python -m benchmarks.bench_secret_hashing
+"""
+import time
+
+from app.models.envs import EnvKey, HASH_SCHEME_ARGON2, HASH_SCHEME_HMAC
+
+
+def bench(scheme: str, min_seconds: float = 2.0) -> float:
+    """Return verifications per second for one scheme."""
+    secret = EnvKey.generate_secret()
+    hashed = EnvKey.hash_secret(secret, scheme)
+
+    count = 0
+    start = time.perf_counter()
+    while True:
+        assert EnvKey.verify_secret(secret, hashed, scheme)
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return count / elapsed
+
+
+if __name__ == "__main__":
+    results = {scheme: bench(scheme) for scheme in (HASH_SCHEME_ARGON2, HASH_SCHEME_HMAC)}
+    for scheme, ops in results.items():
+        print(f"{scheme:>12}: {ops:12.0f} verifications/s per core ({1e6 / ops:10.2f} us each)")
+    print(f"{'speedup':>12}: {results[HASH_SCHEME_HMAC] / results[HASH_SCHEME_ARGON2]:12.0f}x")
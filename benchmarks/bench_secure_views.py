@@ -0,0 +1,83 @@
+"""
+Benchmark: secure-view serving path (auth + lookup + expansion), in process.
+
+Seeds one env with a key and a large view, then calls the
+`get_secure_view` handler directly in a loop. With the default `memory`
+backend no MongoDB is needed, so the numbers show the cost of the Python
+hot path alone; run with `--backend mongo` (uses MONGO_URL, writes to
+DATABASE_NAME) to see the same path with the database in the picture.
+
+Run from the repo root:
+    python -m benchmarks.bench_secure_views [--backend memory|mongo] [--menus 20] [--entities 20]
+"""
+import argparse
+import asyncio
+import time
+
+from app.config import settings
+
+
+async def seed(menus: int, entities: int) -> str:
+    """Create an env, an hmac key and one active view; returns the plain secret."""
+    from app.models import Env, EnvKey, MenuMaster, SubMenuMaster, View
+    from app.models.envs import HASH_SCHEME_HMAC
+    from app.repositories import repositories
+
+    suffix = str(time.time_ns())
+    env = await repositories.envs.insert(
+        Env(envName="bench", slug=f"bench-{suffix}", description=None, createdBy="bench")
+    )
+    secret = EnvKey.generate_secret()
+    await repositories.keys.insert(EnvKey(
+        envId=env,
+        hashedSecret=EnvKey.hash_secret(secret, HASH_SCHEME_HMAC),
+        hashScheme=HASH_SCHEME_HMAC,
+        createdBy="bench",
+    ))
+
+    view_menus = []
+    for m in range(menus):
+        menu = await repositories.views.insert_menu_master(
+            MenuMaster(name=f"MENU_{suffix}_{m}", label=f"Menu {m}", icon=None)
+        )
+        sub_menus = []
+        for e in range(entities):
+            sub_menu = await repositories.views.insert_sub_menu_master(SubMenuMaster(
+                name=f"ENTITY_{suffix}_{m}_{e}", label=f"Entity {e}", link=f"/m{m}/e{e}", icon=None
+            ))
+            sub_menus.append({"subMenuId": sub_menu.id, "order": e})
+        view_menus.append({"menuId": menu.id, "order": m, "subMenus": sub_menus})
+
+    await repositories.views.insert(View(env=env, viewId=1, name="NAV", menus=view_menus, status="active"))
+    return secret
+
+
+async def run(backend: str, menus: int, entities: int, seconds: float):
+    settings.STORAGE_BACKEND = backend
+    from app.database import init_database
+    from app.routers.getView import get_secure_view
+
+    await init_database()
+    secret = await seed(menus, entities)
+    await get_secure_view("NAV", x_token=secret, accept_encoding=None, if_none_match=None, since=None)  # warm up (fills the view cache)
+
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        await get_secure_view("NAV", x_token=secret, accept_encoding=None, if_none_match=None, since=None)
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(
+        f"{backend:>6}: {menus}x{entities} view, {count / elapsed:10.0f} req/s "
+        f"({elapsed / count * 1e6:10.1f} us/req)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--menus", type=int, default=20)
+    parser.add_argument("--entities", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.backend, args.menus, args.entities, args.seconds))
@@ -0,0 +1,73 @@
+"""
+Benchmark: JSON Patch deltas vs full secure-view downloads after an edit.
+
+Seeds the in-memory backend with one large view (see bench_secure_views),
+applies typical edits to its expanded JSON (two entities swapped, one
+hidden, one menu moved) and reports for each the bytes a client on the
+previous version downloads in full (identity and gzip) vs as a JSON
+Patch, plus the time to compute the patch (done once per version pair).
+
+Run from the repo root:
+    python -m benchmarks.bench_view_deltas [--menus 40] [--entities 40]
+"""
+import argparse
+import asyncio
+import copy
+import gzip
+import json
+import time
+
+from app.config import settings
+from benchmarks.bench_secure_views import seed
+
+
+def swap_entities(view: dict):
+    entities = view["menus"][0]["entities"]
+    entities[0], entities[1] = entities[1], entities[0]
+    entities[0]["order"], entities[1]["order"] = entities[1]["order"], entities[0]["order"]
+
+
+def hide_entity(view: dict):
+    view["menus"][-1]["entities"][-1]["visible"] = False
+
+
+def move_menu(view: dict):
+    view["menus"].insert(0, view["menus"].pop())
+    for order, menu in enumerate(view["menus"]):
+        menu["order"] = order
+
+
+async def run(menus: int, entities: int):
+    settings.STORAGE_BACKEND = "memory"
+    from app.cache import encode_json
+    from app.database import init_database
+    from app.json_patch import make_patch
+    from app.repositories import repositories
+
+    await init_database()
+    await seed(menus, entities)
+    view = (await repositories.views.list_active())[0]
+    base = encode_json(await view.expand_full())
+    before = json.loads(base)
+
+    print(f"{menus}x{entities} view, full body {len(base)} bytes ({len(gzip.compress(base, 9))} gzipped)")
+    print(f"{'edit':>14} {'full':>10} {'full gzip':>10} {'patch':>10} {'patch gzip':>10} {'diff time':>12}")
+    for edit in (swap_entities, hide_entity, move_menu):
+        after = copy.deepcopy(before)
+        edit(after)
+        full = encode_json(after)
+        start = time.perf_counter()
+        patch = encode_json(make_patch(before, after))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{edit.__name__:>14} {len(full):>10} {len(gzip.compress(full, 9)):>10} "
+            f"{len(patch):>10} {len(gzip.compress(patch, 9)):>10} {elapsed * 1e3:>9.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--menus", type=int, default=40)
+    parser.add_argument("--entities", type=int, default=40)
+    args = parser.parse_args()
+    asyncio.run(run(args.menus, args.entities))
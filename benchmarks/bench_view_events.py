@@ -0,0 +1,84 @@
+"""
+Benchmark: fan-out of view change events to idle SSE connections, in process.
+
+Opens `--connections` event streams spread over `--envs` envs (each one a
+task draining `event_stream`, as StreamingResponse would) and reports:
+  - memory held per idle connection (tracemalloc)
+  - time to deliver one revision to every connection of one env, and to
+    all envs at once
+  - time to deliver a heartbeat to every connection
+No network or database is involved; this is the hub's own cost.
+
+Run from the repo root:
+    python -m benchmarks.bench_view_events [--connections 20000] [--envs 100]
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from beanie import PydanticObjectId
+
+
+async def run(connections: int, envs: int):
+    from app.view_events import ViewEventHub, event_stream
+
+    hub = ViewEventHub(poll_interval=1, heartbeat_interval=15, max_listeners=connections, max_age=3600)
+    env_ids = [PydanticObjectId() for _ in range(envs)]
+    key_ids = [PydanticObjectId() for _ in range(envs)]
+    received = 0
+    done = asyncio.Event()
+    expected = 0
+
+    async def connection(listener):
+        nonlocal received
+        async for _ in event_stream(hub, listener, "bench", send_current=False):
+            received += 1
+            if received == expected:
+                done.set()
+
+    async def deliver(action, count: int) -> float:
+        nonlocal received, expected
+        received, expected = 0, count
+        done.clear()
+        start = time.perf_counter()
+        action()
+        await done.wait()
+        return time.perf_counter() - start
+
+    tasks = []
+
+    def open_connections():
+        for i in range(connections):
+            tasks.append(asyncio.create_task(connection(hub.subscribe(env_ids[i % envs], 0, key_ids[i % envs]))))
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    opened = await deliver(open_connections, connections)  # until every stream sent its first chunk
+    per_connection = (tracemalloc.get_traced_memory()[0] - before) / connections
+    tracemalloc.stop()
+
+    per_env = connections // envs
+    one_env = await deliver(lambda: hub.publish(env_ids[0], 1), per_env)
+    all_envs = await deliver(lambda: [hub.publish(env_id, 2) for env_id in env_ids], connections)
+    heartbeat = await deliver(hub.heartbeat, connections)
+
+    print(f"{connections} connections over {envs} envs ({hub.listener_count} listening)")
+    print(f"  open (first chunk sent):    {opened * 1e3:8.2f} ms")
+    print(f"  memory per idle connection: {per_connection:8.0f} bytes")
+    print(f"  one env ({per_env} connections):  {one_env * 1e3:8.2f} ms")
+    print(f"  every env:                  {all_envs * 1e3:8.2f} ms")
+    print(f"  heartbeat:                  {heartbeat * 1e3:8.2f} ms")
+
+    start = time.perf_counter()
+    await hub.stop()  # ends every stream, as on shutdown
+    await asyncio.gather(*tasks)
+    print(f"  close all:                  {(time.perf_counter() - start) * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=20000)
+    parser.add_argument("--envs", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(run(args.connections, args.envs))
@@ -0,0 +1,168 @@
+"""
+Test setup: the app on the in-process memory backend (STORAGE_BACKEND=memory),
+called through httpx without a server. The lifespan is not run, so no
+workers, pollers or real database are started.
+
+Tests of MongoDB-only code (layouts, master edits, activation indexes) set
+the `backend` fixture to "mongo" and run on mongomock-motor. mongomock
+lacks a few things the app relies on, which the fixture patches in for
+the duration of the test:
+- queries and unique indexes on `env.$id` (Link fields are stored as DBRefs)
+- `with_options` (read preference routing) returning an async collection
+- duplicate key errors naming the index that was violated (the guess
+  mongomock-motor adds ignores partial indexes)
+"""
+import httpx
+import mongomock.collection
+import mongomock.filtering
+import mongomock.helpers
+import pytest
+from beanie import init_beanie
+from bson import DBRef
+import mongomock_motor.patches
+from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection
+from pymongo.errors import DuplicateKeyError
+
+from app.cache import bundle_cache, masters_cache, view_cache, view_history
+from app.config import settings
+from app.database import init_database
+from app.main import app
+from app.models import Counter, Env, EnvKey, Item, Job, MasterTombstone, MenuMaster, SubMenuMaster, View, ViewLayout
+from app.models.envs import HASH_SCHEME_HMAC
+from app.models.views import ViewMenuMap, _layout_cache
+from app.repositories import repositories
+
+
+def _patch_mongomock(monkeypatch):
+    iter_key_candidates = mongomock.filtering.iter_key_candidates
+    get_value_by_dot = mongomock.helpers.get_value_by_dot
+
+    def iter_key_candidates_in_dbrefs(key, doc):
+        if isinstance(doc, DBRef):
+            doc = {"$id": doc.id, "$ref": doc.collection}
+        return iter_key_candidates(key, doc)
+
+    def get_value_by_dot_in_dbrefs(doc, key, *args, **kwargs):
+        head, _, rest = key.partition(".")
+        if rest == "$id" and isinstance(doc, dict) and isinstance(doc.get(head), DBRef):
+            return doc[head].id
+        return get_value_by_dot(doc, key, *args, **kwargs)
+
+    def with_options(self, **kwargs):
+        collection = AsyncMongoMockCollection(
+            self.database, self._AsyncMongoMockCollection__collection.with_options(**kwargs)
+        )
+        collection.read_preference = kwargs.get("read_preference")
+        return collection
+
+    def duplicate_key_details(collection, data, exception):
+        if not isinstance(exception, DuplicateKeyError):
+            return exception
+        for name, index in collection._store.indexes.items():
+            partial = index.get("partialFilterExpression")
+            if not index.get("unique") or (partial and not mongomock.filtering.filter_applies(partial, data)):
+                continue
+            key_value = {}
+            for key, _ in index["key"]:
+                try:
+                    key_value[key] = get_value_by_dot_in_dbrefs(data, key)
+                except KeyError:
+                    key_value[key] = None
+            query = {"$and": [partial, key_value]} if partial else key_value
+            if any(doc["_id"] != data.get("_id") for doc in collection._iter_documents(query)):
+                message = f"E11000 duplicate key error index: {name}"
+                return DuplicateKeyError(
+                    message, 11000, {"errmsg": message, "keyPattern": dict(index["key"]), "keyValue": key_value}
+                )
+        return exception
+
+    def max_updater_over_null(doc, field_name, value):
+        # null sorts before every other BSON value, so $max replaces it
+        if isinstance(doc, dict):
+            current = doc.get(field_name)
+            doc[field_name] = value if current is None else max(current, value)
+
+    monkeypatch.setattr(mongomock.filtering, "iter_key_candidates", iter_key_candidates_in_dbrefs)
+    monkeypatch.setattr(mongomock_motor.patches, "_provide_error_details", duplicate_key_details)
+    monkeypatch.setattr(mongomock.helpers, "get_value_by_dot", get_value_by_dot_in_dbrefs)
+    monkeypatch.setattr(AsyncMongoMockCollection, "with_options", with_options, raising=False)
+    monkeypatch.setitem(mongomock.collection._updaters, "$max", max_updater_over_null)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def backend():
+    """Storage backend of the test's database; override (or parametrize) with "mongo"."""
+    return "memory"
+
+
+@pytest.fixture
+async def db(backend, monkeypatch):
+    """A fresh database (and empty process caches) per test."""
+    if backend == "mongo":
+        _patch_mongomock(monkeypatch)
+        await init_beanie(
+            database=AsyncMongoMockClient()["test"],
+            document_models=[Item, Env, EnvKey, SubMenuMaster, MenuMaster, View, MasterTombstone, ViewLayout, Counter, Job],
+        )
+        repositories.use("mongo")
+    else:
+        monkeypatch.setattr(settings, "STORAGE_BACKEND", "memory")
+        await init_database()
+    for cache in (masters_cache, view_cache, bundle_cache):
+        cache._entries.clear()
+    view_history._bodies.clear()
+    view_history._patches.clear()
+    _layout_cache.clear()
+    yield
+    repositories.use("mongo")
+
+
+@pytest.fixture
+async def client(db):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def env(db):
+    return await repositories.envs.insert(Env(envName="Test", slug="test", description=None, createdBy="tests"))
+
+
+async def create_masters(menus: int, entities: int):
+    """`menus` MenuMasters and `entities` SubMenuMasters, stamped with catalog revisions."""
+    menu_masters = [
+        await repositories.views.insert_menu_master(MenuMaster(name=f"menu-{i}", label=f"Menu {i}", icon=None))
+        for i in range(menus)
+    ]
+    sub_menu_masters = [
+        await repositories.views.insert_sub_menu_master(
+            SubMenuMaster(name=f"entity-{i}", label=f"Entity {i}", link=f"/entity/{i}", icon=None)
+        )
+        for i in range(entities)
+    ]
+    return menu_masters, sub_menu_masters
+
+
+async def create_view(env: Env, menu_masters, sub_menu_masters, view_id: int = 1, name: str = "nav", **fields) -> View:
+    """A view listing every entity under every menu."""
+    menus = [
+        ViewMenuMap(
+            menuId=menu.id,
+            order=i,
+            subMenus=[{"subMenuId": sub_menu.id, "order": j} for j, sub_menu in enumerate(sub_menu_masters)],
+        )
+        for i, menu in enumerate(menu_masters)
+    ]
+    return await repositories.views.insert(View(env=env, viewId=view_id, name=name, menus=menus, **fields))
+
+
+async def create_key(env: Env, scheme: str = HASH_SCHEME_HMAC, **fields):
+    """An env key and its plain secret."""
+    secret = EnvKey.generate_secret()
+    key = EnvKey(envId=env, hashedSecret=EnvKey.hash_secret(secret, scheme), hashScheme=scheme, createdBy="tests", **fields)
+    return await repositories.keys.insert(key), secret
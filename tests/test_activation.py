@@ -0,0 +1,96 @@
+"""View activation: one active view per env and name, and per env and viewId."""
+import pytest
+
+from app.models import View
+from app.repositories import repositories
+from tests.conftest import create_masters, create_view
+
+pytestmark = pytest.mark.anyio
+both_backends = pytest.mark.parametrize("backend", ["memory", "mongo"])
+mongo_only = pytest.mark.parametrize("backend", ["mongo"])
+
+
+@pytest.fixture
+async def indexes(db, backend):
+    """The ACTIVE_VIEW_INDEXES, which report the conflicts on MongoDB."""
+    if backend == "mongo":
+        await View.ensure_active_indexes()
+
+
+async def _statuses(*views):
+    return [(await repositories.views.get(view.id)).status for view in views]
+
+
+@both_backends
+async def test_activation_replaces_the_active_view_of_the_same_name(client, env, indexes):
+    menus, entities = await create_masters(1, 1)
+    old = await create_view(env, menus, entities, view_id=1, name="nav")
+    new = await create_view(env, menus, entities, view_id=2, name="nav")
+    other = await create_view(env, menus, entities, view_id=3, name="footer")
+    for view in (old, other, new):
+        response = await client.put(f"/views/{view.id}/activate")
+        assert response.status_code == 200
+        assert response.json()["status"] == "active"
+
+    assert await _statuses(old, new, other) == ["inactive", "active", "active"]
+
+
+@both_backends
+async def test_activation_bumps_the_env_views_revision(client, env, indexes):
+    menus, entities = await create_masters(1, 1)
+    view = await create_view(env, menus, entities)
+    await client.put(f"/views/{view.id}/activate")
+    assert (await repositories.envs.get(env.id)).viewsRevision == env.viewsRevision + 1
+
+
+@both_backends
+async def test_activation_refuses_a_view_id_held_by_another_name(client, env, indexes):
+    menus, entities = await create_masters(1, 1)
+    held = await create_view(env, menus, entities, view_id=7, name="nav")
+    clash = await create_view(env, menus, entities, view_id=7, name="footer")
+    await client.put(f"/views/{held.id}/activate")
+
+    response = await client.put(f"/views/{clash.id}/activate")
+    assert response.status_code == 409
+    assert await _statuses(held, clash) == ["active", "draft"]
+
+
+@both_backends
+async def test_refused_activation_keeps_the_active_view_of_its_name(client, env, indexes):
+    menus, entities = await create_masters(1, 1)
+    current = await create_view(env, menus, entities, view_id=1, name="nav")
+    holder = await create_view(env, menus, entities, view_id=7, name="footer")
+    clash = await create_view(env, menus, entities, view_id=7, name="nav")
+    for view in (current, holder):
+        await client.put(f"/views/{view.id}/activate")
+
+    response = await client.put(f"/views/{clash.id}/activate")
+    assert response.status_code == 409
+    assert await _statuses(current, holder, clash) == ["active", "active", "draft"]
+
+
+@both_backends
+async def test_activation_of_missing_view_is_not_found(client, env):
+    response = await client.put(f"/views/{env.id}/activate")
+    assert response.status_code == 404
+
+
+@mongo_only
+async def test_startup_refuses_existing_duplicates(env):
+    menus, entities = await create_masters(1, 1)
+    await create_view(env, menus, entities, view_id=1, name="nav", status="active")
+    await create_view(env, menus, entities, view_id=2, name="nav", status="active")
+    with pytest.raises(RuntimeError, match="app.active_views"):
+        await View.ensure_active_indexes()
+
+
+@mongo_only
+async def test_resolve_keeps_the_newest_active_view(env):
+    from app.active_views import find_duplicates, resolve_duplicates
+
+    menus, entities = await create_masters(1, 1)
+    old = await create_view(env, menus, entities, view_id=1, name="nav", status="active")
+    new = await create_view(env, menus, entities, view_id=2, name="nav", status="active")
+    assert await resolve_duplicates() == 1
+    assert await _statuses(old, new) == ["inactive", "active"]
+    assert await find_duplicates() == {"name": [], "viewId": []}
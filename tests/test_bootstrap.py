@@ -0,0 +1,53 @@
+"""GET /secure-views/env/bootstrap: the env's active views, versioned by its view revision."""
+import pytest
+
+from app.repositories import repositories
+from tests.conftest import create_key, create_masters, create_view
+
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("backend", ["memory", "mongo"])]
+
+
+async def _bootstrap(client, secret, **headers):
+    return await client.get("/secure-views/env/bootstrap", headers={"X-Token": secret, **headers})
+
+
+async def test_bootstrap_bundles_the_active_views(client, env):
+    menus, entities = await create_masters(2, 2)
+    await create_view(env, menus, entities, view_id=1, name="nav", status="active")
+    await create_view(env, menus, entities, view_id=2, name="draft")
+    _, secret = await create_key(env)
+
+    response = await _bootstrap(client, secret)
+    assert response.status_code == 200
+    bundle = response.json()
+    assert bundle["env"] == "test"
+    assert list(bundle["views"]) == ["nav"]
+    assert bundle["views"]["nav"] == (await client.get("/secure-views/nav", headers={"X-Token": secret})).json()
+    assert response.headers["Cache-Control"] == "no-cache"
+
+
+async def test_bootstrap_answers_304_until_a_view_changes(client, env):
+    menus, entities = await create_masters(2, 2)
+    view = await create_view(env, menus, entities, status="active")
+    _, secret = await create_key(env)
+
+    etag = (await _bootstrap(client, secret)).headers["ETag"]
+    not_modified = await _bootstrap(client, secret, **{"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert (await _bootstrap(client, secret, **{"If-None-Match": f"W/{etag}"})).status_code == 304
+
+    response = await client.patch(f"/views/{view.id}/menus/order", json={
+        "version": 0, "menus": [{"menuId": str(menus[1].id), "order": 0}, {"menuId": str(menus[0].id), "order": 1}],
+    })
+    assert response.status_code == 200
+    assert (await repositories.envs.get(env.id)).viewsRevision == 1
+
+    changed = await _bootstrap(client, secret, **{"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["revision"] == 1
+
+
+async def test_bootstrap_rejects_a_bad_secret(client, env):
+    assert (await _bootstrap(client, "nope")).status_code == 401
@@ -0,0 +1,62 @@
+"""Bulk item endpoints: per-row errors, counts, and row numbers across chunks."""
+import pytest
+from beanie import PydanticObjectId
+
+from app.repositories import repositories
+from app.routers import items
+
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("backend", ["memory", "mongo"])]
+
+
+@pytest.fixture
+async def bulk_client(client, monkeypatch):
+    monkeypatch.setattr(items, "BULK_CHUNK_SIZE", 2)  # several chunks per request
+    return client
+
+
+async def test_invalid_rows_are_reported_and_skipped(bulk_client):
+    rows = [
+        {"name": "a", "price": 1},
+        {"name": "", "price": 1},
+        {"name": "b", "price": 2},
+        {"name": "c", "price": -1},
+        {"name": "d", "price": 4},
+    ]
+    response = await bulk_client.post("/items/bulk", json=rows)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["received"] == 5
+    assert result["inserted"] == 3
+    assert result["errorCount"] == 2
+    assert [e["row"] for e in result["errors"]] == [2, 4]
+    assert result["errors"][1]["error"].startswith("price:")
+    assert await repositories.items.count() == 3
+
+
+async def test_updates_count_matches_and_report_bad_rows(bulk_client):
+    created = [
+        (await bulk_client.post("/items/", json={"name": f"item-{i}", "price": 1})).json()["_id"]
+        for i in range(3)
+    ]
+    rows = [
+        {"id": created[0], "price": 5},
+        {"id": created[1], "price": 1},  # unchanged
+        {"price": 3},
+        {"id": str(PydanticObjectId()), "price": 3},  # no such item
+        {"id": created[2]},
+    ]
+    result = (await bulk_client.put("/items/bulk", json=rows)).json()
+    assert (result["matched"], result["modified"]) == (2, 1)
+    assert [e["row"] for e in result["errors"]] == [3, 5]
+    assert (await repositories.items.get(PydanticObjectId(created[0]))).price == 5
+
+
+async def test_bulk_delete_counts_deleted_items(bulk_client):
+    created = [
+        (await bulk_client.post("/items/", json={"name": f"item-{i}", "price": 1})).json()["_id"]
+        for i in range(3)
+    ]
+    response = await bulk_client.post("/items/bulk/delete", json={"ids": created + [str(PydanticObjectId())]})
+    result = response.json()
+    assert (result["received"], result["deleted"], result["errorCount"]) == (4, 3, 0)
+    assert await repositories.items.count() == 0
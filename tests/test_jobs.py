@@ -0,0 +1,169 @@
+"""Background jobs: leases, retries with checkpoints, shutdown, and the resumable view copy."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.jobs import JobRunner, job_runner
+from app.models import Env, Job, View
+from app.repositories import repositories
+from tests.conftest import create_masters, create_view
+
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("backend", ["mongo"])]
+
+
+def _runner(**kwargs) -> JobRunner:
+    return JobRunner(**{"lease_seconds": 60, "poll_interval": 0.01, "retry_backoff": 0, **kwargs})
+
+
+async def _job(job_id) -> dict:
+    return await Job.get_motor_collection().find_one({"_id": job_id})
+
+
+async def _noop(job):
+    return None
+
+
+async def _fail(job):
+    raise ValueError("nope")
+
+
+async def _claim_and_run(runner: JobRunner, name: str) -> dict:
+    job = await runner._claim(runner.types[name])
+    assert job is not None
+    await runner._run(runner.types[name], job)
+    return await _job(job["_id"])
+
+
+async def test_a_leased_job_is_reclaimed_only_once_its_lease_runs_out(db):
+    first, second = _runner(), _runner()
+    for runner in (first, second):
+        runner.register("noop")(_noop)
+    job = await first.enqueue("noop", {})
+
+    claimed = await first._claim(first.types["noop"])
+    assert (claimed["status"], claimed["leaseOwner"], claimed["attempts"]) == ("running", first.owner, 1)
+    assert await second._claim(second.types["noop"]) is None
+
+    expired = datetime.utcnow() - timedelta(seconds=1)
+    await Job.get_motor_collection().update_one({"_id": job.id}, {"$set": {"leaseUntil": expired}})
+    reclaimed = await second._claim(second.types["noop"])
+    assert (reclaimed["leaseOwner"], reclaimed["attempts"]) == (second.owner, 2)
+
+    # The first worker lost the lease: its outcome is not recorded
+    await first._finish(first.types["noop"], claimed, "succeeded")
+    assert (await _job(job.id))["status"] == "running"
+
+
+async def test_a_failed_attempt_is_retried_from_its_checkpoint(db):
+    runner = _runner()
+    checkpoints = []
+
+    @runner.register("flaky", max_attempts=3)
+    async def flaky(job):
+        checkpoints.append(job.checkpoint)
+        if job.attempt == 1:
+            await job.progress({"done": 1})
+            raise RuntimeError("boom")
+        return {"resumedFrom": job.checkpoint["done"]}
+
+    job = await runner.enqueue("flaky", {})
+    retried = await _claim_and_run(runner, "flaky")
+    assert (retried["status"], retried["error"], retried["leaseOwner"]) == ("queued", "RuntimeError: boom", None)
+
+    finished = await _claim_and_run(runner, "flaky")
+    assert (finished["status"], finished["attempts"], finished["result"]) == ("succeeded", 2, {"resumedFrom": 1})
+    assert finished["error"] is None
+    assert checkpoints == [None, {"done": 1}]
+
+
+async def test_retries_back_off_and_stop_at_max_attempts(db):
+    runner = _runner(retry_backoff=30)
+    runner.register("broken", max_attempts=2)(_fail)
+    job = await runner.enqueue("broken", {})
+
+    retried = await _claim_and_run(runner, "broken")
+    assert retried["runAfter"] > datetime.utcnow() + timedelta(seconds=25)
+    assert await runner._claim(runner.types["broken"]) is None
+
+    await Job.get_motor_collection().update_one({"_id": job.id}, {"$set": {"runAfter": datetime.utcnow()}})
+    failed = await _claim_and_run(runner, "broken")
+    assert (failed["status"], failed["attempts"], failed["error"]) == ("failed", 2, "ValueError: nope")
+
+
+async def test_a_job_reclaimed_after_its_last_attempt_fails(db):
+    runner = _runner()
+    runner.register("noop", max_attempts=1)(_noop)
+    job = await runner.enqueue("noop", {})
+    await Job.get_motor_collection().update_one(
+        {"_id": job.id},
+        {"$set": {"status": "running", "attempts": 1, "leaseOwner": "dead", "leaseUntil": datetime.utcnow() - timedelta(seconds=1)}},
+    )
+
+    failed = await _claim_and_run(runner, "noop")
+    assert (failed["status"], failed["error"]) == ("failed", "Lease expired")
+
+
+async def test_stop_hands_running_jobs_back_to_the_queue(db):
+    runner = _runner()
+    started = asyncio.Event()
+
+    @runner.register("slow")
+    async def slow(job):
+        started.set()
+        await asyncio.sleep(60)
+
+    runner.start()
+    job = await runner.enqueue("slow", {})
+    await asyncio.wait_for(started.wait(), 5)
+    await runner.stop()
+
+    stored = await _job(job.id)
+    assert (stored["status"], stored["attempts"], stored["leaseOwner"]) == ("queued", 0, None)
+
+
+async def test_cancel_a_queued_job(db):
+    runner = _runner()
+    runner.register("noop")(_noop)
+    job = await runner.enqueue("noop", {})
+    assert (await runner.cancel(job.id))["status"] == "cancelled"
+    assert await runner._claim(runner.types["noop"]) is None
+
+
+async def test_view_copy_is_retried_without_copying_twice(env, monkeypatch):
+    menus, entities = await create_masters(2, 2)
+    source = await create_view(env, menus, entities)
+    targets = [
+        await repositories.envs.insert(Env(envName=f"Target {i}", slug=f"target-{i}", description=None, createdBy="tests"))
+        for i in range(3)
+    ]
+    job = await job_runner.enqueue("copy_view", {"viewId": str(source.id), "envIds": [str(e.id) for e in targets]})
+
+    # The second copy is written, but the attempt fails before recording it
+    insert = repositories.views.insert
+    calls = []
+
+    async def insert_then_fail(view: View):
+        calls.append(view.id)
+        written = await insert(view)
+        if len(calls) == 2:
+            raise ConnectionError("lost the reply")
+        return written
+    monkeypatch.setattr(repositories.views, "insert", insert_then_fail)
+
+    retried = await _claim_and_run(job_runner, "copy_view")
+    assert (retried["status"], retried["progress"]["done"]) == ("queued", 1)
+
+    await Job.get_motor_collection().update_one({"_id": job.id}, {"$set": {"runAfter": datetime.utcnow()}})
+    finished = await _claim_and_run(job_runner, "copy_view")
+    assert finished["status"] == "succeeded"
+    assert len(calls) == 3  # the copy in doubt was found, not written again
+
+    copied = finished["result"]["copiedViewIds"]
+    assert copied == retried["progress"]["viewIds"]
+    for target, view_id in zip(targets, copied):
+        [listed] = await repositories.views.list_for_env(target.id)
+        assert str(listed.id) == view_id
+        view = await repositories.views.get(listed.id)
+        assert (view.status, view.version, view.name) == ("draft", 0, source.name)
+        assert [m.menuId for m in view.menus] == [m.menuId for m in source.menus]
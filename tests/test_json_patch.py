@@ -0,0 +1,172 @@
+"""make_patch round-trips, If-None-Match matching for the view ETags, and ?since= deltas."""
+import copy
+import random
+
+import pytest
+
+from app.cache import etag_matches
+from app.json_patch import make_patch
+from tests.conftest import create_key, create_masters, create_view
+
+
+def _tokens(pointer: str):
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer.split("/")[1:]]
+
+
+def _parent(doc, pointer: str):
+    *path, last = _tokens(pointer)
+    for token in path:
+        doc = doc[int(token)] if isinstance(doc, list) else doc[token]
+    return doc, last
+
+
+def _remove(doc, pointer: str):
+    parent, last = _parent(doc, pointer)
+    return parent.pop(int(last)) if isinstance(parent, list) else parent.pop(last)
+
+
+def _add(doc, pointer: str, value):
+    parent, last = _parent(doc, pointer)
+    if isinstance(parent, list):
+        parent.insert(len(parent) if last == "-" else int(last), value)
+    else:
+        parent[last] = value
+
+
+def apply_patch(doc, patch):
+    """A minimal RFC 6902 applier (add / remove / replace / move), enough to check make_patch."""
+    doc = copy.deepcopy(doc)
+    for op in patch:
+        if op["path"] == "":
+            assert op["op"] == "replace"
+            doc = copy.deepcopy(op["value"])
+        elif op["op"] == "add":
+            _add(doc, op["path"], copy.deepcopy(op["value"]))
+        elif op["op"] == "remove":
+            _remove(doc, op["path"])
+        elif op["op"] == "replace":
+            parent, last = _parent(doc, op["path"])
+            parent[int(last) if isinstance(parent, list) else last] = copy.deepcopy(op["value"])
+        elif op["op"] == "move":
+            _add(doc, op["path"], _remove(doc, op["from"]))
+        else:
+            raise AssertionError(f"unexpected op {op['op']}")
+    return doc
+
+
+def _view(rng: random.Random) -> dict:
+    """An expanded view like the ones served, with awkward keys and ids now and then."""
+    return {
+        "id": str(rng.randrange(100)),
+        "name": rng.choice(["nav", "side/bar", "a~b"]),
+        "menus": [
+            {
+                "id": f"m{menu}",
+                "label": f"Menu {menu}",
+                "order": order,
+                "entities": [
+                    {"id": f"s{entity}", "label": f"E{entity}", "visible": rng.random() < 0.8, "order": i}
+                    for i, entity in enumerate(rng.sample(range(12), rng.randrange(6)))
+                ],
+                "tags": rng.sample(["a", "b", "c"], rng.randrange(3)),
+            }
+            for order, menu in enumerate(rng.sample(range(10), rng.randrange(1, 7)))
+        ],
+    }
+
+
+def _edit(rng: random.Random, view: dict) -> dict:
+    view = copy.deepcopy(view)
+    for _ in range(rng.randrange(1, 5)):
+        menus = view["menus"]
+        action = rng.randrange(6)
+        if action == 0:
+            rng.shuffle(menus)
+        elif action == 1 and menus:
+            menus.pop(rng.randrange(len(menus)))
+        elif action == 2:
+            # Sometimes reusing an id, which makes the list unkeyed (replaced whole)
+            menu_id = rng.choice([f"m{rng.randrange(10)}", f"new{rng.randrange(1000)}"])
+            menus.insert(rng.randrange(len(menus) + 1), {"id": menu_id, "label": "New", "entities": []})
+        elif action == 3 and menus:
+            entities = rng.choice(menus)["entities"]
+            rng.shuffle(entities)
+            for entity in entities[: rng.randrange(len(entities) + 1)]:
+                entity["visible"] = not entity["visible"]
+        elif action == 4 and menus:
+            menu = rng.choice(menus)
+            menu.pop("tags", None)
+            menu["icon"] = rng.choice([None, "star", ["nested", 1]])
+        else:
+            view["name"] = rng.choice(["nav", "other/name", "x~y"])
+    return view
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_make_patch_round_trips(seed):
+    rng = random.Random(seed)
+    before = _view(rng)
+    after = _edit(rng, before)
+    assert apply_patch(before, make_patch(before, after)) == after
+
+
+def test_make_patch_moves_reordered_items_instead_of_rewriting_them():
+    before = {"menus": [{"id": i, "label": str(i)} for i in range(5)]}
+    after = {"menus": [before["menus"][4]] + before["menus"][:4]}
+    assert make_patch(before, after) == [{"op": "move", "from": "/menus/4", "path": "/menus/0"}]
+
+
+def test_make_patch_of_equal_documents_is_empty():
+    assert make_patch({"a": [1, {"b": 2}]}, {"a": [1, {"b": 2}]}) == []
+
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ('"v-1.2"', True),
+    ('W/"v-1.2"', True),
+    ('"v-1.1", W/"v-1.2"', True),
+    ('"a,b", "v-1.2"', True),
+    ("*", True),
+    ('"v-1.3"', False),
+    ("v-1.2", False),
+])
+def test_etag_matches(header, matches):
+    assert etag_matches(header, '"v-1.2"') is matches
+
+
+@pytest.mark.anyio
+async def test_secure_view_since_an_older_version_gets_a_patch(client, env):
+    menus, entities = await create_masters(3, 20)
+    view = await create_view(env, menus, entities, status="active")
+    _, secret = await create_key(env)
+    headers = {"X-Token": secret}
+
+    first = await client.get("/secure-views/nav", headers=headers)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert (await client.get("/secure-views/nav", headers={**headers, "If-None-Match": etag})).status_code == 304
+
+    response = await client.patch(f"/views/{view.id}/menus/order", json={
+        "version": 0, "menus": [{"menuId": str(menus[0].id), "order": 7}],
+    })
+    assert response.status_code == 200
+    current = await client.get("/secure-views/nav", headers=headers)
+    assert current.headers["ETag"] != etag
+
+    delta = await client.get("/secure-views/nav", headers=headers, params={"since": etag})
+    assert delta.status_code == 200
+    assert delta.headers["content-type"] == "application/json-patch+json"
+    assert delta.headers["X-Delta-Base"] == etag
+    assert apply_patch(first.json(), delta.json()) == current.json()
+
+
+@pytest.mark.anyio
+async def test_secure_view_since_an_unknown_version_gets_the_full_view(client, env):
+    menus, entities = await create_masters(1, 1)
+    view = await create_view(env, menus, entities, status="active")
+    _, secret = await create_key(env)
+
+    response = await client.get("/secure-views/nav", headers={"X-Token": secret}, params={"since": f'"{view.id}-9.9"'})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert "X-Delta-Base" not in response.headers
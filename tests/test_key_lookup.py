@@ -0,0 +1,73 @@
+"""Secret lookup: indexed HMAC keys, and legacy argon2 keys upgraded on first use."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import EnvKey
+from app.models.envs import HASH_SCHEME_ARGON2, HASH_SCHEME_HMAC
+from app.repositories import repositories
+from tests.conftest import create_key
+
+pytestmark = pytest.mark.anyio
+both_backends = pytest.mark.parametrize("backend", ["memory", "mongo"])
+mongo_only = pytest.mark.parametrize("backend", ["mongo"])
+
+
+@both_backends
+async def test_hmac_key_is_found(env):
+    key, secret = await create_key(env)
+    assert (await repositories.keys.find_by_secret(secret)).id == key.id
+    assert await repositories.keys.find_by_secret(secret + "x") is None
+
+
+@both_backends
+async def test_argon2_key_is_upgraded_to_hmac_on_first_use(env, monkeypatch):
+    key, secret = await create_key(env, scheme=HASH_SCHEME_ARGON2)
+    assert (await repositories.keys.find_by_secret(secret)).id == key.id
+
+    stored = await repositories.keys.get(key.id)
+    assert stored.hashScheme == HASH_SCHEME_HMAC
+    assert stored.hashedSecret == EnvKey.hash_secret(secret, HASH_SCHEME_HMAC)
+
+    # The next lookup is the indexed one: no argon2 verification at all
+    def no_argon2(secret, hashed, scheme=HASH_SCHEME_ARGON2):
+        assert scheme == HASH_SCHEME_HMAC
+        return EnvKey.hash_secret(secret, HASH_SCHEME_HMAC) == hashed
+    monkeypatch.setattr(EnvKey, "verify_secret", staticmethod(no_argon2))
+    assert (await repositories.keys.find_by_secret(secret)).id == key.id
+
+
+@both_backends
+async def test_wrong_secret_leaves_argon2_keys_alone(env):
+    key, secret = await create_key(env, scheme=HASH_SCHEME_ARGON2)
+    assert await repositories.keys.find_by_secret("not-" + secret) is None
+    assert (await repositories.keys.get(key.id)).hashScheme == HASH_SCHEME_ARGON2
+
+
+@both_backends
+async def test_revoked_and_due_keys_are_refused(env):
+    revoked, revoked_secret = await create_key(env, scheme=HASH_SCHEME_ARGON2, status="revoked")
+    _, due_secret = await create_key(env, revokeAt=datetime.utcnow() - timedelta(seconds=1))
+    _, due_argon2_secret = await create_key(env, scheme=HASH_SCHEME_ARGON2, revokeAt=datetime.utcnow() - timedelta(seconds=1))
+
+    for secret in (revoked_secret, due_secret, due_argon2_secret):
+        assert await repositories.keys.find_by_secret(secret) is None
+    assert (await repositories.keys.get(revoked.id)).hashScheme == HASH_SCHEME_ARGON2
+
+
+@both_backends
+async def test_lookup_endpoint_resolves_the_env(client, env):
+    _, secret = await create_key(env, scheme=HASH_SCHEME_ARGON2)
+    response = await client.post("/envs/lookup", params={"secret": secret})
+    assert response.status_code == 200
+    assert response.json() == {"envId": str(env.id), "slug": "test"}
+    assert (await client.post("/envs/lookup", params={"secret": "nope"})).status_code == 401
+
+
+@mongo_only
+async def test_key_stored_before_hash_schemes_is_upgraded(env):
+    key, secret = await create_key(env, scheme=HASH_SCHEME_ARGON2)
+    await EnvKey.get_motor_collection().update_one({"_id": key.id}, {"$unset": {"hashScheme": ""}})
+
+    assert (await repositories.keys.find_by_secret(secret)).id == key.id
+    assert (await repositories.keys.get(key.id)).hashScheme == HASH_SCHEME_HMAC
@@ -0,0 +1,76 @@
+"""Key rotation: new keys at once, old ones refused after the overlap and then swept."""
+from datetime import datetime, timedelta
+
+import pytest
+from beanie import PydanticObjectId
+
+from app.key_rotation import KeyRevocationSweeper
+from app.models import Env
+from app.repositories import repositories
+from tests.conftest import create_key
+
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("backend", ["memory", "mongo"])]
+
+
+async def _lookup(client, secret) -> int:
+    return (await client.post("/envs/lookup", params={"secret": secret})).status_code
+
+
+async def _rotate(client, envs, overlap):
+    response = await client.post("/envs/keys/rotate", json={
+        "envIds": [str(env.id) for env in envs], "createdBy": "tests", "overlapSeconds": overlap,
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+async def test_rotation_keeps_old_keys_working_for_the_overlap(client, env):
+    old, old_secret = await create_key(env)
+    rotated = await _rotate(client, [env], overlap=3600)
+
+    assert rotated["scheduled"] == 1
+    [issued] = rotated["keys"]
+    assert issued["envId"] == str(env.id)
+    assert await _lookup(client, issued["secret"]) == 200
+    assert await _lookup(client, old_secret) == 200
+    assert (await repositories.keys.get(old.id)).revokeAt is not None
+    assert (await repositories.keys.get(PydanticObjectId(issued["keyId"]))).revokeAt is None
+
+
+async def test_old_keys_are_refused_after_the_overlap_and_swept(client, env):
+    old, old_secret = await create_key(env)
+    other_env = await repositories.envs.insert(Env(envName="Other", slug="other", description=None, createdBy="tests"))
+    _, untouched_secret = await create_key(other_env)
+    issued = (await _rotate(client, [env], overlap=0))["keys"][0]
+
+    # Refused before the sweep has run
+    assert await _lookup(client, old_secret) == 401
+    assert (await repositories.keys.get(old.id)).status == "active"
+
+    sweeper = KeyRevocationSweeper(interval=60)
+    assert await sweeper.sweep() == 1
+    assert await sweeper.sweep() == 0
+    assert (await repositories.keys.get(old.id)).status == "revoked"
+    assert (await repositories.keys.get(PydanticObjectId(issued["keyId"]))).status == "active"
+    assert await _lookup(client, untouched_secret) == 200
+
+
+async def test_rerotation_does_not_postpone_an_earlier_revocation(client, env):
+    old, _ = await create_key(env)
+    await _rotate(client, [env], overlap=60)
+    revoke_at = (await repositories.keys.get(old.id)).revokeAt
+
+    rotated = await _rotate(client, [env], overlap=3600)
+    assert rotated["scheduled"] == 1  # only the key issued by the first rotation
+    assert (await repositories.keys.get(old.id)).revokeAt == revoke_at
+
+
+async def test_sweep_skips_keys_not_yet_due_and_already_revoked(env):
+    await create_key(env, revokeAt=datetime.utcnow() + timedelta(hours=1))
+    await create_key(env, status="revoked", revokeAt=datetime.utcnow() - timedelta(hours=1))
+    assert await KeyRevocationSweeper(interval=60).sweep() == 0
+
+
+async def test_rotation_of_an_unknown_env_is_404(client, env):
+    response = await client.post("/envs/keys/rotate", json={"envIds": [str(PydanticObjectId())], "createdBy": "tests"})
+    assert response.status_code == 404
@@ -0,0 +1,90 @@
+"""Write-behind key usage: buffered per key, flushed in one batch, merged into the listing."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.key_usage import KeyUsageTracker, key_usage
+from app.repositories import repositories
+from tests.conftest import create_key
+
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("backend", ["memory", "mongo"])]
+
+
+@pytest.fixture
+def tracker():
+    return KeyUsageTracker(interval=0.01)
+
+
+async def test_flush_writes_the_buffered_counts(env, tracker):
+    first, _ = await create_key(env)
+    second, _ = await create_key(env)
+    for key_id in (first.id, first.id, second.id):
+        tracker.record(key_id)
+
+    assert tracker.pending(first.id)[1] == 2
+    assert await tracker.flush() == 2
+    assert tracker.pending(first.id) == (None, 0)
+    assert await tracker.flush() == 0
+
+    stored = await repositories.keys.get(first.id)
+    assert stored.requestCount == 2
+    assert stored.lastUsedAt is not None
+    assert (await repositories.keys.get(second.id)).requestCount == 1
+
+
+async def test_flush_adds_to_stored_counts_and_keeps_the_latest_use(env, tracker):
+    later = (datetime.utcnow() + timedelta(hours=1)).replace(microsecond=0)
+    key, _ = await create_key(env, requestCount=5, lastUsedAt=later)
+    tracker.record(key.id)
+    await tracker.flush()
+
+    stored = await repositories.keys.get(key.id)
+    assert stored.requestCount == 6
+    assert stored.lastUsedAt == later
+
+
+async def test_failed_flush_is_merged_into_the_next_one(env, tracker, monkeypatch):
+    key, _ = await create_key(env)
+    tracker.record(key.id)
+
+    record_usage = repositories.keys.record_usage
+
+    async def unavailable_once(usage):
+        monkeypatch.setattr(repositories.keys, "record_usage", record_usage)
+        raise RuntimeError("down")
+    monkeypatch.setattr(repositories.keys, "record_usage", unavailable_once)
+    assert await tracker.flush() == 0
+
+    tracker.record(key.id)
+    assert tracker.pending(key.id)[1] == 2
+    assert await tracker.flush() == 1
+    assert (await repositories.keys.get(key.id)).requestCount == 2
+
+
+async def test_loop_flushes_periodically_and_on_stop(env, tracker):
+    key, _ = await create_key(env)
+    tracker.start()
+    tracker.record(key.id)
+    for _ in range(100):
+        if (await repositories.keys.get(key.id)).requestCount:
+            break
+        await asyncio.sleep(0.01)
+    assert (await repositories.keys.get(key.id)).requestCount == 1
+
+    tracker.interval = 60
+    tracker.record(key.id)
+    await tracker.stop()
+    assert (await repositories.keys.get(key.id)).requestCount == 2
+
+
+async def test_key_listing_includes_unflushed_usage(client, env, monkeypatch):
+    monkeypatch.setattr(key_usage, "_pending", {})
+    key, secret = await create_key(env, requestCount=3)
+    for _ in range(2):
+        assert (await client.post("/envs/lookup", params={"secret": secret})).status_code == 200
+
+    listed = (await client.get("/envs/envKeys", params={"envId": str(env.id)})).json()
+    assert [(k["id"], k["requestCount"]) for k in listed] == [(str(key.id), 5)]
+    assert listed[0]["lastUsedAt"] is not None
+    assert (await repositories.keys.get(key.id)).requestCount == 3
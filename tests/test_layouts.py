@@ -0,0 +1,89 @@
+"""Views stored as shared layouts: edits swap the view to a new layout in one guarded write."""
+import pytest
+
+from app.models import SubMenuMaster, View, ViewLayout
+from app.models.views import _layout_cache
+from app.repositories import repositories
+from tests.conftest import create_masters, create_view
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def backend():
+    return "mongo"
+
+
+async def _raw(view):
+    return await View.get_motor_collection().find_one({"_id": view.id})
+
+
+async def test_copies_share_one_layout(env):
+    menus, entities = await create_masters(2, 2)
+    first = await create_view(env, menus, entities, view_id=1, name="a")
+    second = await create_view(env, menus, entities, view_id=2, name="b")
+
+    assert first.layout == second.layout
+    assert await ViewLayout.get_motor_collection().count_documents({}) == 1
+    assert (await _raw(first))["menus"] == []
+
+
+async def test_edit_moves_only_the_edited_view_to_a_new_layout(client, env):
+    menus, entities = await create_masters(2, 2)
+    edited = await create_view(env, menus, entities, view_id=1, name="a")
+    other = await create_view(env, menus, entities, view_id=2, name="b")
+    shared = edited.layout
+
+    response = await client.patch(f"/views/{edited.id}/menus/{menus[0].id}/entities/{entities[0].id}", json={
+        "version": 0,
+        "visible": False,
+    })
+    assert response.status_code == 200
+
+    raw = await _raw(edited)
+    assert raw["layout"] != shared
+    assert raw["menus"] == []
+    assert raw["version"] == 1
+    assert (await _raw(other))["layout"] == shared
+    # The cached tree of the shared layout was edited on a copy
+    assert all(sm.visible is None for m in _layout_cache[shared] for sm in m.subMenus)
+
+    saved = await repositories.views.get(edited.id)
+    menu = next(m for m in saved.menus if m.menuId == menus[0].id)
+    assert next(sm for sm in menu.subMenus if sm.subMenuId == entities[0].id).visible is False
+
+
+async def test_stale_edit_leaves_the_view_untouched(client, env):
+    menus, entities = await create_masters(2, 2)
+    view = await create_view(env, menus, entities)
+    before = await _raw(view)
+
+    response = await client.delete(
+        f"/views/{view.id}/menus/{menus[0].id}/entities/{entities[0].id}", params={"version": 4}
+    )
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Version conflict: expected 4, current is 0"
+    assert await _raw(view) == before
+    assert await ViewLayout.get_motor_collection().count_documents({}) == 1
+
+
+async def test_adding_an_entity_raises_masters_revision(client, env):
+    menus, entities = await create_masters(1, 1)
+    view = await create_view(env, menus, entities)
+    added = await repositories.views.insert_sub_menu_master(
+        SubMenuMaster(name="added", label="Added", link="/added", icon=None)
+    )
+    assert added.revision > view.mastersRevision
+
+    response = await client.post(f"/views/{view.id}/menus/{menus[0].id}/entities", json={
+        "version": 0,
+        "subMenuId": str(added.id),
+    })
+    assert response.status_code == 200
+    assert (await _raw(view))["mastersRevision"] == added.revision
+
+    again = await client.post(f"/views/{view.id}/menus/{menus[0].id}/entities", json={
+        "version": 1,
+        "subMenuId": str(added.id),
+    })
+    assert again.status_code == 409
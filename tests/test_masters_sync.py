@@ -0,0 +1,120 @@
+"""Incremental master sync (/views/menus/all?since=) and master edits."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.cache import masters_cache
+from app.models import Counter, MenuMaster
+from app.models import views
+from app.models.views import MASTERS_SEQUENCE, next_master_revision
+from tests.conftest import create_masters, create_view
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def backend():
+    return "mongo"
+
+
+@pytest.fixture(autouse=True)
+def settled(monkeypatch):
+    """Writes count as landed as soon as they are made; tests of the settle window raise it."""
+    monkeypatch.setattr(views, "MASTER_WRITE_SETTLE", 0)
+
+
+async def _backdate_writes():
+    """Make every write so far older than the settle window."""
+    past = datetime.utcnow() - timedelta(minutes=1)
+    await MenuMaster.get_motor_collection().update_many({}, {"$set": {"updatedAt": past}})
+    await Counter.get_motor_collection().update_one({"_id": MASTERS_SEQUENCE}, {"$set": {"takenAt": past}})
+
+
+async def test_since_lists_masters_written_after_the_revision(client, env):
+    menus, entities = await create_masters(2, 1)
+    listing = (await client.get("/views/menus/all")).json()
+    assert listing["revision"] == 3
+
+    response = await client.patch(f"/views/menus/{menus[1].id}", json={"label": "Renamed"})
+    assert response.status_code == 200
+
+    changes = (await client.get("/views/menus/all", params={"since": listing["revision"]})).json()
+    assert changes["revision"] == 4
+    assert [menu["label"] for menu in changes["menus"]] == ["Renamed"]
+    assert changes["submenus"] == []
+
+
+async def test_concurrent_writers_take_distinct_revisions(db):
+    revisions = await asyncio.gather(*(next_master_revision() for _ in range(10)))
+    assert sorted(revisions) == list(range(1, 11))
+
+
+async def test_write_in_flight_is_not_skipped_by_since(client, env, monkeypatch):
+    menus, _ = await create_masters(2, 0)
+    await _backdate_writes()
+    monkeypatch.setattr(views, "MASTER_WRITE_SETTLE", 5)
+    menu = await MenuMaster.get(menus[0].id)
+
+    revision = await next_master_revision()
+    # The write of `revision` has not landed yet: the listing stops below it
+    listing = await client.get("/views/menus/all")
+    assert listing.json()["revision"] == revision - 1
+    assert masters_cache.get("all", revision - 1) is None  # not cached while unsettled
+    menu.label = "Late"
+    menu.revision = revision
+    menu.updatedAt = datetime.utcnow()
+    await menu.replace()
+
+    changes = (await client.get("/views/menus/all", params={"since": listing.json()["revision"]})).json()
+    assert [m["label"] for m in changes["menus"]] == ["Late"]
+    assert changes["revision"] == revision - 1  # sent again next time, until it settles
+
+    monkeypatch.setattr(views, "MASTER_WRITE_SETTLE", 0)
+    settled = (await client.get("/views/menus/all", params={"since": changes["revision"]})).json()
+    assert settled["revision"] == revision
+
+
+async def test_settled_listing_is_cached_and_revalidated(client, env):
+    await create_masters(1, 1)
+    response = await client.get("/views/menus/all")
+    etag = response.headers["ETag"]
+    assert masters_cache.get("all", response.json()["revision"]) is not None
+
+    revalidated = await client.get("/views/menus/all", headers={"If-None-Match": f"W/{etag}"})
+    assert revalidated.status_code == 304
+
+
+async def test_master_edit_rejects_null_required_fields(client, env):
+    menus, entities = await create_masters(1, 1)
+    assert (await client.patch(f"/views/menus/{menus[0].id}", json={"label": None})).status_code == 422
+    assert (await client.patch(f"/views/submenus/{entities[0].id}", json={"link": None})).status_code == 422
+    assert (await client.patch(f"/views/menus/{menus[0].id}", json={"icon": None})).status_code == 200
+
+
+async def test_master_edit_moves_views_to_a_new_masters_revision(client, env):
+    menus, entities = await create_masters(1, 1)
+    view = await create_view(env, menus, entities)
+    assert view.mastersRevision == 2
+
+    await client.patch(f"/views/submenus/{entities[0].id}", json={"label": "Renamed"})
+    stored = await view.get_motor_collection().find_one({"_id": view.id})
+    assert (stored["version"], stored["mastersRevision"]) == (0, 3)  # editors' version untouched
+
+
+async def test_deleted_masters_are_listed_by_since(client, env):
+    menus, _ = await create_masters(2, 0)
+    response = await client.delete(f"/views/menus/{menus[0].id}")
+    assert response.json()["revision"] == 3
+
+    changes = (await client.get("/views/menus/all", params={"since": 2})).json()
+    assert changes["deleted"] == {"menus": [str(menus[0].id)], "submenus": []}
+
+
+async def test_expanded_views_leave_out_sync_fields(client, env):
+    menus, entities = await create_masters(1, 1)
+    view = await create_view(env, menus, entities)
+    body = (await client.get(f"/views/{view.id}")).json()
+    menu = body["menus"][0]
+    assert "revision" not in menu and "updatedAt" not in menu
+    assert "revision" not in menu["entities"][0] and "updatedAt" not in menu["entities"][0]
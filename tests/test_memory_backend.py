@@ -0,0 +1,45 @@
+"""STORAGE_BACKEND=memory: editor endpoints go through the repositories; MongoDB-only ones answer 503."""
+import pytest
+from beanie import PydanticObjectId
+
+from tests.conftest import create_masters, create_view
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("backend", ["memory", "mongo"])
+async def test_get_view_expands_the_stored_view(client, env):
+    menus, entities = await create_masters(2, 1)
+    view = await create_view(env, menus, entities, view_id=7, name="nav")
+
+    response = await client.get(f"/views/{view.id}")
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["id"], body["name"]) == ("7", "nav")
+    assert [menu["label"] for menu in body["menus"]] == ["Menu 0", "Menu 1"]
+    assert [entity["label"] for entity in body["menus"][0]["entities"]] == ["Entity 0"]
+
+    assert (await client.get(f"/views/{PydanticObjectId()}")).status_code == 404
+
+
+async def test_mongo_only_endpoints_answer_503(client, env):
+    menus, entities = await create_masters(1, 1)
+    view = await create_view(env, menus, entities)
+
+    responses = [
+        await client.patch(f"/views/menus/{menus[0].id}", json={"label": "Renamed"}),
+        await client.patch(f"/views/submenus/{entities[0].id}", json={"label": "Renamed"}),
+        await client.delete(f"/views/menus/{menus[0].id}"),
+        await client.delete(f"/views/submenus/{entities[0].id}"),
+        await client.get("/jobs/"),
+        await client.get(f"/jobs/{PydanticObjectId()}"),
+        await client.post("/views/copy", json={"viewId": str(view.id), "envIds": [str(env.id)]}),
+    ]
+    assert [r.status_code for r in responses] == [503] * len(responses)
+
+
+async def test_bulk_items_work_without_mongo(client):
+    response = await client.post("/items/bulk", json=[{"name": "a", "price": 1}, {"name": "b", "price": 2}])
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 2
+    assert len((await client.get("/items/")).json()) == 2
@@ -0,0 +1,46 @@
+"""POST /secure-views/batch: views by name or viewId, on both backends."""
+import pytest
+
+from app.models import Env
+from app.repositories import repositories
+from tests.conftest import create_key, create_masters, create_view
+
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("backend", ["memory", "mongo"])]
+
+
+async def test_batch_returns_views_by_name_and_view_id(client, env):
+    menus, entities = await create_masters(2, 3)
+    await create_view(env, menus, entities, view_id=1, name="nav", status="active")
+    await create_view(env, menus[:1], entities[:1], view_id=2, name="footer", status="active")
+    _, secret = await create_key(env)
+
+    response = await client.post("/secure-views/batch", headers={"X-Token": secret}, json={"views": ["nav", "2", "missing"]})
+    assert response.status_code == 200
+    results = response.json()["views"]
+    assert [(r["view"], r["found"]) for r in results] == [("nav", True), ("2", True), ("missing", False)]
+
+    single = await client.get("/secure-views/nav", headers={"X-Token": secret})
+    assert results[0]["data"] == single.json()
+    assert results[1]["data"]["name"] == "footer"
+
+
+async def test_batch_skips_inactive_views_and_other_envs(client, env):
+    menus, entities = await create_masters(1, 1)
+    await create_view(env, menus, entities, view_id=1, name="draft")
+    other = await repositories.envs.insert(Env(envName="Other", slug="other", description=None, createdBy="tests"))
+    await create_view(other, menus, entities, view_id=2, name="theirs", status="active")
+    _, secret = await create_key(env)
+
+    response = await client.post("/secure-views/batch", headers={"X-Token": secret}, json={"views": ["draft", "theirs"]})
+    assert [r["found"] for r in response.json()["views"]] == [False, False]
+
+
+async def test_batch_rejects_a_bad_secret(client, env):
+    response = await client.post("/secure-views/batch", headers={"X-Token": "nope"}, json={"views": ["nav"]})
+    assert response.status_code == 401
+
+
+async def test_batch_needs_at_least_one_view(client, env):
+    _, secret = await create_key(env)
+    response = await client.post("/secure-views/batch", headers={"X-Token": secret}, json={"views": []})
+    assert response.status_code == 422
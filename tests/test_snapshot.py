@@ -0,0 +1,85 @@
+"""Offline snapshot: export, lookups by secret, name and viewId, revokeAt, and the fallback."""
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app import snapshot
+from app.config import settings
+from app.models.envs import HASH_SCHEME_ARGON2
+from app.routers import getView
+from app.snapshot import SnapshotStore, export_snapshot
+from tests.conftest import create_key, create_masters, create_view
+
+pytestmark = pytest.mark.anyio
+
+
+async def _views(env, tmp_path) -> str:
+    """An active view (viewId 3, "nav") and a draft; returns the path to export to."""
+    menus, entities = await create_masters(1, 1)
+    await create_view(env, menus, entities, view_id=3, name="nav", status="active")
+    await create_view(env, menus, entities, view_id=4, name="draft")
+    return str(tmp_path / "snapshot.bin")
+
+
+async def test_lookup_by_secret_name_and_view_id(env, tmp_path):
+    path = await _views(env, tmp_path)
+    _, secret = await create_key(env)
+    _, legacy_secret = await create_key(env, scheme=HASH_SCHEME_ARGON2)
+    _, paused_secret = await create_key(env, status="inactive")
+    result = await export_snapshot(path)
+    assert (result["keys"], result["views"]) == (1, 1)
+
+    store = SnapshotStore()
+    store.open(path)
+    env_id = store.resolve_env_id(secret)
+    assert env_id == str(env.id)
+    assert store.resolve_env_id(legacy_secret) is None  # argon2 keys cannot be indexed
+    assert store.resolve_env_id(paused_secret) is None
+    assert store.resolve_env_id("unknown") is None
+
+    assert store.get_view(env_id, "nav") == store.get_view(env_id, "3")
+    assert b'"name":"nav"' in store.get_view(env_id, "nav")
+    assert store.get_view(env_id, "draft") is None
+
+
+async def test_keys_stop_resolving_at_their_revoke_at(env, tmp_path, monkeypatch):
+    path = await _views(env, tmp_path)
+    revoke_at = datetime.utcnow() + timedelta(hours=1)
+    _, rotated = await create_key(env, revokeAt=revoke_at)
+    _, overdue = await create_key(env, revokeAt=datetime.utcnow() - timedelta(seconds=1))
+    await export_snapshot(path)
+
+    store = SnapshotStore()
+    store.open(path)
+    assert store.resolve_env_id(rotated) == str(env.id)
+    assert store.resolve_env_id(overdue) is None  # not exported
+
+    class Later(datetime):
+        @classmethod
+        def utcnow(cls):
+            return revoke_at + timedelta(seconds=1)
+
+    monkeypatch.setattr(snapshot, "datetime", Later)
+    assert store.resolve_env_id(rotated) is None
+
+
+async def test_fallback_answers_when_mongo_is_unreachable(client, env, tmp_path, monkeypatch):
+    path = await _views(env, tmp_path)
+    _, secret = await create_key(env)
+    await export_snapshot(path)
+    store = SnapshotStore()
+    store.open(path)
+
+    async def unreachable(*args, **kwargs):
+        raise ServerSelectionTimeoutError("no servers")
+
+    monkeypatch.setattr(getView, "_secure_view_from_db", unreachable)
+    monkeypatch.setattr(getView, "snapshot_store", store)
+    monkeypatch.setattr(settings, "SNAPSHOT_MODE", "fallback")
+
+    response = await client.get("/secure-views/nav", headers={"X-Token": secret})
+    assert response.status_code == 200
+    assert response.headers["X-Served-From"] == "snapshot"
+    assert response.json()["name"] == "nav"
+    assert (await client.get("/secure-views/nav", headers={"X-Token": "unknown"})).status_code == 401
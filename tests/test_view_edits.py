@@ -0,0 +1,69 @@
+"""In-place view edits: the version guard and the edit preconditions, on both backends."""
+import pytest
+from beanie import PydanticObjectId
+
+from app.repositories import repositories
+from tests.conftest import create_masters, create_view
+
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("backend", ["memory", "mongo"])]
+
+
+async def _view(env):
+    menus, entities = await create_masters(2, 2)
+    return await create_view(env, menus, entities), menus, entities
+
+
+async def test_reorder_bumps_version_and_writes_orders(client, env):
+    view, menus, entities = await _view(env)
+    response = await client.patch(f"/views/{view.id}/menus/order", json={
+        "version": 0,
+        "menus": [{"menuId": str(menus[0].id), "order": 5, "entities": [{"subMenuId": str(entities[1].id), "order": 9}]}],
+    })
+    assert response.status_code == 200
+    assert response.json()["version"] == 1
+
+    saved = await repositories.views.get(view.id)
+    assert saved.version == 1
+    menu = next(m for m in saved.menus if m.menuId == menus[0].id)
+    assert menu.order == 5
+    assert next(sm for sm in menu.subMenus if sm.subMenuId == entities[1].id).order == 9
+
+
+async def test_reorder_with_stale_version_conflicts(client, env):
+    view, menus, _ = await _view(env)
+    payload = {"version": 0, "menus": [{"menuId": str(menus[0].id), "order": 3}]}
+    assert (await client.patch(f"/views/{view.id}/menus/order", json=payload)).status_code == 200
+
+    response = await client.patch(f"/views/{view.id}/menus/order", json=payload)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Version conflict: expected 0, current is 1"
+
+
+async def test_reorder_rejects_duplicate_menus(client, env):
+    view, menus, entities = await _view(env)
+    menu_id = str(menus[0].id)
+    duplicate_menus = {"version": 0, "menus": [{"menuId": menu_id, "order": 1}, {"menuId": menu_id, "order": 2}]}
+    assert (await client.patch(f"/views/{view.id}/menus/order", json=duplicate_menus)).status_code == 422
+
+    entity = {"subMenuId": str(entities[0].id), "order": 1}
+    duplicate_entities = {"version": 0, "menus": [{"menuId": menu_id, "entities": [entity, entity]}]}
+    assert (await client.patch(f"/views/{view.id}/menus/order", json=duplicate_entities)).status_code == 422
+
+
+async def test_reorder_of_unknown_menu_changes_nothing(client, env):
+    view, menus, _ = await _view(env)
+    response = await client.patch(f"/views/{view.id}/menus/order", json={
+        "version": 0,
+        "menus": [{"menuId": str(menus[0].id), "order": 1}, {"menuId": str(PydanticObjectId()), "order": 2}],
+    })
+    assert response.status_code == 409
+    assert (await repositories.views.get(view.id)).version == 0
+
+
+async def test_reorder_of_missing_view_is_not_found(client, env):
+    _, menus, _ = await _view(env)
+    response = await client.patch(f"/views/{PydanticObjectId()}/menus/order", json={
+        "version": 0,
+        "menus": [{"menuId": str(menus[0].id), "order": 1}],
+    })
+    assert response.status_code == 404
@@ -0,0 +1,94 @@
+"""View change events: revisions pushed per env, and streams ended on revoke or max age."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.repositories import repositories
+from app.view_events import ViewEventHub, event_stream, view_events
+from tests.conftest import create_key
+
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("backend", ["memory", "mongo"])]
+
+
+def _hub(max_age: float = 3600, max_listeners: int = 10) -> ViewEventHub:
+    return ViewEventHub(poll_interval=60, heartbeat_interval=60, max_listeners=max_listeners, max_age=max_age)
+
+
+async def test_stream_sends_changed_revisions_and_pings(env):
+    key, _ = await create_key(env)
+    hub = _hub()
+    listener = hub.subscribe(env.id, 0, key.id)
+    stream = event_stream(hub, listener, env.slug, send_current=False)
+    assert await anext(stream) == b"retry: 5000\n\n"
+
+    await repositories.envs.bump_views_revision(env.id)
+    await hub.poll()
+    assert await anext(stream) == b'id: 1\nevent: views\ndata: {"env":"test","revision":1}\n\n'
+
+    await hub.poll()  # unchanged: nothing queued
+    hub.heartbeat()
+    assert await anext(stream) == b": ping\n\n"
+
+    await stream.aclose()
+    assert hub.listener_count == 0
+
+
+async def test_stream_sends_the_current_revision_first(env):
+    key, _ = await create_key(env)
+    hub = _hub()
+    stream = event_stream(hub, hub.subscribe(env.id, 4, key.id), env.slug, send_current=True)
+    assert (await anext(stream)).endswith(b'id: 4\nevent: views\ndata: {"env":"test","revision":4}\n\n')
+    await stream.aclose()
+
+
+async def test_streams_past_max_age_are_ended(env):
+    key, _ = await create_key(env)
+    hub = _hub(max_age=0)
+    listener = hub.subscribe(env.id, 0, key.id)
+    stream = event_stream(hub, listener, env.slug, send_current=False)
+    await anext(stream)
+
+    await hub.close_stale()
+    assert listener.closed
+    assert hub.listener_count == 0
+    with pytest.raises(StopAsyncIteration):
+        await anext(stream)
+
+
+async def test_streams_of_unusable_keys_are_ended(env):
+    hub = _hub()
+    keys = [
+        (await create_key(env))[0],
+        (await create_key(env, status="revoked"))[0],
+        (await create_key(env, status="inactive"))[0],
+        (await create_key(env, revokeAt=datetime.utcnow() - timedelta(seconds=1)))[0],
+    ]
+    listeners = [hub.subscribe(env.id, 0, key.id) for key in keys]
+
+    await hub.close_stale()
+    assert [listener.closed for listener in listeners] == [False, True, True, True]
+    assert hub.listener_count == 1
+
+    await repositories.keys.set_fields(keys[0], {"status": "revoked"})
+    await hub.close_stale()
+    assert listeners[0].closed
+    assert hub.listener_count == 0
+
+
+async def test_stop_ends_the_open_streams(env):
+    key, _ = await create_key(env)
+    hub = _hub()
+    listener = hub.subscribe(env.id, 0, key.id)
+    await hub.stop()
+    assert listener.closed
+    assert hub.listener_count == 0
+
+
+async def test_events_endpoint_refuses_bad_secrets_and_extra_streams(client, env, monkeypatch):
+    assert (await client.get("/secure-views/env/events", headers={"X-Token": "nope"})).status_code == 401
+
+    _, secret = await create_key(env)
+    monkeypatch.setattr(view_events, "max_listeners", 0)
+    response = await client.get("/secure-views/env/events", headers={"X-Token": secret})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"